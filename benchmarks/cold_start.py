@@ -0,0 +1,122 @@
+"""
+Cold start of policy workers: time until each of `--workers` worker
+processes, forked from a parent, has served one request for every policy
+below.
+
+cold
+    The parent imports the policies and forks the workers, which finalize
+    every policy on first use.
+warm
+    The parent warms up with a manifest written by
+    `python -m calcifer.warmup`, finalizing every policy once, then forks
+    the workers.
+
+Each case runs in a fresh interpreter, so that neither starts with
+policies finalized by the other.
+
+Run from the repository root: `python -m benchmarks.cold_start`
+"""
+# pylint: disable=no-self-argument
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from calcifer.policy import DefaultPolicy, fork_context
+from calcifer.warmup import find_policies, warm_up
+
+
+POLICY_COUNT = 10
+FIELD_COUNT = 10
+
+
+def make_policy(n):
+    def policy(ctx):
+        for i in range(FIELD_COUNT):
+            ctx.select("/f{}".format(i)).whitelist_values(["a", "b"])
+    policy.__name__ = "policy_{}".format(n)
+    return Policies.Policy(policy)
+
+
+class Policies(object):
+    class Policy(DefaultPolicy):
+        defaults = {"errors": [], "context": []}
+
+
+for _n in range(POLICY_COUNT):
+    setattr(Policies, "policy_{}".format(_n), make_policy(_n))
+
+REQUEST = {"f{}".format(i): "a" for i in range(FIELD_COUNT)}
+
+
+def serve_first_requests(policy_references):
+    for policy_reference in policy_references:
+        policy_reference.run(dict(REQUEST))
+    return os.getpid()
+
+
+def start_workers(workers, manifest_path=None):
+    """
+    Returns the seconds until forked workers have served their first
+    requests, warming up with `manifest_path` first if given
+    """
+    start = time.time()
+    if manifest_path is not None:
+        policy_references = warm_up(manifest_path)
+    else:
+        policy_references = find_policies(__name__)
+    pool = fork_context().Pool(workers)
+    try:
+        pool.map(serve_first_requests, [policy_references] * workers)
+    finally:
+        pool.close()
+        pool.join()
+    return time.time() - start
+
+
+def run_case(workers, manifest_path=None):
+    command = [
+        sys.executable, "-m", "benchmarks.cold_start",
+        "--workers", str(workers), "--case",
+    ]
+    if manifest_path is None:
+        command.append("cold")
+    else:
+        command += ["warm", "--manifest", manifest_path]
+    return float(subprocess.check_output(command).decode().strip())
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.cold_start")
+    parser.add_argument("--workers", type=int, default=4)
+    # internal: run one case in this process and print its time
+    parser.add_argument("--case", choices=["cold", "warm"])
+    parser.add_argument("--manifest")
+    args = parser.parse_args(argv)
+
+    if args.case is not None:
+        manifest_path = args.manifest if args.case == "warm" else None
+        print(start_workers(args.workers, manifest_path))
+        return
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        manifest_path = os.path.join(tmp_dir, "policies.json")
+        subprocess.check_call([
+            sys.executable, "-m", "calcifer.warmup",
+            "benchmarks.cold_start", "-o", manifest_path,
+        ])
+
+        print("cold: {:.3f}s".format(run_case(args.workers)))
+        print("warm: {:.3f}s".format(run_case(args.workers, manifest_path)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,135 @@
+"""
+Import-time cost of calcifer, as reported by `python -X importtime`.
+
+Each statement runs `--repeat` times, each in a fresh interpreter (after
+one run to write bytecode caches). The run with the smallest total is
+reported: the cumulative time of every module the statement imported,
+and the calcifer modules among them, slowest first by self time.
+
+    python -m benchmarks.importtime [statement ...]
+
+With `--budget`, exits with status 1 if any statement's best total, in
+milliseconds, is over the budget. Requires Python 3.7+.
+"""
+from __future__ import print_function
+
+import argparse
+import subprocess
+import sys
+
+STATEMENTS = [
+    "import calcifer",
+    "from calcifer import Policy",
+    "import calcifer.operators",
+]
+
+# written to stderr just before the statement runs, to tell its imports
+# apart from the interpreter's own
+MARKER = "-- benchmarks.importtime --"
+
+
+class ImportedModule(object):
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, name, self_us, cumulative_us, depth):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse(stderr):
+    """
+    Returns the modules imported after the marker, from `-X importtime`
+    output
+    """
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        modules.append(ImportedModule(
+            stripped, int(fields[0]), int(fields[1]),
+            (len(name) - len(stripped)) // 2,
+        ))
+    return modules
+
+
+def import_once(statement):
+    code = "import sys; sys.stderr.write({!r}); sys.stderr.flush(); {}".format(
+        MARKER + "\n", statement
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stderr=subprocess.PIPE, universal_newlines=True,
+    )
+    _, stderr = process.communicate()
+    if process.returncode:
+        raise RuntimeError("{!r} failed:\n{}".format(statement, stderr))
+    return parse(stderr)
+
+
+def total_us(modules):
+    # modules are listed after the modules they import
+    return sum(module.cumulative_us for module in modules if module.depth == 0)
+
+
+def best_run(statement, repeat=5):
+    import_once(statement)  # write bytecode caches
+    return min(
+        (import_once(statement) for _ in range(repeat)), key=total_us
+    )
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.importtime")
+    parser.add_argument(
+        "statements", nargs="*", metavar="statement",
+        help="statements to time (default: {})".format("; ".join(STATEMENTS)),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--limit", type=int, default=10,
+        help="calcifer modules to list per statement",
+    )
+    parser.add_argument(
+        "--budget", type=float, default=None,
+        help="milliseconds any statement may take",
+    )
+    args = parser.parse_args(argv)
+
+    if sys.version_info < (3, 7):
+        print("-X importtime requires Python 3.7+", file=sys.stderr)
+        return 2
+
+    failed = False
+    for statement in args.statements or STATEMENTS:
+        modules = best_run(statement, args.repeat)
+        total_ms = total_us(modules) / 1000.0
+        over = args.budget is not None and total_ms > args.budget
+        failed = failed or over
+        print("{}: {:.1f} ms, {} modules{}".format(
+            statement, total_ms, len(modules), " OVER BUDGET" if over else ""
+        ))
+        own = sorted(
+            (module for module in modules
+             if module.name.split(".")[0] == "calcifer"),
+            key=lambda module: module.self_us, reverse=True,
+        )
+        for module in own[:args.limit]:
+            print("  {:>8.1f} {:>8.1f}  {}".format(
+                module.self_us / 1000.0, module.cumulative_us / 1000.0,
+                module.name,
+            ))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
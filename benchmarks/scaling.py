@@ -0,0 +1,214 @@
+"""
+Asymptotic scaling checks of core operations.
+
+Each case times one operation over growing sizes (depth, width, list
+length, fork count, number of errors), fits the growth exponent `k` of
+`time ~ size ** k` by least squares on a log-log scale, and compares it
+against the case's declared bound. A case fails when its exponent goes
+past the bound by more than `--tolerance`, i.e. when the operation got
+asymptotically slower than it is known to be.
+
+Bounds describe the engine as it is, so that regressions are caught; they
+should be lowered as operations are made to scale better.
+
+    python -m benchmarks.scaling [case ...]
+
+Exits with status 1 if any case failed.
+"""
+from __future__ import print_function
+
+import argparse
+import copy
+import math
+import sys
+import timeit
+
+from calcifer import operators
+from calcifer.contexts import Context
+from calcifer.partial import Partial
+from calcifer.utils import run_policy
+
+
+CASES = []
+
+
+class Case(object):
+    """
+    `setup(size)` returns the function to time for one size; `bound` is
+    the largest expected growth exponent
+    """
+    def __init__(self, name, setup, sizes, bound):
+        self.name = name
+        self.setup = setup
+        self.sizes = sizes
+        self.bound = bound
+
+    def __repr__(self):
+        return "<Case {} O(n^{})>".format(self.name, self.bound)
+
+
+def case(name, sizes, bound):
+    def decorator(setup):
+        CASES.append(Case(name, setup, sizes, bound))
+        return setup
+    return decorator
+
+
+def fit_exponent(sizes, times):
+    """
+    Least squares slope of log(times) against log(sizes)
+    """
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(time, 1e-9)) for time in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+
+def time_once(func, repeat=5, min_seconds=0.05):
+    """
+    Best time of one call, calling often enough to time `min_seconds`
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        total = timer.timeit(number)
+        if total >= min_seconds or number >= 1 << 20:
+            break
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+class Result(object):
+    def __init__(self, case, times, exponent, tolerance):
+        self.case = case
+        self.times = times
+        self.exponent = exponent
+        self.failed = exponent > case.bound + tolerance
+
+
+def check(case, repeat=5, tolerance=0.3):
+    times = [time_once(case.setup(size), repeat) for size in case.sizes]
+    return Result(case, times, fit_exponent(case.sizes, times), tolerance)
+
+
+#
+# Cases
+#
+
+def nested(depth, leaf=None):
+    obj = leaf
+    for _ in range(depth):
+        obj = {"a": obj}
+    return obj
+
+
+def deep_scope(depth):
+    return "/" + "/".join(["a"] * depth)
+
+
+@case("select/depth", [10, 20, 40, 80], bound=1)
+def select_depth(depth):
+    partial = Partial.from_obj(nested(depth, 5))
+    scope = deep_scope(depth)
+    return lambda: partial.select(scope)
+
+
+@case("root/depth", [10, 20, 40, 80], bound=1)
+def root_depth(depth):
+    _, partial = Partial.from_obj(nested(depth, 5)).select(deep_scope(depth))
+    return lambda: partial.root
+
+
+@case("set_value/width", [100, 200, 400, 800], bound=1)
+def set_value_width(width):
+    obj = {"k{}".format(i): i for i in range(width)}
+    partial = Partial.from_obj(obj)
+
+    def set_and_root():
+        _, new_partial = partial.set_value(-1, selector="/k0")
+        return new_partial.root
+    return set_and_root
+
+
+@case("choose/list_length", [100, 200, 400, 800], bound=1)
+def choose_list_length(length):
+    partial = Partial.from_obj({"list": list(range(length))})
+
+    def choose_and_reconstruct():
+        _, new_partial = partial.select("/list/0")
+        return new_partial.root
+    return choose_and_reconstruct
+
+
+@case("append_value/list_length", [100, 200, 400, 800], bound=1)
+def append_value_list_length(length):
+    _, partial = Partial.from_obj(
+        {"list": list(range(length))}
+    ).select("/list")
+    rule = operators.append_value(-1)
+    return lambda: rule.run(partial)
+
+
+@case("each/width", [10, 20, 40, 80], bound=1)
+def each_width(width):
+    ctx = Context()
+    ctx.select("/items").each().require()
+    rule = ctx.finalize()
+    obj = {"items": list(range(1, width + 1))}
+    return lambda: run_policy(rule, copy.deepcopy(obj))
+
+
+@case("forks/fork_count", [10, 20, 40, 80], bound=1)
+def forks_fork_count(count):
+    _, partial = Partial.from_obj({}).select("/choice")
+    rule = operators.permit_values(list(range(count)))
+    return lambda: rule.run(partial)
+
+
+# "/errors" is appended to in constant time, and each error copies the
+# frames of its context
+@case("errors/error_count", [2, 4, 8, 16], bound=1)
+def errors_error_count(count):
+    ctx = Context()
+    for i in range(count):
+        ctx.select("/missing/f{}".format(i)).require()
+    rule = ctx.finalize()
+    return lambda: run_policy(rule, {})
+
+
+def get_cases(names=None):
+    if not names:
+        return list(CASES)
+    by_name = {c.name: c for c in CASES}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise KeyError("Unknown cases: {}".format(", ".join(unknown)))
+    return [by_name[name] for name in names]
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.scaling")
+    parser.add_argument(
+        "cases", nargs="*", metavar="case", help="cases to run (default: all)"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    failed = False
+    print("{:<26} {:>8} {:>6}  {}".format("case", "exponent", "bound", ""))
+    for scaling_case in get_cases(args.cases):
+        result = check(scaling_case, args.repeat, args.tolerance)
+        failed = failed or result.failed
+        print("{:<26} {:>8.2f} {:>6}  {}".format(
+            scaling_case.name, result.exponent, scaling_case.bound,
+            "FAILED" if result.failed else "ok",
+        ))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
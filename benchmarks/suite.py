@@ -0,0 +1,230 @@
+"""
+Macro benchmarks of policy evaluation (see `benchmarks.workloads`).
+
+For each workload, reports the best and median wall time per call and,
+where `tracemalloc` is available (Python 3), the peak memory allocated
+during one call and the memory blocks still allocated after it.
+
+Results can be saved as a JSON baseline and compared against later, e.g.
+across commits:
+
+    python -m benchmarks.suite --save before.json
+    git checkout some-branch
+    python -m benchmarks.suite --compare before.json
+
+Comparing exits with status 1 if any workload got slower, or peaked
+higher, by more than `--threshold` (a fraction, 0.1 by default).
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from calcifer._version import __version__
+
+from benchmarks.workloads import get_workloads
+
+
+class Measurement(object):
+    __slots__ = ('name', 'seconds', 'median_seconds', 'peak_kib', 'blocks')
+
+    def __init__(self, name, seconds, median_seconds,
+                 peak_kib=None, blocks=None):
+        self.name = name
+        self.seconds = seconds
+        self.median_seconds = median_seconds
+        self.peak_kib = peak_kib
+        self.blocks = blocks
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    @staticmethod
+    def from_dict(values):
+        return Measurement(**values)
+
+
+def time_calls(func, repeat, number):
+    timer = timeit.Timer(func)
+    times = sorted(
+        total / number for total in timer.repeat(repeat=repeat, number=number)
+    )
+    return times[0], times[len(times) // 2]
+
+
+def trace_memory(func):
+    """
+    Returns (peak KiB above the starting size, blocks still allocated) for
+    one call, or (None, None) without tracemalloc
+    """
+    if tracemalloc is None:
+        return None, None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        start, _ = tracemalloc.get_traced_memory()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, 'filename')
+    )
+    return (peak - start) / 1024.0, blocks
+
+
+def measure(workload, repeat=5, number=None):
+    func = workload.setup()
+    func()  # warm up
+    if number is None:
+        # enough calls for about 0.2 seconds per repeat
+        once, _ = time_calls(func, 1, 1)
+        number = max(1, int(0.2 / max(once, 1e-6)))
+    seconds, median_seconds = time_calls(func, repeat, number)
+    peak_kib, blocks = trace_memory(func)
+    return Measurement(
+        workload.name, seconds, median_seconds, peak_kib, blocks
+    )
+
+
+def git_revision():
+    try:
+        with open("/dev/null", "w") as devnull:
+            return subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=devnull
+            ).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(path, measurements):
+    baseline = {
+        "calcifer_version": __version__,
+        "python": platform.python_version(),
+        "revision": git_revision(),
+        "results": [measurement.to_dict() for measurement in measurements],
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    return {
+        values["name"]: Measurement.from_dict(values)
+        for values in baseline["results"]
+    }
+
+
+def ratio(value, baseline_value):
+    if value is None or not baseline_value:
+        return None
+    return value / float(baseline_value)
+
+
+def compare(measurements, baseline, threshold):
+    """
+    Returns a list of `(measurement, time ratio, peak ratio, regressed)`
+    for the measurements that are in `baseline`
+    """
+    comparisons = []
+    for measurement in measurements:
+        previous = baseline.get(measurement.name)
+        if previous is None:
+            continue
+        time_ratio = ratio(measurement.seconds, previous.seconds)
+        peak_ratio = ratio(measurement.peak_kib, previous.peak_kib)
+        regressed = any(
+            value is not None and value > 1 + threshold
+            for value in (time_ratio, peak_ratio)
+        )
+        comparisons.append((measurement, time_ratio, peak_ratio, regressed))
+    return comparisons
+
+
+def format_optional(value, fmt):
+    if value is None:
+        return "-"
+    return fmt.format(value)
+
+
+def print_measurements(measurements):
+    print("{:<18} {:>12} {:>12} {:>11} {:>9}".format(
+        "workload", "best ms", "median ms", "peak KiB", "blocks"
+    ))
+    for measurement in measurements:
+        print("{:<18} {:>12.3f} {:>12.3f} {:>11} {:>9}".format(
+            measurement.name,
+            measurement.seconds * 1000,
+            measurement.median_seconds * 1000,
+            format_optional(measurement.peak_kib, "{:.1f}"),
+            format_optional(measurement.blocks, "{:d}"),
+        ))
+
+
+def print_comparisons(comparisons):
+    print("{:<18} {:>10} {:>10}".format("workload", "time", "peak"))
+    for measurement, time_ratio, peak_ratio, regressed in comparisons:
+        print("{:<18} {:>10} {:>10}{}".format(
+            measurement.name,
+            format_optional(time_ratio, "{:.2f}x"),
+            format_optional(peak_ratio, "{:.2f}x"),
+            "  REGRESSED" if regressed else "",
+        ))
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument(
+        "workloads", nargs="*", metavar="workload",
+        help="workloads to run (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--number", type=int, default=None,
+        help="calls per repeat (default: about 0.2s worth)",
+    )
+    parser.add_argument("--save", metavar="FILE", help="save a baseline")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="compare against a baseline"
+    )
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    measurements = []
+    for workload in get_workloads(args.workloads):
+        measurements.append(
+            measure(workload, repeat=args.repeat, number=args.number)
+        )
+    print_measurements(measurements)
+
+    if args.save:
+        save_baseline(args.save, measurements)
+
+    if args.compare:
+        comparisons = compare(
+            measurements, load_baseline(args.compare), args.threshold
+        )
+        print()
+        print_comparisons(comparisons)
+        if any(regressed for _, _, _, regressed in comparisons):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
@@ -0,0 +1,199 @@
+"""
+Representative policy workloads for `benchmarks.suite`.
+
+Each workload is set up once (policies defined, rules finalized, payloads
+built) and returns the function that is timed, which goes through one of
+the real entry points: `BasePolicy.run`, `calcifer.utils.run_policy` or
+`Context.finalize`.
+"""
+# pylint: disable=no-self-argument
+import copy
+
+from calcifer.contexts import Context
+from calcifer.policy import DefaultPolicy
+from calcifer.utils import run_policy
+
+
+WORKLOADS = []
+
+
+class Workload(object):
+    def __init__(self, name, setup, description):
+        self.name = name
+        self.setup = setup
+        self.description = description
+
+    def __repr__(self):
+        return "<Workload {}>".format(self.name)
+
+
+def workload(name):
+    """
+    Registers a setup function, returning the function to time, as a
+    workload
+    """
+    def decorator(setup):
+        WORKLOADS.append(Workload(name, setup, (setup.__doc__ or "").strip()))
+        return setup
+    return decorator
+
+
+def get_workloads(names=None):
+    if not names:
+        return list(WORKLOADS)
+    by_name = {w.name: w for w in WORKLOADS}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise KeyError("Unknown workloads: {}".format(", ".join(unknown)))
+    return [by_name[name] for name in names]
+
+
+# sizes
+WIDE_FIELDS = 100
+DEEP_GROUPS = 5
+DEEP_ITEMS = 5
+DEEP_TAGS = 4
+FANOUT_FIELDS = 4
+FANOUT_CHOICES = ["a", "b", "c"]
+MISSING_FIELDS = 20
+
+
+class Subscriptions(object):
+    class Policy(DefaultPolicy):
+        defaults = {"errors": [], "context": []}
+
+    @Policy
+    def account(ctx):
+        user_ctx = ctx.select("/user")
+        user_ctx.select("id").require()
+        user_ctx.select("email").require()
+
+    @Policy
+    def plan(ctx):
+        ctx.select("/plan").whitelist_values(["free", "basic", "premium"])
+
+    @Policy
+    def billing(ctx):
+        billing_ctx = ctx.select("/billing")
+        billing_ctx.select("card").require()
+        billing_ctx.select("country").whitelist_values(["US", "CA", "GB"])
+
+    @Policy(includes=['account', 'plan', 'billing'])
+    def subscribe(ctx):
+        ctx.select("/subscription/status").set_value("active")
+        plan_ctx = ctx.select("/plan")
+        plan_ctx.select("/subscription/plan").set_value(plan_ctx.value)
+
+
+SUBSCRIBE_REQUEST = {
+    "user": {"id": 5, "email": "someone@example.com"},
+    "plan": "basic",
+    "billing": {"card": "4111", "country": "US"},
+}
+
+
+@workload("endpoint")
+def endpoint():
+    """
+    Subscription endpoint: a policy with three includes, through
+    `BasePolicy.run`
+    """
+    policy = Subscriptions().subscribe
+
+    def run():
+        return policy.run(copy.deepcopy(SUBSCRIBE_REQUEST))
+    return run
+
+
+def wide_context():
+    ctx = Context()
+    for i in range(WIDE_FIELDS):
+        ctx.select("/fields/f{}".format(i)).require()
+    return ctx
+
+
+@workload("wide_payload")
+def wide_payload():
+    """
+    Validation of a payload with many fields, through `run_policy`
+    """
+    rule = wide_context().finalize()
+    obj = {
+        "fields": {"f{}".format(i): i + 1 for i in range(WIDE_FIELDS)}
+    }
+
+    def run():
+        return run_policy(rule, copy.deepcopy(obj))
+    return run
+
+
+@workload("deep_each")
+def deep_each():
+    """
+    Three levels of nested `each()` over groups, items and tags
+    """
+    ctx = Context()
+    groups_ctx = ctx.select("/groups").each()
+    items_ctx = groups_ctx.select("items").each()
+    items_ctx.select("name").require()
+    items_ctx.select("tags").each().require()
+    rule = ctx.finalize()
+
+    obj = {
+        "groups": [
+            {
+                "items": [
+                    {
+                        "name": "item {}".format(j),
+                        "tags": ["tag {}".format(k) for k in range(DEEP_TAGS)],
+                    }
+                    for j in range(DEEP_ITEMS)
+                ]
+            }
+            for _ in range(DEEP_GROUPS)
+        ]
+    }
+
+    def run():
+        return run_policy(rule, copy.deepcopy(obj))
+    return run
+
+
+@workload("whitelist_fanout")
+def whitelist_fanout():
+    """
+    Whitelists on missing values, forking once per choice per field
+    """
+    ctx = Context()
+    for i in range(FANOUT_FIELDS):
+        ctx.select("/f{}".format(i)).whitelist_values(FANOUT_CHOICES)
+    rule = ctx.finalize()
+
+    def run():
+        return run_policy(rule, {})
+    return run
+
+
+@workload("error_heavy")
+def error_heavy():
+    """
+    `require()` failing on every field, building an error for each
+    """
+    ctx = Context()
+    for i in range(MISSING_FIELDS):
+        ctx.select("/missing/f{}".format(i)).require()
+    rule = ctx.finalize()
+
+    def run():
+        return run_policy(rule, {})
+    return run
+
+
+@workload("finalize")
+def finalize():
+    """
+    Building and finalizing the wide payload's Context
+    """
+    def run():
+        return wide_context().finalize()
+    return run
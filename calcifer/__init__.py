@@ -10,42 +10,93 @@ manipulation of a "Policy Partial" data structure to be used in validation and
 template generation. The operators are designed to provide flexible
 tooling for the creation of high-level policy rules.
 """
-from calcifer.contexts import Context
-from calcifer.operators import (
-    attempt,
-    append_value,
-    catch_attempt,
-    check,
-    children,
-    collect,
-    define_as,
-    each,
-    fail,
-    forbid_value,
-    get_node,
-    get_value,
-    match,
-    permit_values,
-    policies,
-    pop_value,
-    pop_context,
-    push_context,
-    regarding,
-    require_value,
-    scope,
-    select,
-    set_value,
-    trace,
-    unit,
-    unit_value,
-    unless_errors,
-    wrap_context,
-)
-from calcifer.partial import Partial, Zipper
-from calcifer.monads import (
-    PolicyRule, PolicyRuleFunc, policy_rule, policy_rule_func,
-)
-from calcifer.policy import BasePolicy
-from calcifer.policy import DefaultPolicy as Policy
+import importlib
+import sys
 
 from calcifer._version import __version__
+
+# public names, by the module they are defined in. They are imported when
+# first used (on Python 3.7+), so that importing calcifer, or one of its
+# modules, does not import everything else.
+_EXPORTS = {
+    'calcifer.contexts': ('Context',),
+    'calcifer.operators': (
+        'attempt',
+        'append_error',
+        'append_value',
+        'catch_attempt',
+        'check',
+        'checkpoints',
+        'children',
+        'collect',
+        'define_as',
+        'each',
+        'fail',
+        'forbid_value',
+        'get_node',
+        'get_value',
+        'last_error_scope',
+        'match',
+        'permit_values',
+        'policies',
+        'pop_value',
+        'pop_context',
+        'push_context',
+        'regarding',
+        'require_value',
+        'scope',
+        'select',
+        'set_value',
+        'trace',
+        'unit',
+        'unit_value',
+        'unless_errors',
+        'wrap_context',
+    ),
+    'calcifer.partial': ('Partial', 'Zipper'),
+    'calcifer.monads': (
+        'PolicyRule', 'PolicyRuleFunc', 'policy_rule', 'policy_rule_func',
+    ),
+    'calcifer.policy': ('BasePolicy', 'Policy'),
+}
+
+# exported names that differ from the name in their module
+_ALIASES = {
+    'Policy': 'DefaultPolicy',
+}
+
+_MODULES = {
+    name: module for module, names in _EXPORTS.items() for name in names
+}
+
+__all__ = sorted(_MODULES) + ['__version__']
+
+
+def _load(name):
+    module = importlib.import_module(_MODULES[name])
+    value = getattr(module, _ALIASES.get(name, name))
+    globals()[name] = value
+    return value
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _MODULES:
+            return _load(name)
+        module_name = 'calcifer.' + name
+        try:
+            # submodules not imported yet, e.g. `calcifer.operators`
+            return importlib.import_module(module_name)
+        except ImportError as e:
+            if e.name != module_name:
+                raise
+        raise AttributeError(
+            "module 'calcifer' has no attribute '{}'".format(name)
+        )
+
+    def __dir__():
+        return sorted(set(globals()) | set(_MODULES))
+else:
+    for _name in _MODULES:
+        _load(_name)
+    del _name
@@ -0,0 +1,408 @@
+"""
+`calcifer.analysis` module
+
+Static analysis of the scopes policy rules read and write.
+
+`analyze(rule)` walks a finalized policy rule's AST, following the selectors
+given to `regarding`, `select` and `each`, and returns an Analysis with a
+conservative Access (a read set and a write set of absolute scopes) for the
+rule and for every subtree of its AST.
+
+Scopes are strings like "/items/*/name", where "*" stands for any child
+(as visited by `each`). A scope is read or written along with everything
+beneath it. Where a selector or a rule is not known statically, e.g. a
+selector that comes from `ctx.value` or a rule func that is a plain Python
+function, the set holds UNKNOWN instead, meaning "possibly any scope".
+
+Rule funcs that depend on a contextual value (deferred by the Context that
+made them) and rule funcs marked `pure` are called with the DYNAMIC
+placeholder to find out what rule they build. Anything they would select
+from the value itself is then unknown.
+
+"/errors" and "/context" are reported like any other scope.
+"""
+import logging
+import posixpath
+
+from six import string_types
+
+from calcifer import asts
+from calcifer.contexts.base import ContextFrame, Incomplete
+from calcifer.monads import BasePolicyRule
+
+logger = logging.getLogger(__name__)
+
+
+class _Unknown(object):
+    def __repr__(self):
+        return "UNKNOWN"
+
+
+class _Dynamic(object):
+    """
+    Indexing or calling a dynamic value gives a dynamic value, so that simple
+    functions of contextual values (e.g. `lambda errors: errors[-1]`) can be
+    followed. Anything else raises, and the rule is then unknown.
+    """
+    def __getitem__(self, key):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __iter__(self):
+        # its length is not known either
+        raise TypeError("Dynamic values cannot be iterated")
+
+    def __repr__(self):
+        return "DYNAMIC"
+
+
+# a scope that cannot be known statically
+UNKNOWN = _Unknown()
+
+# placeholder for contextual values, passed to rule funcs during analysis
+DYNAMIC = _Dynamic()
+
+
+def join(scope, selector):
+    """
+    Returns the absolute scope for `selector` from `scope`, or None if
+    either is not known
+    """
+    if not isinstance(selector, string_types):
+        return None
+    if selector == "":
+        return scope
+    if selector[0] != "/":
+        if scope is None:
+            return None
+        selector = posixpath.join(scope, selector)
+    return posixpath.normpath(selector).replace("//", "/")
+
+
+def overlaps(scope, other):
+    """
+    Whether two scopes may refer to the same node, or one to a node beneath
+    the other
+    """
+    if scope is UNKNOWN or other is UNKNOWN:
+        return True
+    steps = [step for step in scope.split("/") if step]
+    other_steps = [step for step in other.split("/") if step]
+    return all(
+        step == other_step or "*" in (step, other_step)
+        for step, other_step in zip(steps, other_steps)
+    )
+
+
+class Access(object):
+    """
+    The scopes a rule reads and writes
+    """
+    __slots__ = ('reads', 'writes')
+
+    def __init__(self, reads=(), writes=()):
+        self.reads = frozenset(reads)
+        self.writes = frozenset(writes)
+
+    def __or__(self, other):
+        return Access(self.reads | other.reads, self.writes | other.writes)
+
+    @property
+    def unknown(self):
+        return UNKNOWN in self.reads or UNKNOWN in self.writes
+
+    def conflicts(self, other):
+        """
+        Whether either of two rules may write something the other reads or
+        writes, i.e. whether running them in either order may differ
+        """
+        return any(
+            overlaps(write, scope)
+            for write in self.writes
+            for scope in other.reads | other.writes
+        ) or any(
+            overlaps(write, scope)
+            for write in other.writes
+            for scope in self.reads
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Access) and
+            self.reads == other.reads and
+            self.writes == other.writes
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        def show(scopes):
+            return sorted(repr(scope) for scope in scopes)
+        return "Access(reads={}, writes={})".format(
+            show(self.reads), show(self.writes)
+        )
+
+
+NOTHING = Access()
+
+
+def at(scope):
+    if scope is None:
+        return UNKNOWN
+    return scope
+
+
+# operators by the scopes they touch at the current scope, other than
+# through the rules they are given
+READS_SCOPE = frozenset([
+    'children', 'forbid_value', 'get_node', 'get_value', 'require_value',
+])
+READS_AND_WRITES_SCOPE = frozenset([
+    'append_value', 'define_as', 'match', 'permit_values', 'pop_value',
+])
+WRITES_SCOPE = frozenset(['set_value'])
+COMBINATORS = frozenset([
+    'attempt', 'catch_attempt', 'checkpoints', 'collect', 'policies',
+])
+NO_ACCESS = frozenset(['check', 'fail', 'scope', 'unit', 'unit_value'])
+
+ERROR_SCOPE = "/errors/*"
+
+
+def received_value(node):
+    """
+    The value a rule passes on to the rule func bound after it: for
+    `receive_args` (see `calcifer.contexts.base.ctx_apply`), its tuple of
+    values with every provided value dynamic
+    """
+    if (
+            isinstance(node, asts.PolicyRuleFuncCall) and
+            getattr(node.func, 'name', None) == 'receive_args'
+    ):
+        values, indexed_rules = node.args
+        values = list(values)
+        for positions, _ in indexed_rules:
+            for idx in positions:
+                values[idx] = DYNAMIC
+        return tuple(values)
+    return DYNAMIC
+
+
+class Analysis(object):
+    """
+    Accesses for a rule and every AST node beneath it.
+
+    `access` is the Access of the whole rule; `accesses` lists
+    `(node, scope, access)` for each AST node visited, with the scope it was
+    visited at.
+    """
+    def __init__(self, rule, scope="/"):
+        self.accesses = []
+        self._seen = {}
+        self.access = self.visit_value(rule, scope)
+
+    def record(self, node, scope, access):
+        self.accesses.append((node, scope, access))
+        return access
+
+    def visit_value(self, value, scope):
+        """
+        Access of anything that may be given to an operator as a rule
+        """
+        if isinstance(value, BasePolicyRule):
+            value = value.ast
+        if isinstance(value, asts.Node):
+            access, _ = self.visit(value, scope)
+            return access
+        if isinstance(value, (list, tuple)):
+            access = NOTHING
+            for item in value:
+                access = access | self.visit_value(item, scope)
+            return access
+        if isinstance(value, Incomplete):
+            # still waiting on some contextual value
+            return Access([UNKNOWN], [UNKNOWN])
+        if isinstance(value, ContextFrame):
+            # error handlers are run on the error they handle (see
+            # `Context.or_error`)
+            return self.visit_value(value.error_handler, ERROR_SCOPE)
+        if callable(value):
+            return self.visit_rule_func(value, scope)
+        return NOTHING
+
+    def visit(self, node, scope):
+        """
+        Returns (access, scope after) for an AST node
+        """
+        key = (id(node), scope)
+        if key in self._seen:
+            return self._seen[key]
+
+        if isinstance(node, asts.Binding):
+            access = NOTHING
+            scope_after = scope
+            received = DYNAMIC
+            for operand in node.operands:
+                if isinstance(operand, asts.PolicyRuleFunc):
+                    operand_access, scope_after = self.visit_bound_rule_func(
+                        operand, scope_after, received
+                    )
+                    self.record(operand, scope, operand_access)
+                else:
+                    operand_access, scope_after = self.visit(
+                        operand, scope_after
+                    )
+                access = access | operand_access
+                received = received_value(operand)
+        elif isinstance(node, asts.PolicyRuleFuncCall):
+            visited = self.visit_call(node, scope)
+            if visited is not None:
+                access, scope_after = visited
+            elif node.result is not None:
+                # not an operator; look at the rule it returned instead
+                access, scope_after = self.visit(node.result, scope)
+            else:
+                logger.debug("Unknown operator %r", node.func)
+                access, scope_after = Access([UNKNOWN], [UNKNOWN]), None
+        elif isinstance(node, asts.PolicyRuleFunc):
+            # bound to some value at runtime
+            access, scope_after = self.visit_bound_rule_func(node, scope)
+        else:
+            access, scope_after = NOTHING, scope
+
+        self._seen[key] = (access, scope_after)
+        self.record(node, scope, access)
+        return access, scope_after
+
+    def visit_rule_func(self, rule_func, scope, value=DYNAMIC):
+        """
+        Access of a rule func, called with some value at runtime
+        """
+        func = getattr(rule_func, 'rule_func', rule_func)
+        if (
+                getattr(func, 'deferred_plan', None) is not None or
+                getattr(func, 'pure', False) or
+                getattr(rule_func, 'pure', False)
+        ):
+            try:
+                rule = rule_func(value)
+            except Exception:  # pylint: disable=broad-except
+                logger.debug("Could not build rule from %r", rule_func)
+            else:
+                return self.visit_value(rule, scope)
+
+        name = getattr(rule_func, 'rule_func_name', None)
+        if name in READS_SCOPE | READS_AND_WRITES_SCOPE | WRITES_SCOPE:
+            return self.operator_access(name, scope)
+        return Access([UNKNOWN], [UNKNOWN])
+
+    def visit_bound_rule_func(self, node, scope, value=DYNAMIC):
+        rule_func = node.rule_func
+        if rule_func is None:
+            return Access([UNKNOWN], [UNKNOWN]), None
+        if getattr(rule_func, 'operands', None) is not None:
+            return self.operands_access(rule_func.operands, scope), scope
+        access = self.visit_rule_func(rule_func, scope, value)
+        if access.unknown:
+            return access, None
+        return access, scope
+
+    @staticmethod
+    def operator_access(name, scope):
+        if name in READS_SCOPE:
+            return Access([at(scope)])
+        if name in WRITES_SCOPE:
+            return Access((), [at(scope)])
+        return Access([at(scope)], [at(scope)])
+
+    def operands_access(self, operands, scope):
+        """
+        Access of a rule func made by a combinator (see `operands` in
+        `calcifer.operators`)
+        """
+        name, rules = operands
+        if name == 'each':
+            return self.each_access(rules, scope)
+        return self.visit_value(rules, scope)
+
+    def each_access(self, rules, scope):
+        children_scope = join(scope, "*")
+        access = Access([at(scope)])
+        for rule in rules:
+            access = access | self.visit_value(rule, children_scope)
+        return access
+
+    def visit_call(self, node, scope):  # pylint: disable=too-many-return-statements
+        """
+        Returns (access, scope after) for a call to a known operator, or None
+        """
+        func = node.func
+        rule_func = getattr(func, 'rule_func', None)
+        name = getattr(rule_func, 'rule_func_name', getattr(func, 'name', None))
+        args = node.args
+
+        if getattr(rule_func, 'operands', None) is not None:
+            # a combinator's rule func, called with the value it receives
+            return self.operands_access(rule_func.operands, scope), scope
+
+        if name == 'regarding':
+            new_scope = join(scope, args[0])
+            access = Access([at(new_scope)])
+            for arg in args[1:]:
+                access = access | self.visit_value(arg, new_scope)
+            return access, scope
+
+        if name == 'select':
+            new_scope = join(scope, args[0])
+            scope_after = scope
+            if node.kwargs.get('set_path', args[1] if len(args) > 1 else False):
+                scope_after = new_scope
+            return Access([at(new_scope)]), scope_after
+
+        if name in ('push_context', 'pop_context'):
+            return Access(["/context"], ["/context"]), scope
+
+        if name == 'wrap_context':
+            access = Access(["/context"], ["/context"])
+            return access | self.visit_value(args, scope), scope
+
+        if name == 'append_error':
+            # appending does not read the errors already there
+            return Access((), ["/errors"]), scope
+
+        if name == 'last_error_scope':
+            return Access(["/errors"]), scope
+
+        if name == 'unless_errors':
+            return Access(["/errors"]) | self.visit_value(args, scope), scope
+
+        if name == 'trace':
+            access = Access([at(scope), "/context"])
+            return access | self.visit_value(args, scope), scope
+
+        if name == 'each':
+            return self.each_access(args, scope), scope
+
+        if name == 'receive_args':
+            _, indexed_rules = args
+            return self.visit_value(
+                [rule for _, rule in indexed_rules], scope
+            ), scope
+
+        if name in COMBINATORS:
+            return self.visit_value(args, scope), scope
+
+        if name in NO_ACCESS:
+            return NOTHING, scope
+
+        if name in READS_SCOPE | READS_AND_WRITES_SCOPE | WRITES_SCOPE:
+            return self.operator_access(name, scope), scope
+
+        return None
+
+
+def analyze(rule, scope="/"):
+    return Analysis(rule, scope)
@@ -1,8 +1,7 @@
 from abc import ABCMeta
-import collections
 import copy
 import re
-from six import string_types
+from six.moves import intern  # pylint: disable=redefined-builtin
 
 
 def get_call_repr(func_name, *args, **kwargs):
@@ -20,8 +19,13 @@ def get_call_repr(func_name, *args, **kwargs):
     return call_expr
 
 
+# operator names that can be called without parentheses in reprs
+IDENTIFIER = re.compile(r"^[^\d\W]\w*\Z", re.UNICODE)
+
+
 class Node:
     __metaclass__ = ABCMeta
+    __slots__ = ()
 
     def __new__(cls, *operands):
         return super(Node, cls).__new__(cls)
@@ -30,39 +34,70 @@ class Node:
         return copy.copy(self)
 
 
-def flatten(l):
-    for el in l:
-        if isinstance(el, collections.Iterable) and not isinstance(el, string_types):
-            for sub in flatten(el):
-                yield sub
-        else:
-            yield el
-
-
 class Binding(Node):
-    def __new__(cls, *operands):
-        operands = flatten([
-            operand if not isinstance(operand, cls) else operand.operands
-            for operand in operands
-        ])
-        return super(Binding, cls).__new__(cls, operands)
+    """
+    `left >> right`, kept as a tree: binding onto a chain shares the
+    chain's nodes instead of copying them. The flat sequence of operands is
+    only built when read (see `leaves`), and reprs are cached.
+    """
+    __slots__ = ('operands', '_repr')
 
     def __init__(self, *operands):
         self.operands = operands
+        self._repr = None
+
+    def leaves(self):
+        """
+        Yields the operands of the whole chain that are not bindings, in
+        order
+        """
+        stack = [iter(self.operands)]
+        while stack:
+            for operand in stack[-1]:
+                if isinstance(operand, Binding):
+                    stack.append(iter(operand.operands))
+                    break
+                yield operand
+            else:
+                stack.pop()
 
     def __repr__(self):
-        return " >> ".join([repr(operand) for operand in self.operands])
+        if self._repr is not None:
+            return self._repr
+
+        # iteratively, as chains can be deeper than the recursion limit;
+        # the cached reprs of sub-chains are reused
+        parts = []
+        stack = [iter(self.operands)]
+        while stack:
+            for operand in stack[-1]:
+                if isinstance(operand, Binding) and operand._repr is None:
+                    stack.append(iter(operand.operands))
+                    break
+                parts.append(repr(operand))
+            else:
+                stack.pop()
+        self._repr = " >> ".join(parts)
+        return self._repr
 
 
 class PolicyRuleFunc(Node):
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ('name', 'rule_func')
+
+    def __init__(self, name, rule_func=None):
+        # names repeat across rule funcs (e.g. for lambdas, or operators
+        # built per call)
+        self.name = intern(name) if isinstance(name, str) else name
+        # the rule func itself, for analysis (see `calcifer.analysis`)
+        self.rule_func = rule_func
 
     def __repr__(self):
         return self.name
 
 
 class PolicyRuleFuncCall(Node):
+    __slots__ = ('func', 'args', 'kwargs', 'result', '_repr')
+
     def __init__(self, func, args, kwargs, result=None):
         self.func = func
         self.args = [
@@ -74,24 +109,25 @@ class PolicyRuleFuncCall(Node):
             for k, v in kwargs.items()
         }
         self.result = result
+        self._repr = None
 
     def with_result(self, result):
-        return PolicyRuleFuncCall(
-            self.func,
-            self.args,
-            self.kwargs,
-            result
-        )
+        # a copy shares the converted arguments and the cached repr
+        call = copy.copy(self)
+        call.result = result
+        return call
 
     def __repr__(self):
+        if self._repr is not None:
+            return self._repr
+
         if isinstance(self.func, Node):
             func_name = repr(self.func)
         else:
             func_name = self.func
 
-        identifier = re.compile(r"^[^\d\W]\w*\Z", re.UNICODE)
-
-        if not re.match(identifier, func_name):
+        if not IDENTIFIER.match(func_name):
             func_name = "({})".format(func_name)
 
-        return get_call_repr(func_name, *self.args, **self.kwargs)
+        self._repr = get_call_repr(func_name, *self.args, **self.kwargs)
+        return self._repr
@@ -1,14 +1,17 @@
-import copy
 import functools
 import logging
+from six import string_types
 
 from calcifer.operators import (
     wrap_context, catch_attempt, trace, collect, unit, policies, regarding,
-    fail, args_receiver,
+    fail, receive_args,
 )
 from calcifer.monads import (
-    PolicyRule, PolicyRuleFunc, get_call_repr,
+    PolicyRule, PolicyRuleFunc,
 )
+from calcifer import memo
+from calcifer.contexts.optimizer import Optimizer
+from calcifer.memo import make_hash  # pylint: disable=unused-import
 
 logger = logging.getLogger(__name__)
 
@@ -17,36 +20,40 @@ def ctx_apply(f, ctx_args):
     """
     Creates a promise to call `f` with some values corresponding to
     the contextual values (or regular values) in `ctx_args`
+
+    Identical value providers (the same Context, or the same policy rule)
+    are finalized once and run once per branch, with the result shared by
+    every argument position they appear in.
     """
     if not ctx_args:
         return f
 
     values = []
-    missing = set([])
+    finalized = {}
+    positions = {}
+    providers = []
     for idx, arg in enumerate(ctx_args):
         if hasattr(arg, 'finalize'):
-            arg = arg.finalize()
+            if id(arg) not in finalized:
+                finalized[id(arg)] = arg.finalize()
+            arg = finalized[id(arg)]
 
         if hasattr(arg, 'bind'):
             values.append(None)
-            missing.add((idx, arg))
+            if id(arg) not in positions:
+                positions[id(arg)] = []
+                providers.append(arg)
+            positions[id(arg)].append(idx)
             continue
 
         values.append(arg)
 
-    if not missing:
+    if not providers:
         return f(*values)
 
-    receive = args_receiver(values)
-
-    apply_rule = None
-    for idx, policy_rule in missing:
-        step = receive(idx, policy_rule)
-
-        if apply_rule is None:
-            apply_rule = step
-        else:
-            apply_rule = apply_rule >> step
+    indexed_providers = tuple(
+        (tuple(positions[id(provider)]), provider) for provider in providers
+    )
 
     if hasattr(f, 'rule_func'):
         wrapped_func = f.rule_func
@@ -54,10 +61,10 @@ def ctx_apply(f, ctx_args):
         wrapped_func = f
 
     @functools.wraps(wrapped_func)
-    def finish(_):
-        return f(*values)
+    def finish(true_values):
+        return f(*true_values)
 
-    return apply_rule >> finish
+    return receive_args(tuple(values), indexed_providers) >> finish
 
 
 def wrap_ctx_values(action, args):
@@ -65,59 +72,19 @@ def wrap_ctx_values(action, args):
     Run some function `action` on args that may be ContextualValues
     (Values provided by a Context's wrapper)
     """
-    missing_args = get_missing(args)
-    if missing_args:
-        return make_incomplete(
-            action,
-            args,
-            missing_args
-        )
+    plan = ArgumentPlan(action, args)
+    if plan.slots:
+        return Incomplete(plan)
 
     return action(args)
 
 
-def get_missing(args):
-    """
-    Determine which args are missing obtainable values
-    """
-    missing_args = set()
-    for arg in args:
-        if isinstance(arg, ContextualValue):
-            missing_args.add(arg)
-        if isinstance(arg, Incomplete):
-            missing_args.update(arg.missing)
-
-    return missing_args
-
-
-def make_incomplete(f, args_, missing_args):
+def make_incomplete(f, args_):
     """
-    Make a function that takes a dictionary of {ctx_value: true_value}s
-    and maps to f(*args) in the right order.
+    Make an Incomplete that maps its contextual values to f(*args) in the
+    right order.
     """
-    @functools.wraps(f)
-    def complete(true_values):
-        args = []
-        for arg in args_:
-            if isinstance(arg, ContextualValue):
-                args.append(true_values[arg])
-            elif isinstance(arg, Incomplete):
-                got = {
-                    ctx_value: true_values[ctx_value]
-                    for ctx_value in arg.missing
-                }
-                args.append(arg.complete(got))
-            else:
-                args.append(arg)
-
-        return f(tuple(args))
-
-    incomplete = Incomplete(
-        func=complete,
-        missing=missing_args
-    )
-
-    return incomplete
+    return Incomplete(ArgumentPlan(f, args_))
 
 
 class ContextualValue(object):
@@ -146,29 +113,165 @@ class ContextualValue(object):
         return not(self == other)
 
 
-class Incomplete(object):
-    def __init__(self, func, missing, got=None):
-        self.missing = missing
-        if got is None:
-            got = {}
-        self.got = got
+class _Unfilled(object):
+    def __repr__(self):
+        return "UNFILLED"
+
+
+UNFILLED = _Unfilled()
+
+# argument sources for ArgumentPlan
+CONSTANT, SLOT, NESTED = range(3)
+
+
+class ArgumentPlan(object):
+    """
+    A deferred call `func(args)`, compiled once when the call is made
+    during policy building.
+
+    Each distinct ContextualValue among `args` (or among the missing values
+    of any Incomplete in `args`) is assigned a fixed slot index, in order of
+    first appearance. Each argument then records where its true value comes
+    from: a constant, a slot, or a nested Incomplete together with the slots
+    that feed it. Resolving the call is a single pass over these sources.
+    """
+    def __init__(self, func, args):
         self.func = func
+        self.slots = []
+        self.index = {}
 
-    def complete(self, true_values):
-        got = copy.copy(self.got)
-        missing = copy.copy(self.missing)
+        sources = []
+        for arg in args:
+            if isinstance(arg, ContextualValue):
+                sources.append((SLOT, self._slot_for(arg)))
+            elif isinstance(arg, Incomplete):
+                feeds = tuple(
+                    (nested_idx, self._slot_for(arg.plan.slots[nested_idx]))
+                    for nested_idx in arg.missing_slots
+                )
+                sources.append((NESTED, (arg, feeds)))
+            else:
+                sources.append((CONSTANT, arg))
+
+        self.slots = tuple(self.slots)
+        self.sources = tuple(sources)
+
+    def _slot_for(self, ctx_value):
+        idx = self.index.get(ctx_value)
+        if idx is None:
+            idx = len(self.slots)
+            self.index[ctx_value] = idx
+            self.slots.append(ctx_value)
+        return idx
+
+    def call(self, values):
+        """
+        Call `func` given the true values for every slot, by index
+        """
+        args = []
+        for kind, source in self.sources:
+            if kind == CONSTANT:
+                args.append(source)
+            elif kind == SLOT:
+                args.append(values[source])
+            else:
+                incomplete, feeds = source
+                args.append(incomplete.fill([
+                    (nested_idx, values[idx]) for nested_idx, idx in feeds
+                ]))
+
+        return self.func(tuple(args))
+
+
+class Incomplete(object):
+    """
+    An ArgumentPlan together with the slot values received so far.
 
-        got.update(true_values)
-        missing -= set(true_values.keys())
+    One slot may be `deferred`: rather than being filled alongside the
+    others, it is the value received by the policy rule function that the
+    Incomplete resolves to, once every other slot is filled. This is how a
+    Context hands its own value to the items it contains.
+    """
+    def __init__(self, plan, values=None, deferred=None):
+        if values is None:
+            values = (UNFILLED,) * len(plan.slots)
+        self.plan = plan
+        self.values = values
+        self.deferred = deferred
+
+    @property
+    def func(self):
+        return self.plan.func
+
+    @property
+    def missing_slots(self):
+        return tuple(
+            idx for idx, value in enumerate(self.values)
+            if value is UNFILLED and idx != self.deferred
+        )
+
+    @property
+    def missing(self):
+        slots = self.plan.slots
+        return frozenset(slots[idx] for idx in self.missing_slots)
+
+    def needs(self, ctx_value):
+        idx = self.plan.index.get(ctx_value)
+        return (
+            idx is not None and
+            idx != self.deferred and
+            self.values[idx] is UNFILLED
+        )
+
+    def complete(self, true_values):
+        """
+        Fill in values given a dict of {ctx_value: true_value}
+        """
+        index = self.plan.index
+        return self.fill([
+            (index[ctx_value], value)
+            for ctx_value, value in true_values.items()
+            if ctx_value in index
+        ])
+
+    def fill(self, indexed_values):
+        """
+        Fill in values given a sequence of (slot index, true_value) pairs.
+        Returns a new Incomplete if values are still missing.
+        """
+        values = list(self.values)
+        for idx, value in indexed_values:
+            values[idx] = value
 
-        if not missing:
-            return self.func(got)
+        return self._resolve(values)
 
-        return Incomplete(
-            func=self.func,
-            missing=missing,
-            got=got
+    def defer(self, ctx_value):
+        """
+        Mark `ctx_value` as the value passed in by the enclosing context
+        """
+        incomplete = Incomplete(
+            self.plan, self.values, deferred=self.plan.index[ctx_value]
         )
+        return incomplete._resolve(list(self.values))
+
+    def _resolve(self, values):
+        deferred = self.deferred
+        for idx, value in enumerate(values):
+            if value is UNFILLED and idx != deferred:
+                return Incomplete(self.plan, tuple(values), deferred)
+
+        if deferred is None:
+            return self.plan.call(values)
+
+        plan = self.plan
+
+        @functools.wraps(plan.func)
+        def receive_deferred(value):
+            deferred_values = list(values)
+            deferred_values[deferred] = value
+            return plan.call(deferred_values)
+        receive_deferred.deferred_plan = plan
+        return receive_deferred
 
     def __repr__(self):
         return (
@@ -176,6 +279,10 @@ class Incomplete(object):
         ).format(set([missing.ctx for missing in self.missing]))
 
 
+def policies_wrapper(policy_rules):
+    return policies(*policy_rules)
+
+
 class BaseContext(object):
     """
     Underlying implementation of the Context policy builder.
@@ -207,6 +314,7 @@ class BaseContext(object):
         self.items = []
         self.ctx_name = kwargs.get('name', None)
         self.error_handler = None
+        self.scope_selector = None
 
         if wrapper is None:
             wrapper = self.__class__.get_default_wrapper()
@@ -216,7 +324,7 @@ class BaseContext(object):
 
     @staticmethod
     def get_default_wrapper():
-        return lambda policy_rules: policies(*policy_rules)
+        return policies_wrapper
 
     @staticmethod
     def is_policy_rule(value):
@@ -249,11 +357,21 @@ class BaseContext(object):
             )
         return self
 
-    def finalize(self):
+    def finalize(self, optimize=False):
         """
         Performs all syntactic manipulations to subcontexts and contained
         policy rules and returns a single policy rule aggregate.
+
+        :param optimize: rewrite the context tree as it is finalized (see
+            `calcifer.contexts.optimizer`), storing an OptimizationReport
+            as `self.optimization_report`
         """
+        if optimize:
+            optimizer = Optimizer()
+            wrapped = optimizer.optimize(self)
+            self.optimization_report = optimizer.report
+            return wrapped
+
         finalized_items, finalized_error_handler = self.get_finalized_items()
         wrapped = self.wrap(finalized_items, finalized_error_handler)
 
@@ -281,28 +399,8 @@ class BaseContext(object):
 
         if hasattr(item, 'finalize'):
             return finalize_item(item.finalize(), provided_ctx_value)
-        if isinstance(item, Incomplete) and provided_ctx_value in item.missing:
-            def make_appended_func(item, ctx_value):
-                @functools.wraps(item.func)
-                def appended_func(value):
-                    return item.complete({ctx_value: value})
-                return appended_func
-
-            def make_incomplete_func(item, ctx_value):
-                @functools.wraps(item.func)
-                def incomplete_func(true_values):
-                    missing_one = item.complete(true_values)
-                    return make_appended_func(missing_one, ctx_value)
-                return incomplete_func
-
-            missing = item.missing - set([provided_ctx_value])
-            if not missing:
-                return make_appended_func(item, provided_ctx_value)
-
-            return Incomplete(
-                func=make_incomplete_func(item, provided_ctx_value),
-                missing=missing
-            )
+        if isinstance(item, Incomplete) and item.needs(provided_ctx_value):
+            return item.defer(provided_ctx_value)
         return item
 
     def wrap(self, items, error_handler):
@@ -336,10 +434,26 @@ class BaseContext(object):
 
         wrapped = wrap_ctx_values(
             action,
-            (error_handler,) + self.ctx_args + tuple(items)
+            (error_handler,) + self.get_finalized_ctx_args() + tuple(items)
         )
         return wrapped
 
+    def get_finalized_ctx_args(self):
+        """
+        Finalizes any Contexts given as ctx_args up front, each distinct
+        Context once, so that the wrapper's promise receives policy rules
+        rather than finalizing them again every time it is kept.
+        """
+        finalized = {}
+        ctx_args = []
+        for arg in self.ctx_args:
+            if hasattr(arg, 'finalize'):
+                if id(arg) not in finalized:
+                    finalized[id(arg)] = self._finalize_item(arg)
+                arg = finalized[id(arg)]
+            ctx_args.append(arg)
+        return tuple(ctx_args)
+
     @staticmethod
     def _warrants_inclusion(item):
         """
@@ -419,39 +533,20 @@ class BaseContext(object):
         )
         return apply_ctx
 
-    def memoized_apply(self, func, *args):
-        class MemoKey(object):
-            def __init__(self, *true_args):
-                self.true_args = true_args
-
-            def __lt__(self, other):
-                return self.true_args < other.true_args
-
-            def __hash__(self):
-                return make_hash(self.true_args)
-
-            def __eq__(self, other):
-                return self.true_args == other.true_args
-
-            def __repr__(self):
-                return "<MemoKey {}>".format(
-                    get_call_repr(*self.true_args)
-                )
-
-        @functools.wraps(func)
-        def memoized_func(*true_args):
-            if not hasattr(func, 'memo'):
-                func.memo = {}
-            key = MemoKey(*true_args)
-            if key in func.memo:
-                logger.debug("Found memo key: %r", key)
-                return func.memo[key]
-            result = func(*true_args)
-            logger.debug("Adding memo key: %r", key)
-            logger.debug("Existing memo keys: %r", func.memo.keys())
-            func.memo[key] = result
-            return result
+    def memoized_apply(self, func, *args, **kwargs):
+        """
+        Like `apply`, but looks up results for previously seen true
+        arguments in a bounded memo store (see `calcifer.memo`).
 
+        :kwarg scope: one of memo.GLOBAL (default), memo.POLICY or
+            memo.EVALUATION
+        :kwarg store: an explicit MemoStore to use regardless of scope
+        """
+        memoized_func = memo.memoize(
+            func,
+            scope=kwargs.get('scope', memo.GLOBAL),
+            store=kwargs.get('store'),
+        )
         return self.apply(memoized_func, *args)
 
     def check(self, func, *func_args):
@@ -493,6 +588,9 @@ class BaseContext(object):
                 return regarding(true_scope, *policy_rules)
             return scope_subctx_for_true_scope
         subctx = self.subctx(scope_subctx_for_policy_rules, scope)
+        if isinstance(scope, string_types):
+            # constant selector, for the optimizer
+            subctx.scope_selector = scope
         if name is not None:
             subctx.ctx_name = name
         return subctx
@@ -519,25 +617,14 @@ class ContextFrame(object):
     def __repr__(self):
         return "<policy '{}'>".format(self.name)
 
+    def __copy__(self):
+        return ContextFrame(self.name, self.policy_ast, self.error_handler)
+
     def __deepcopy__(self, memo):
         # you get a new object but you're not copying that AST
         return ContextFrame(self.name, self.policy_ast, self.error_handler)
 
-
-# from http://stackoverflow.com/questions/5884066/hashing-a-python-dictionary
-def make_hash(o):
-    """
-    Makes a hash from a dictionary, list, tuple or set to any level, that contains
-    only other hashable types (including any lists, tuples, sets, and
-    dictionaries).
-    """
-    if isinstance(o, (set, tuple, list)):
-        return hash(tuple([make_hash(e) for e in o]))
-    elif not isinstance(o, dict):
-        return hash(o)
-
-    new_o = copy.deepcopy(o)
-    for k, v in new_o.items():
-        new_o[k] = make_hash(v)
-
-    return hash(tuple(frozenset(sorted(new_o.items()))))
+    def __reduce__(self):
+        # policy ASTs and error handlers hold closures; frames sent to
+        # another process keep only their name
+        return (ContextFrame, (self.name, None))
@@ -2,7 +2,7 @@ import logging
 
 from calcifer.operators import (
     set_value, permit_values, require_value, append_value,
-    forbid_value, children, each, collect, unless_errors,
+    forbid_value, children, each, collect, unless_errors, last_error_scope,
 )
 from calcifer.contexts.policies import (
     add_error
@@ -124,10 +124,12 @@ class Context(BaseContext):
         """
         Returns the context selecting the most recently defined error
         """
-        errors_ctx = self.select("/errors").children()
-        idx_ctx = errors_ctx.apply(lambda es: es[-1], errors_ctx.value)
-        last_error_ctx = idx_ctx.select(idx_ctx.value)
-        return last_error_ctx
+        scope_ctx = self.subctx(
+            lambda policy_rules: (
+                last_error_scope() >> collect(*policy_rules)
+            )
+        )
+        return scope_ctx.select(scope_ctx.value)
 
     def or_error(self):
         """
@@ -216,12 +218,16 @@ class Context(BaseContext):
 
         :kwarg ref: An injectable reference object that has matching children
             nodes (same structure dict or list)
+        :kwarg pool: A worker pool (e.g. `multiprocessing.pool.ThreadPool`)
+            to evaluate the children on, independently of one another
         """
         def with_policy_rules(policy_rules):
             def with_true_children(true_children):
                 return each(
                     *policy_rules, **kwargs
                 )(true_children)
+            # only builds a policy rule (see `calcifer.analysis`)
+            with_true_children.pure = True
             return with_true_children
 
         subctx = self.subctx()
@@ -0,0 +1,233 @@
+"""
+`calcifer.contexts.optimizer` module
+
+Rewrites applied to a Context tree as it is finalized, by way of
+`ctx.finalize(optimize=True)`:
+
+flatten
+    A plain subcontext (default wrapper, no name, ctx_args or error
+    handler) inside a context with the default wrapper is spliced into its
+    parent: `policies(policies(a, b), c)` becomes `policies(a, b, c)`.
+merge
+    Adjacent subcontexts that select the same constant scope are combined
+    into a single `regarding()`.
+hoist
+    A scope subcontext that only writes constant values becomes one bare
+    `regarding(selector, set_value(...))`, without pushing a context frame.
+    Constant writes cannot fail, so the frame could never show up in an
+    error.
+units
+    Bare `unit(...)` items in a context with the default wrapper are dropped,
+    unless last: their value is discarded and they do not touch the partial.
+
+Binds with `unit` on either side are simplified when they are made,
+by `PolicyRule.bind`, so they need no pass here.
+
+The original Context tree is left as it is; only the finalized policy rule
+differs.
+"""
+import logging
+
+from calcifer.operators import regarding, set_value
+from calcifer.monads import PolicyRule, NO_VALUE
+from calcifer import asts
+
+logger = logging.getLogger(__name__)
+
+
+class OptimizationReport(object):
+    """
+    Rule counts (contexts plus contained policy rules) before and after
+    optimizing, and the number of times each rewrite applied
+    """
+    def __init__(self):
+        self.rules_before = 0
+        self.rules_after = 0
+        self.flattened = 0
+        self.merged = 0
+        self.hoisted = 0
+        self.units_removed = 0
+
+    @property
+    def stats(self):
+        return {
+            "rules_before": self.rules_before,
+            "rules_after": self.rules_after,
+            "flattened": self.flattened,
+            "merged": self.merged,
+            "hoisted": self.hoisted,
+            "units_removed": self.units_removed,
+        }
+
+    def __repr__(self):
+        return (
+            "<OptimizationReport rules: {rules_before} -> {rules_after} "
+            "(flattened={flattened}, merged={merged}, hoisted={hoisted}, "
+            "units_removed={units_removed})>"
+        ).format(**self.stats)
+
+
+def is_context(item):
+    return hasattr(item, 'finalize')
+
+
+def count_rules(ctx):
+    """
+    Count a context, its included items and its error handler, recursively
+    """
+    count = 1
+    for item in ctx.items:
+        if not ctx._warrants_inclusion(item):
+            continue
+        if is_context(item):
+            count += count_rules(item)
+        else:
+            count += 1
+    if ctx.error_handler:
+        count += count_rules(ctx.error_handler)
+    return count
+
+
+def has_default_wrapper(ctx):
+    return ctx.wrapper is ctx.__class__.get_default_wrapper()
+
+
+def is_static_write(item):
+    if getattr(item, 'static_write', False):
+        return True
+    ast = getattr(item, 'ast', None)
+    return (
+        isinstance(item, PolicyRule) and
+        isinstance(ast, asts.PolicyRuleFuncCall) and
+        ast.func is set_value.ast
+    )
+
+
+def is_unit(item):
+    return (
+        isinstance(item, PolicyRule) and item.unit_value is not NO_VALUE
+    )
+
+
+class Optimizer(object):
+    def __init__(self):
+        self.report = OptimizationReport()
+
+    def optimize(self, ctx):
+        self.report.rules_before = count_rules(ctx)
+        rule = self.finalize(ctx)
+        logger.debug("Optimized %r: %r", ctx, self.report)
+        return rule
+
+    def finalize(self, ctx):
+        items, error_handler = self.finalize_items(ctx)
+        self.report.rules_after += 1
+        return ctx.wrap(items, error_handler)
+
+    def finalize_items(self, ctx):
+        """
+        Optimized counterpart of `BaseContext.get_finalized_items`
+        """
+        provided_ctx_value = ctx.value
+
+        finalized_items = []
+        for group in self.group_adjacent(ctx):
+            finalized_items.extend(
+                ctx._finalize_item(item, provided_ctx_value)
+                for item in self.finalize_group(ctx, group)
+            )
+
+        if has_default_wrapper(ctx):
+            finalized_items = self.remove_units(finalized_items)
+
+        finalized_error_handler = None
+        if ctx.error_handler:
+            finalized_error_handler = ctx._finalize_item(
+                self.finalize(ctx.error_handler), provided_ctx_value
+            )
+
+        return finalized_items, finalized_error_handler
+
+    @staticmethod
+    def merge_key(item):
+        if (
+                not is_context(item) or
+                item.error_handler or
+                getattr(item, 'scope_selector', None) is None
+        ):
+            return None
+        return (item.__class__, item.scope_selector, item.ctx_name)
+
+    def group_adjacent(self, ctx):
+        """
+        Collects included items into lists, where adjacent scope subcontexts
+        for the same selector share a list
+        """
+        groups = []
+        last_key = None
+        for item in ctx.items:
+            if not ctx._warrants_inclusion(item):
+                continue
+            key = self.merge_key(item)
+            if key is not None and key == last_key:
+                groups[-1].append(item)
+                self.report.merged += 1
+            else:
+                groups.append([item])
+            last_key = key
+        return groups
+
+    def finalize_group(self, parent, group):
+        """
+        Returns a list of finalized items for a group of items, not yet
+        finalized for the parent's own contextual value
+        """
+        first = group[0]
+        if not is_context(first):
+            self.report.rules_after += 1
+            return [first]
+
+        if len(group) == 1 and self.can_flatten(parent, first):
+            items, _ = self.finalize_items(first)
+            if all(getattr(item, 'deferred', None) is None for item in items):
+                self.report.flattened += 1
+                return items
+            self.report.rules_after += 1
+            return [first.wrap(items, None)]
+
+        items = []
+        error_handler = None
+        for ctx in group:
+            ctx_items, error_handler = self.finalize_items(ctx)
+            items.extend(ctx_items)
+
+        if (
+                getattr(first, 'scope_selector', None) is not None and
+                error_handler is None and
+                items and all(is_static_write(item) for item in items)
+        ):
+            rule = regarding(first.scope_selector, *items)
+            rule.static_write = True
+            self.report.hoisted += 1
+            self.report.rules_after += 1
+            return [rule]
+
+        self.report.rules_after += 1
+        return [first.wrap(items, error_handler)]
+
+    @staticmethod
+    def can_flatten(parent, ctx):
+        return (
+            has_default_wrapper(parent) and
+            has_default_wrapper(ctx) and
+            not ctx.ctx_name and
+            not ctx.ctx_args and
+            not ctx.error_handler
+        )
+
+    def remove_units(self, items):
+        kept = [item for item in items[:-1] if not is_unit(item)]
+        removed = len(items[:-1]) - len(kept)
+        self.report.units_removed += removed
+        self.report.rules_after -= removed
+        return kept + items[-1:]
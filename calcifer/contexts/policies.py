@@ -1,7 +1,7 @@
 from calcifer.operators import (
-    regarding, append_value,
+    append_error,
 )
 
 
 def add_error(error):
-    return regarding("/errors", append_value(error))
+    return append_error(error)
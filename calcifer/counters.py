@@ -0,0 +1,173 @@
+"""
+`calcifer.counters` module
+
+Counters of the engine's core data-structure operations, cheap enough to
+stay on in production:
+
+- `select`: `Partial.select` calls,
+- `down`, `up`: zipper moves,
+- `reconstruct`: parent nodes rebuilt from their children (going up a
+  zipper, or leaving `each`'s siblings),
+- `from_obj`: objects converted to policy nodes by `PolicyNode.from_obj`,
+  one per node built,
+- `define_as`, `match`: `Partial.define_as` and `Partial.match` calls,
+- `bind_steps`: continuations run on one result of a bind (including the
+  steps of `policies`, `collect` and `each`),
+- `provider_runs`: value providers (contextual values given to
+  `Context.append`, `apply` and the like) run by `receive_args`, once
+  per branch they run on,
+- `provider_saved`: provider runs avoided because the same provider was
+  given more than once to one call,
+- `evaluations`: policy evaluations.
+
+Operations are counted on the calling thread's current Counters. Each
+`BasePolicy` evaluation counts into fresh Counters, which are then added to
+the enclosing ones, so that:
+
+    policy.run(obj)
+    last_evaluation()   # the counts of that evaluation (on this thread)
+    totals()            # running totals of all threads in the process
+
+The counts of a thread that has ended are folded into one total for the
+process, so threads coming and going (e.g. pools) cost nothing to keep.
+Work done on a pool by `each(pool=...)` is counted by the workers on
+`detached()` Counters, and added to the caller's once their results are
+used.
+
+`counting()` counts any other block on its own:
+
+    with counting() as counts:
+        run_policy(rule, obj)
+"""
+import contextlib
+import threading
+import weakref
+
+from calcifer import threadstate
+
+FIELDS = (
+    'select', 'down', 'up', 'reconstruct', 'from_obj', 'define_as', 'match',
+    'bind_steps', 'provider_runs', 'provider_saved', 'evaluations',
+)
+
+_local = threading.local()
+
+# the outermost Counters of each live thread that counted anything, by a
+# weak reference to a marker that lives as long as the thread's locals
+_roots = {}
+# reentrant: a thread's locals may be collected while the lock is held
+_roots_lock = threading.RLock()
+
+
+class Counters(object):
+    __slots__ = FIELDS
+
+    def __init__(self):
+        for field in FIELDS:
+            setattr(self, field, 0)
+
+    def add(self, other):
+        for field in FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __repr__(self):
+        return "<Counters {}>".format(" ".join(
+            "{}={}".format(field, getattr(self, field)) for field in FIELDS
+        ))
+
+
+# the counts of threads that have ended
+_finished = Counters()
+
+
+class _ThreadMarker(object):
+    __slots__ = ('__weakref__',)
+
+
+def _thread_ended(marker_ref):
+    if _roots_lock is None or _finished is None:
+        # the interpreter is shutting down
+        return
+    with _roots_lock:
+        counters = _roots.pop(marker_ref, None)
+        if counters is not None:
+            _finished.add(counters)
+
+
+def thread_counters():
+    """
+    Returns new outermost Counters for this thread, counted in `totals()`
+    """
+    counters = Counters()
+    marker = _local.marker = _ThreadMarker()
+    with _roots_lock:
+        _roots[weakref.ref(marker, _thread_ended)] = counters
+    return counters
+
+
+def current():
+    """
+    Returns the Counters operations on this thread are counted in
+    """
+    return threadstate.current().counters
+
+
+def totals():
+    """
+    Returns the sum of all counts so far, on every thread
+    """
+    result = Counters()
+    with _roots_lock:
+        result.add(_finished)
+        for counters in _roots.values():
+            result.add(counters)
+    return result
+
+
+def last_evaluation():
+    """
+    Returns the Counters of the last evaluation on this thread, or None
+    """
+    return getattr(_local, 'last_evaluation', None)
+
+
+@contextlib.contextmanager
+def counting():
+    """
+    Counts the block's operations on fresh Counters, then adds them to the
+    enclosing ones
+    """
+    state = threadstate.current()
+    outer = state.counters
+    counters = state.counters = Counters()
+    try:
+        yield counters
+    finally:
+        state.counters = outer
+        outer.add(counters)
+
+
+@contextlib.contextmanager
+def detached():
+    """
+    Counts the block's operations on fresh Counters that are not added to
+    the enclosing ones, e.g. to add them to another thread's
+    """
+    state = threadstate.current()
+    outer = state.counters
+    counters = state.counters = Counters()
+    try:
+        yield counters
+    finally:
+        state.counters = outer
+
+
+@contextlib.contextmanager
+def evaluation():
+    with counting() as counters:
+        counters.evaluations += 1
+        yield counters
+    _local.last_evaluation = counters
@@ -0,0 +1,114 @@
+"""
+`calcifer.failfast` module
+
+Fail-fast evaluation: once a branch has an error, nothing more is run on
+it but error handling, and once every branch has failed, sequences of
+rules stop altogether.
+
+`Context.fail_early` and the `endpoint_policy` wrapper only look at
+"/errors" before each top-level rule. While a FailFast mode is active on
+a thread, every step of `>>`, `collect`, `policies` and `each` looks at
+the branch it is about to run on instead:
+
+- a branch whose "/errors" log is not empty is passed on as it is, with
+  the value it had, instead of running the step,
+- `collect`, `policies` and `each` run no more of their rules once every
+  branch they hold has failed,
+- the rules `catch_attempt` runs when the rules it attempts fail (the
+  `or_error` handlers of a Context, which add the error and fill it in)
+  run as usual,
+- rule funcs that undo an enclosing rule's state, such as the
+  `pop_context` of `wrap_context`, are bound as usual, so "/context" is
+  left as it would be.
+
+So the results of a failed branch hold the error it first failed with,
+and whatever the tree was at that point.
+
+    with FailFast() as mode:
+        policy.run(obj)
+    mode.skipped
+
+Policies set `fail_fast = True` to fail fast on every run.
+"""
+import contextlib
+
+from calcifer import threadstate
+
+
+def active_mode():
+    return threadstate.current().mode
+
+
+class FailFast(object):
+    """
+    `skipped` counts the steps not run on failed branches, and `stopped`
+    the sequences of rules left early because every branch had failed.
+    """
+    def __init__(self):
+        self.skipped = 0
+        self.stopped = 0
+        # depth of error handling (see `handling_errors`)
+        self.handling = 0
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = threadstate.current().activate('mode', self)
+        return self
+
+    def __exit__(self, *exc_info):
+        threadstate.current().activate('mode', self.previous)
+
+    def skips(self, state):
+        """
+        Whether to skip a step on the branch with `state`, a Partial or
+        Siblings
+        """
+        if self.handling or not state.has_errors:
+            return False
+        self.skipped += 1
+        return True
+
+    def all_failed(self, m_results):
+        """
+        Whether every branch among `m_results` has failed (and there is one)
+        """
+        if self.handling:
+            return False
+        try:
+            states = [state for _, state in m_results]
+        except TypeError:
+            # not a List monad
+            return False
+        if not states or not all(state.has_errors for state in states):
+            return False
+        self.stopped += 1
+        return True
+
+
+@contextlib.contextmanager
+def failing_fast(enabled=True):
+    """
+    Activates a FailFast mode for the block, if `enabled`. Yields the mode
+    or None.
+    """
+    if not enabled:
+        yield None
+        return
+    with FailFast() as mode:
+        yield mode
+
+
+@contextlib.contextmanager
+def handling_errors():
+    """
+    Runs the block in full, even on failed branches, while failing fast
+    """
+    mode = active_mode()
+    if mode is None:
+        yield
+        return
+    mode.handling += 1
+    try:
+        yield
+    finally:
+        mode.handling -= 1
@@ -0,0 +1,190 @@
+"""
+`calcifer.fanout` module
+
+Telemetry and guards for the number of branches an evaluation keeps.
+
+Operators like `permit_values`, `attempt` and `each` may return more than
+one result, and every rule bound after them runs once per result, so the
+number of live branches can multiply quickly. While a `FanoutMonitor` is
+active on a thread, every bind is observed:
+
+- `peak` is the largest number of results any bind produced,
+- `forks` lists, for each rule that turned one branch into several (the
+  innermost such rule, e.g. a `permit_values`, not the rules around it),
+  how often it forked, its largest factor, and the context stack and scope
+  it last forked at.
+
+With `warn_at`, a warning naming the rule that forked last and its context
+stack is logged the first time a bind produces more than `warn_at`
+results. With `abort_at`, evaluation stops with a BranchExplosionError
+instead.
+
+    with FanoutMonitor(abort_at=1000) as monitor:
+        policy.run(obj)
+    monitor.peak
+
+Policies set `warn_branches` and `max_branches` to monitor every run.
+"""
+import contextlib
+import logging
+
+from calcifer import threadstate
+
+logger = logging.getLogger(__name__)
+
+
+def active_monitor():
+    return threadstate.current().monitor
+
+
+def count_results(m_results):
+    try:
+        return len(m_results)
+    except TypeError:
+        # not a List monad
+        return 1
+
+
+def context_names(partial):
+    node, _ = partial.select("/context", set_path=False, read=False)
+    return [getattr(frame, 'name', repr(frame)) for frame in node.value or []]
+
+
+class BranchExplosionError(RuntimeError):
+    """
+    Raised when a bind produces more than `abort_at` branches
+    """
+    def __init__(self, branches, limit, fork):
+        self.branches = branches
+        self.limit = limit
+        self.fork = fork
+        super(BranchExplosionError, self).__init__(
+            "{} branches (limit {}), last forked by {}".format(
+                branches, limit, fork.describe() if fork else "no rule"
+            )
+        )
+
+    @property
+    def rule(self):
+        return self.fork.rule if self.fork else None
+
+    @property
+    def context(self):
+        return self.fork.context if self.fork else []
+
+    @property
+    def scope(self):
+        return self.fork.scope if self.fork else None
+
+
+class Fork(object):
+    """
+    A rule that forked: how often, by how much at most, and where it last did
+    """
+    __slots__ = ('rule', 'count', 'max_factor', 'context', 'scope')
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.count = 0
+        self.max_factor = 0
+        self.context = []
+        self.scope = None
+
+    def describe(self):
+        return "{!r} at {} in {}".format(
+            self.rule, self.scope, " > ".join(self.context) or "no context"
+        )
+
+    def __repr__(self):
+        return "<Fork {!r} count={} max_factor={}>".format(
+            self.rule, self.count, self.max_factor
+        )
+
+
+class FanoutMonitor(object):
+    def __init__(self, warn_at=None, abort_at=None):
+        self.warn_at = warn_at
+        self.abort_at = abort_at
+        self.binds = 0
+        self.peak = 0
+        # repr of rule AST -> Fork
+        self.forks = {}
+        self.last_fork = None
+        self.fork_events = 0
+        self.warned = False
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = threadstate.current().activate('monitor', self)
+        return self
+
+    def __exit__(self, *exc_info):
+        threadstate.current().activate('monitor', self.previous)
+
+    def run(self, rule, partial):
+        """
+        Runs `rule` on one branch, recording it as a fork if it returns more
+        than one result and no rule inside it forked
+        """
+        fork_events = self.fork_events
+        m_results = rule.run(partial)
+        factor = count_results(m_results)
+        if factor > 1 and self.fork_events == fork_events:
+            self.record_fork(rule.ast, factor, partial)
+        return m_results
+
+    def record_fork(self, rule_ast, factor, partial):
+        # rules are rebuilt on every bind, so tell them apart by AST repr
+        key = repr(rule_ast)
+        fork = self.forks.get(key)
+        if fork is None:
+            fork = self.forks[key] = Fork(rule_ast)
+        fork.count += 1
+        fork.max_factor = max(fork.max_factor, factor)
+        fork.context = context_names(partial)
+        fork.scope = partial.scope
+        self.fork_events += 1
+        self.last_fork = fork
+
+    def observe(self, m_results):
+        """
+        Records the number of branches after a bind, checking thresholds
+        """
+        self.binds += 1
+        branches = count_results(m_results)
+        if branches <= self.peak:
+            return
+        self.peak = branches
+
+        if self.abort_at is not None and branches > self.abort_at:
+            raise BranchExplosionError(branches, self.abort_at, self.last_fork)
+        if (
+                self.warn_at is not None and branches > self.warn_at and
+                not self.warned
+        ):
+            self.warned = True
+            logger.warning(
+                "%d branches (warning at %d), last forked by %s",
+                branches, self.warn_at,
+                self.last_fork.describe() if self.last_fork else "no rule"
+            )
+
+    def sorted_forks(self):
+        return sorted(
+            self.forks.values(),
+            key=lambda fork: (fork.count, fork.max_factor),
+            reverse=True
+        )
+
+
+@contextlib.contextmanager
+def monitoring(warn_at=None, abort_at=None):
+    """
+    Activates a FanoutMonitor for the block, unless there is nothing to
+    check. Yields the monitor or None.
+    """
+    if warn_at is None and abort_at is None:
+        yield None
+        return
+    with FanoutMonitor(warn_at=warn_at, abort_at=abort_at) as monitor:
+        yield monitor
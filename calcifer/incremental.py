@@ -0,0 +1,190 @@
+"""
+`calcifer.incremental` module
+
+Re-evaluation of a policy after some of its input changes, re-running only
+the rules that read something that changed.
+
+While a `Session` is active, the `checkpoints(*rules)` operator behaves
+like `policies(*rules)` but keeps a Record: for each rule, an Entry of the
+nodes it read and wrote (see `calcifer.partial.AccessLog`), the nodes it
+left at the paths it wrote, the errors it appended and its value.
+
+Given the Record of a previous evaluation and the paths that changed since
+(the *dirty* paths), a rule that read none of the dirty paths is not run
+again: its writes and errors are spliced into the partial instead. Rules
+that do run again add whatever they write to the dirty paths.
+
+"/errors" and "/context" are kept out of the access logs. Rules are
+assumed to only append to "/errors", and to leave "/context" as they found
+it, as the built-in error handling and named contexts do. A rule that
+changes "/context" is always run again. Reading the whole root (e.g.
+`unless_errors`) reads everything, so such a rule also runs again whenever
+anything changed.
+
+With `checkpoints(..., unless_errors=True)`, as endpoint policies are
+checkpointed, a rule is not run once there are errors before it. Whether
+it was is recorded too: a rule is run again if errors appeared or went
+away before it since.
+
+Records are only kept for evaluations where every rule gives exactly one
+result. Once some rule forks, the rest are evaluated as `policies` would,
+and the next re-evaluation runs everything again.
+"""
+import threading
+
+_local = threading.local()
+
+
+def active_session():
+    return getattr(_local, 'session', None)
+
+
+def overlaps(path, other):
+    shortest = min(len(path), len(other))
+    return path[:shortest] == other[:shortest]
+
+
+def to_scope(path):
+    return "/{}".format("/".join(str(step) for step in path))
+
+
+def to_path(pointer):
+    def maybe_coerce_to_int(step):
+        try:
+            return int(step)
+        except ValueError:
+            return step
+    return tuple(
+        maybe_coerce_to_int(step) for step in pointer.split("/") if step
+    )
+
+
+def log_value(partial, step):
+    node, _ = partial.select("/{}".format(step), set_path=False)
+    return node.value or []
+
+
+class Entry(object):
+    """
+    What one rule did in a recorded evaluation
+    """
+    __slots__ = (
+        'reads', 'writes', 'nodes', 'errors', 'value', 'opaque', 'skipped'
+    )
+
+    def __init__(
+            self, reads, writes, nodes, errors, value, opaque=False,
+            skipped=False,
+    ):
+        self.reads = reads
+        self.writes = writes
+        self.nodes = nodes
+        self.errors = errors
+        self.value = value
+        self.opaque = opaque
+        # not run, as there were errors before it (`unless_errors`)
+        self.skipped = skipped
+
+    @staticmethod
+    def skip():
+        return Entry(
+            reads=frozenset(), writes=(), nodes=[], errors=[], value=None,
+            skipped=True,
+        )
+
+    @staticmethod
+    def from_log(log, partial, errors_before, context_before, value):
+        # keep only the outermost paths written
+        writes = sorted(log.writes, key=len)
+        outermost = []
+        for path in writes:
+            if not any(overlaps(path, other) for other in outermost):
+                outermost.append(path)
+
+        nodes = [
+            (path, partial.select(to_scope(path), set_path=False)[0])
+            for path in outermost
+        ]
+
+        errors = log_value(partial, 'errors')
+        opaque = (
+            errors[:len(errors_before)] != errors_before or
+            log_value(partial, 'context') != context_before
+        )
+        return Entry(
+            reads=frozenset(log.reads),
+            writes=tuple(outermost),
+            nodes=nodes,
+            errors=errors[len(errors_before):],
+            value=value,
+            opaque=opaque,
+        )
+
+    def splice(self, partial):
+        """
+        Returns the partial with this entry's writes and errors applied,
+        scoped where it was
+        """
+        scope = partial.scope
+        # selecting a missing node adds it, so reads can change the tree too
+        for path in sorted(self.reads, key=len):
+            partial = partial.rescope(to_scope(path))
+        for path, node in self.nodes:
+            _, partial = partial.rescope(to_scope(path)).set_node(node)
+        partial = partial.append_errors(self.errors)
+        return partial.rescope(scope)
+
+    def __repr__(self):
+        return "<Entry reads={} writes={}>".format(
+            sorted(to_scope(path) for path in self.reads),
+            [to_scope(path) for path in self.writes],
+        )
+
+
+class Record(object):
+    def __init__(self):
+        self.entries = []
+        self.complete = True
+
+
+class Session(object):
+    """
+    An evaluation that keeps a Record, reusing entries from a `previous`
+    one for rules that read none of the `dirty` paths
+    """
+    def __init__(self, previous=None, dirty=()):
+        self.previous = previous
+        self.dirty = set(dirty)
+        self.record = Record()
+        self.reused = 0
+        self.rerun = 0
+        self.started = False
+
+    def previous_entries(self, count):
+        previous = self.previous
+        if (
+                previous is None or
+                not previous.complete or
+                len(previous.entries) != count
+        ):
+            return None
+        return previous.entries
+
+    def is_dirty(self, entry):
+        return entry.opaque or any(
+            overlaps(path, dirty)
+            for path in entry.reads
+            for dirty in self.dirty
+        )
+
+    @property
+    def stats(self):
+        return {"reused": self.reused, "rerun": self.rerun}
+
+    def __enter__(self):
+        self.previous_session = active_session()
+        _local.session = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.session = self.previous_session
@@ -0,0 +1,325 @@
+"""
+`calcifer.memo` module
+
+This module provides the memo stores used by `Context.memoized_apply`.
+
+A memo store is a bounded mapping from the true arguments of some function
+call to its result. Stores evict the least recently used entry once they
+reach `max_size`, may expire entries after `ttl` seconds, and keep count of
+their hits, misses and evictions.
+
+Stores are looked up by *scope*:
+
+GLOBAL
+    One store per memoized function for the lifetime of the process.
+POLICY
+    One store per memoized function for each `MemoScope` of kind POLICY,
+    e.g. the one held by a `BasePolicy` across all of its runs.
+EVALUATION
+    One store per memoized function for each policy evaluation
+    (`run_policy` or `BasePolicy.run`). The store is discarded when the
+    evaluation finishes.
+
+POLICY and EVALUATION stores exist only while a matching `MemoScope` is
+active on the current thread. Outside of one, memoization is skipped.
+"""
+import collections
+import contextlib
+import functools
+import logging
+import threading
+import time
+import weakref
+
+from calcifer.asts import get_call_repr
+
+logger = logging.getLogger(__name__)
+
+
+GLOBAL = 'global'
+POLICY = 'policy'
+EVALUATION = 'evaluation'
+
+SCOPES = (GLOBAL, POLICY, EVALUATION)
+
+
+class _Missing(object):
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def make_hash(o):
+    """
+    Makes a hash from a dictionary, list, tuple or set to any level, that
+    contains only other hashable types (including any lists, tuples, sets,
+    and dictionaries).
+
+    Unlike hashing a deep copy, the structure is walked in place: nothing is
+    copied, and dicts and sets hash the same regardless of ordering.
+    """
+    if isinstance(o, dict):
+        return hash(frozenset(
+            (k, make_hash(v)) for k, v in o.items()
+        ))
+    if isinstance(o, (set, frozenset)):
+        return hash(frozenset(make_hash(e) for e in o))
+    if isinstance(o, (tuple, list)):
+        return hash(tuple(make_hash(e) for e in o))
+    return hash(o)
+
+
+class MemoKey(object):
+    """
+    Key for the true arguments of a memoized call. The structural hash
+    is computed once, up front.
+    """
+    __slots__ = ('true_args', '_hash')
+
+    def __init__(self, *true_args):
+        self.true_args = true_args
+        self._hash = make_hash(true_args)
+
+    def __lt__(self, other):
+        return self.true_args < other.true_args
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, MemoKey) and
+            self._hash == other._hash and
+            self.true_args == other.true_args
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "<MemoKey {}>".format(get_call_repr("", *self.true_args))
+
+
+class MemoStore(object):
+    """
+    A thread-safe, bounded LRU mapping with optional time-to-live.
+
+    :param max_size: maximum number of entries; `None` for unbounded
+    :param ttl: seconds an entry stays valid; `None` to never expire
+    :param clock: callable returning the current time in seconds
+    """
+    def __init__(self, max_size=1024, ttl=None, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._entries.pop(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self.clock():
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            # re-insert to mark as most recently used
+            self._entries[key] = entry
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.ttl is None:
+            expires_at = None
+        else:
+            expires_at = self.clock() + self.ttl
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires_at)
+
+            if self.max_size is not None:
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __deepcopy__(self, memo):
+        # stores are shared, never copied along with their owner
+        return self
+
+    def __repr__(self):
+        return (
+            "<MemoStore size={size} hits={hits} misses={misses} "
+            "evictions={evictions}>"
+        ).format(**self.stats)
+
+
+class MemoScope(object):
+    """
+    A lifetime for memo stores: holds one store per memoized function.
+
+    :param kind: POLICY or EVALUATION
+    :param store_factory: callable returning a new, empty store
+    """
+    def __init__(self, kind, store_factory=MemoStore):
+        if kind not in (POLICY, EVALUATION):
+            raise ValueError("Unknown memo scope kind: {!r}".format(kind))
+        self.kind = kind
+        self.store_factory = store_factory
+        self._stores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def store_for(self, owner):
+        with self._lock:
+            store = self._stores.get(owner)
+            if store is None:
+                store = self.store_factory()
+                self._stores[owner] = store
+            return store
+
+    @property
+    def stores(self):
+        return list(self._stores.values())
+
+    def __enter__(self):
+        _active_scopes().append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_scopes().remove(self)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return "<MemoScope {} stores={}>".format(self.kind, len(self._stores))
+
+
+_local = threading.local()
+
+_global_stores = weakref.WeakKeyDictionary()
+_global_lock = threading.Lock()
+
+
+def _active_scopes():
+    if not hasattr(_local, 'scopes'):
+        _local.scopes = []
+    return _local.scopes
+
+
+def current_scopes():
+    """
+    Returns the MemoScopes active on this thread, outermost first
+    """
+    return tuple(_active_scopes())
+
+
+@contextlib.contextmanager
+def activate(scopes):
+    """
+    Activates a sequence of MemoScopes (e.g. from `current_scopes()` on
+    another thread) for the duration of the block
+    """
+    active = _active_scopes()
+    depth = len(active)
+    active.extend(scopes)
+    try:
+        yield
+    finally:
+        del active[depth:]
+
+
+def active_scope(kind):
+    """
+    Returns the innermost active MemoScope of a given kind on this thread,
+    or None
+    """
+    for memo_scope in reversed(_active_scopes()):
+        if memo_scope.kind == kind:
+            return memo_scope
+    return None
+
+
+def get_store(owner, scope=GLOBAL):
+    """
+    Returns the memo store for `owner` (the memoized function) in the given
+    scope, or None if no such scope is active.
+    """
+    if scope == GLOBAL:
+        with _global_lock:
+            store = _global_stores.get(owner)
+            if store is None:
+                store = MemoStore()
+                _global_stores[owner] = store
+            return store
+
+    if scope not in SCOPES:
+        raise ValueError("Unknown memo scope: {!r}".format(scope))
+
+    memo_scope = active_scope(scope)
+    if memo_scope is None:
+        return None
+    return memo_scope.store_for(owner)
+
+
+def memoize(func, scope=GLOBAL, store=None):
+    """
+    Wraps `func` so that calls are looked up in a memo store. If `store` is
+    given it is always used, otherwise the store is found by `scope` at call
+    time.
+    """
+    @functools.wraps(func)
+    def memoized_func(*true_args):
+        memo_store = store
+        if memo_store is None:
+            memo_store = get_store(func, scope)
+        if memo_store is None:
+            return func(*true_args)
+
+        key = MemoKey(*true_args)
+        result = memo_store.get(key)
+        if result is not MISSING:
+            logger.debug("Found memo key: %r", key)
+            return result
+
+        result = func(*true_args)
+        logger.debug("Adding memo key: %r", key)
+        memo_store.put(key, result)
+        return result
+
+    memoized_func.memo_scope = scope
+    memoized_func.memo_store = store
+    return memoized_func
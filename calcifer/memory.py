@@ -0,0 +1,296 @@
+"""
+`calcifer.memory` module
+
+Opt-in memory accounting of policy runs.
+
+While a `MemoryTracker` is active on a thread, every `BasePolicy.run` on
+that thread adds an EvaluationMemory report to `tracker.reports`, with:
+
+- `peak`: the peak memory allocated during the run, in bytes, or None
+  if it cannot be told from the process' peak (`tracemalloc` was
+  already tracing, on Python < 3.9),
+- `live`: how many more Partial, Zipper, Breadcrumb and PolicyNode objects
+  were alive at the end of the run than before it,
+- `rules_created`: the number of PolicyRule instances created, including
+  finalizing the policy,
+- `allocations`: memory allocated during the run and still held at its
+  end, grouped by the calcifer module and function that allocated it
+  (the innermost calcifer frame of the allocation's traceback).
+
+    with MemoryTracker() as tracker:
+        policy.run(obj)
+    tracker.print_reports()
+
+Peak memory and allocations come from `tracemalloc`, which the tracker
+starts (and stops) unless it is already tracing. Without `tracemalloc`
+(Python 2), they are None. Counting live objects walks the whole heap, so
+runs are much slower while tracked.
+"""
+from __future__ import print_function
+
+import contextlib
+import dis
+import gc
+import os
+import sys
+import threading
+import types
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+_local = threading.local()
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def active_tracker():
+    return getattr(_local, 'tracker', None)
+
+
+def counted_types():
+    from calcifer.partial import Partial
+    from calcifer.tree import PolicyNode
+    from calcifer.zipper import Breadcrumb, Zipper
+    return (
+        ('Partial', Partial),
+        ('Zipper', Zipper),
+        ('Breadcrumb', Breadcrumb),
+        ('PolicyNode', PolicyNode),
+    )
+
+
+def count_live():
+    """
+    Returns the number of live objects of each counted type, by name
+    """
+    kinds = counted_types()
+    counts = {name: 0 for name, _ in kinds}
+    for obj in gc.get_objects():
+        for name, cls in kinds:
+            if isinstance(obj, cls):
+                counts[name] += 1
+    return counts
+
+
+_function_lines = {}
+
+
+def code_lines(code, qualname, lines):
+    for _, lineno in dis.findlinestarts(code):
+        lines[lineno] = qualname
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            code_lines(
+                const, "{}.{}".format(qualname, const.co_name)
+                if qualname else const.co_name, lines
+            )
+
+
+def function_name(filename, lineno):
+    """
+    Returns the qualified name of the function defining line `lineno` of
+    `filename`, e.g. "make_collect.collect.for_incoming_value"
+    """
+    lines = _function_lines.get(filename)
+    if lines is None:
+        lines = _function_lines[filename] = {}
+        try:
+            with open(filename) as f:
+                code = compile(f.read(), filename, 'exec')
+        except (IOError, SyntaxError):
+            pass
+        else:
+            code_lines(code, "", lines)
+    return lines.get(lineno) or "<module>"
+
+
+def module_name(filename):
+    relative = os.path.relpath(filename, PACKAGE_DIR)
+    return "calcifer.{}".format(
+        os.path.splitext(relative)[0].replace(os.sep, ".")
+    )
+
+
+def calcifer_frame(traceback):
+    """
+    Returns the innermost frame of `traceback` in the calcifer package, not
+    counting this module, or None
+    """
+    if sys.version_info >= (3, 7):
+        # frames are ordered from the oldest
+        traceback = reversed(traceback)
+    for frame in traceback:
+        filename = os.path.abspath(frame.filename)
+        if (
+                os.path.dirname(filename) == PACKAGE_DIR and
+                module_name(filename) != __name__
+        ):
+            return frame
+    return None
+
+
+class Allocations(object):
+    __slots__ = ('module', 'function', 'size', 'count')
+
+    def __init__(self, module, function):
+        self.module = module
+        self.function = function
+        self.size = 0
+        self.count = 0
+
+    def __repr__(self):
+        return "<Allocations {}:{} size={} count={}>".format(
+            self.module, self.function, self.size, self.count
+        )
+
+
+def group_allocations(before, after):
+    """
+    Groups memory allocated between two snapshots and still held by
+    calcifer module and function, largest first
+    """
+    groups = {}
+    for diff in after.compare_to(before, 'traceback'):
+        if diff.size_diff <= 0:
+            continue
+        frame = calcifer_frame(diff.traceback)
+        if frame is None:
+            key = ("<other>", "<other>")
+        else:
+            key = (
+                module_name(os.path.abspath(frame.filename)),
+                function_name(frame.filename, frame.lineno),
+            )
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = Allocations(*key)
+        group.size += diff.size_diff
+        group.count += max(diff.count_diff, 0)
+    return sorted(
+        groups.values(), key=lambda group: group.size, reverse=True
+    )
+
+
+class EvaluationMemory(object):
+    """
+    Memory accounting of one policy run
+    """
+    def __init__(self, policy):
+        self.policy = policy
+        self.peak = None
+        self.live = {}
+        self.rules_created = 0
+        self.allocations = None
+
+    def __repr__(self):
+        return "<EvaluationMemory {} peak={} rules_created={}>".format(
+            self.policy, self.peak, self.rules_created
+        )
+
+
+class MemoryTracker(object):
+    """
+    Accounts for the memory used by each policy run on this thread while
+    active. `nframe` is the traceback depth `tracemalloc` records, which
+    must reach from the allocation to a calcifer frame for it to be grouped.
+    """
+    def __init__(self, nframe=10):
+        self.nframe = nframe
+        self.reports = []
+        self.rules_created = 0
+        self.started = False
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = active_tracker()
+        _local.tracker = self
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframe)
+            self.started = True
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.tracker = self.previous
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    @contextlib.contextmanager
+    def evaluation(self, policy):
+        """
+        Accounts for the block as one run of `policy`
+        """
+        report = EvaluationMemory(policy)
+        # garbage from before the block, collected during it, would count
+        # against it
+        gc.collect()
+        live = count_live()
+        rules_created = self.rules_created
+
+        before = None
+        # traced memory at the start, if the peak was reset
+        start = None
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+                start, _ = tracemalloc.get_traced_memory()
+            elif self.started:
+                # only this tracker's traces are cleared, with the peak
+                tracemalloc.clear_traces()
+                start = 0
+            before = tracemalloc.take_snapshot()
+
+        try:
+            yield report
+        finally:
+            if before is not None:
+                if start is not None:
+                    _, peak = tracemalloc.get_traced_memory()
+                    report.peak = peak - start
+                report.allocations = group_allocations(
+                    before, tracemalloc.take_snapshot()
+                )
+            report.rules_created = self.rules_created - rules_created
+            report.live = {
+                name: count - live[name]
+                for name, count in count_live().items()
+            }
+            self.reports.append(report)
+
+    def print_reports(self, limit=10, stream=None):
+        """
+        Prints each report, with its `limit` largest allocation groups
+        """
+        if stream is None:
+            stream = sys.stdout
+        for report in self.reports:
+            print("{}: peak {} bytes, {} rules created".format(
+                report.policy,
+                "?" if report.peak is None else report.peak,
+                report.rules_created,
+            ), file=stream)
+            print("  live: {}".format(", ".join(
+                "{} {}".format(count, name)
+                for name, count in sorted(report.live.items())
+            )), file=stream)
+            for group in (report.allocations or [])[:limit]:
+                print("  {:>10} {:>7}  {}:{}".format(
+                    group.size, group.count, group.module, group.function
+                ), file=stream)
+
+
+@contextlib.contextmanager
+def accounting(policy):
+    """
+    Accounts for the block as one run of `policy` with the active tracker,
+    if any. Yields its EvaluationMemory report, or None.
+    """
+    tracker = active_tracker()
+    if tracker is None:
+        yield None
+        return
+    with tracker.evaluation(policy) as report:
+        yield report
@@ -24,16 +24,36 @@ any number of templates, including zero. This is realized as:
 """
 from abc import ABCMeta
 import copy
-import inspect
+import functools
 import logging
 from pymonad import Monad, List
 
-from calcifer import asts
+from calcifer import (
+    asts, memory, profiling, threadstate, tracing,
+)
 from calcifer.asts import get_call_repr  # pylint: disable=unused-import
 
 logger = logging.getLogger(__name__)
 
 
+def per_monad(make):
+    """
+    Memoizes a function of a monad, e.g. one building classes or operators
+    for it, so that it only runs once per monad
+    """
+    built = {}
+
+    @functools.wraps(make)
+    def make_for(m):
+        try:
+            return built[m]
+        except KeyError:
+            result = built[m] = make(m)
+            return result
+    return make_for
+
+
+@per_monad
 def stateT(m):
     class StateT(Monad):
         """
@@ -51,18 +71,45 @@ def stateT(m):
         def bind(self, function):
             @StateT
             def newState(state):
+                thread_state = threadstate.current()
+                run_func = self.run
+                m_results = run_func(state)
+
+                if not thread_state.instrumented:
+                    def run_step(result):
+                        thread_state.counters.bind_steps += 1
+                        value, state = result
+                        return function(value).run(state)
+                    return m_results >> run_step
+
+                monitor = thread_state.monitor
+                tracer = thread_state.tracer
+                mode = thread_state.mode
+                if getattr(function, 'unwinds', False):
+                    mode = None
+
                 def for_state_result(result):
                     # before state transition
                     value, state = result
+                    if mode is not None and mode.skips(state):
+                        return m.unit(result)
+                    thread_state.counters.bind_steps += 1
 
                     # after state transition
+                    if monitor is not None:
+                        return monitor.run(function(value), state)
                     run_func = function(value).run
                     m_new_result = run_func(state)
 
                     return m_new_result
 
-                run_func = self.run
-                return run_func(state) >> for_state_result
+                if tracer is not None:
+                    m_results = tracer.fork(m_results, for_state_result)
+                else:
+                    m_results = m_results >> for_state_result
+                if monitor is not None:
+                    monitor.observe(m_results)
+                return m_results
             return newState
 
         @property
@@ -100,10 +147,20 @@ class Identity(Monad):
         return super(Identity, self).amap(function)
 
 
+class _NoValue(object):
+    def __repr__(self):
+        return "NO_VALUE"
+
+
+NO_VALUE = _NoValue()
+
+
 class BasePolicyRule(object):
-    pass
+    # for rules built by `unit(value)`, the value they return
+    unit_value = NO_VALUE
 
 
+@per_monad
 def policyM(m):
     class PolicyRule(BasePolicyRule, stateT(m)):
         def __init__(
@@ -119,6 +176,10 @@ def policyM(m):
             self.ast = ast
             super(PolicyRule, self).__init__(for_partial)
 
+            tracker = memory.active_tracker()
+            if tracker is not None:
+                tracker.rules_created += 1
+
         def __repr__(self):
             if self.ast:
                 return "<PolicyRule: {}>".format(repr(self.ast))
@@ -133,12 +194,34 @@ def policyM(m):
         def _bind_policy_rule(self, rule):
             def for_operands(left, right):
                 def combined_for_partial(initial_partial):
+                    thread_state = threadstate.current()
                     m_results = left.run(initial_partial)
 
+                    if not thread_state.instrumented:
+                        def run_step(m_result):
+                            thread_state.counters.bind_steps += 1
+                            return right.run(m_result[1])
+                        return m_results >> run_step
+
+                    monitor = thread_state.monitor
+                    tracer = thread_state.tracer
+                    mode = thread_state.mode
+
                     def for_m_result(m_result):
                         _, partial = m_result
+                        if mode is not None and mode.skips(partial):
+                            return m.unit(m_result)
+                        thread_state.counters.bind_steps += 1
+                        if monitor is not None:
+                            return monitor.run(right, partial)
                         return right.run(partial)
-                    return m_results >> for_m_result
+                    if tracer is not None:
+                        m_results = tracer.fork(m_results, for_m_result)
+                    else:
+                        m_results = m_results >> for_m_result
+                    if monitor is not None:
+                        monitor.observe(m_results)
+                    return m_results
                 return combined_for_partial
 
             new_ast = asts.Binding(self.ast, rule.ast)
@@ -148,8 +231,22 @@ def policyM(m):
 
         def bind(self, rule_func):
             if isinstance(rule_func, BasePolicyRule):
+                if self.unit_value is not NO_VALUE:
+                    # unit(x) >> rule == rule
+                    return rule_func
                 return self._bind_policy_rule(rule_func)
 
+            if getattr(rule_func, 'is_unit', False):
+                # rule >> unit == rule
+                return self
+
+            if (
+                    self.unit_value is not NO_VALUE and
+                    getattr(rule_func, 'pure', False)
+            ):
+                # unit(x) >> f == f(x), when calling f has no side effects
+                return rule_func(self.unit_value)
+
             if not isinstance(rule_func, BasePolicyRuleFunc):
                 rule_func = policy_rule_funcM(m)(rule_func)
 
@@ -187,54 +284,98 @@ def policyM(m):
 class BasePolicyRuleFunc:
     __metaclass__ = ABCMeta
 
+    # `unit` itself, the identity for bind
+    is_unit = False
+
+    # whether calling the rule func only builds a policy rule, without
+    # any other side effects
+    pure = False
+
+    # function of a call's arguments, returning the name to profile the
+    # rule under instead of the rule func's (see `calcifer.profiling`)
+    profile_name = None
+
+    # category to trace calls of the rule func under (see
+    # `calcifer.tracing`)
+    trace_category = "operator"
+
+    # whether the rule func undoes state of an enclosing rule, and is bound
+    # even on failed branches while failing fast (see `calcifer.failfast`)
+    unwinds = False
+
+
+@per_monad
+def policy_rule_func_class(m):
+    class PolicyRuleFunc(BasePolicyRuleFunc):
+        def __init__(self, rule_func, rule_func_name=None, pure=False):
+            if rule_func_name is None:
+                if hasattr(rule_func, 'ast'):
+                    rule_func_name = repr(rule_func.ast)
+                else:
+                    rule_func_name = rule_func.__name__
+            if rule_func_name == '<lambda>':
+                code = rule_func.__code__
+                rule_func_name = (
+                    '<lambda {}:>'
+                ).format(
+                    ", ".join(code.co_varnames[:code.co_argcount])
+                )
 
-def policy_rule_funcM(m, rule_func_name=None):
-    def decorator(rule_func):
-        class PolicyRuleFunc(BasePolicyRuleFunc):
-            def __init__(self, rule_func, rule_func_name=None):
-                if rule_func_name is None:
-                    if hasattr(rule_func, 'ast'):
-                        rule_func_name = repr(rule_func.ast)
-                    else:
-                        rule_func_name = rule_func.__name__
-                if rule_func_name == '<lambda>':
-                    rule_func_name = (
-                        '<lambda {}:>'
-                    ).format(
-                        ", ".join(inspect.getargspec(rule_func).args)  # pylint: disable=deprecated-method
-                    )
+            if rule_func.__doc__:
+                # this is janky but it works.
+                # if someone goes through the trouble of writing a
+                # docstring for a rule func, it should be accessible
+                # with `help()` and nicely readable.
+                self.__class__ = type(
+                    "<PolicyRuleFunc {}>".format(rule_func_name),
+                    (PolicyRuleFunc,), {'__doc__': rule_func.__doc__}
+                )
 
-                if rule_func.__doc__:
-                    # this is janky but it works.
-                    # if someone goes through the trouble of writing a
-                    # docstring for a rule func, it should be accessible
-                    # with `help()` and nicely readable.
-                    self.__class__.__doc__ = rule_func.__doc__
-                    self.__class__.__name__ = (
-                        "<PolicyRuleFunc {}>".format(rule_func_name)
+            self.ast = asts.PolicyRuleFunc(rule_func_name, self)
+            self.rule_func = rule_func
+            self.rule_func_name = rule_func_name
+            self.pure = pure
+
+        def __call__(self, *args, **kwargs):
+            for_partial = self.rule_func(*args, **kwargs)
+            result_ast = None
+            if isinstance(for_partial, BasePolicyRule):
+                result_ast = for_partial.ast
+                for_partial = for_partial.run
+
+            profiler = profiling.active_profiler()
+            tracer = tracing.active_tracer()
+            if profiler is not None or tracer is not None:
+                if self.profile_name is not None:
+                    name = self.profile_name(*args, **kwargs)
+                else:
+                    name = profiling.profile_name(self.rule_func_name)
+                if profiler is not None:
+                    for_partial = profiler.wrap(name, for_partial)
+                if tracer is not None:
+                    for_partial = tracer.wrap(
+                        name, self.trace_category, for_partial
                     )
 
-                self.ast = asts.PolicyRuleFunc(rule_func_name)
-                self.rule_func = rule_func
-                self.rule_func_name = rule_func_name
+            func_call_ast = asts.PolicyRuleFuncCall(
+                self.ast, args, kwargs
+            )
+            rule = policyM(m)(
+                for_partial, context=func_call_ast, ast=result_ast
+            )
+            if self.is_unit:
+                rule.unit_value = args[0]
+            return rule
 
-            def __call__(self, *args, **kwargs):
-                for_partial = self.rule_func(*args, **kwargs)
-                if isinstance(for_partial, BasePolicyRule):
-                    for_partial = for_partial.run
+        def __repr__(self):
+            return "<PolicyRuleFunc {}>".format(self.rule_func_name)
 
-                func_call_ast = asts.PolicyRuleFuncCall(
-                    self.ast, args, kwargs
-                )
-                return policyM(m)(
-                    for_partial, context=func_call_ast
-                )
+    return PolicyRuleFunc
 
-            def __repr__(self):
-                return "<PolicyRuleFunc {}>".format(self.rule_func_name)
 
-        rule_func = PolicyRuleFunc(rule_func, rule_func_name)
-        return rule_func
+def policy_rule_funcM(m, rule_func_name=None, pure=False):
+    def decorator(rule_func):
+        return policy_rule_func_class(m)(rule_func, rule_func_name, pure)
     return decorator
 
 
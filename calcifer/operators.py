@@ -8,19 +8,31 @@ import copy
 import logging
 from pymonad import List
 
+from calcifer.partial import Siblings, AccessLog, track_access
+from calcifer import (
+    counters, failfast, incremental, parallel, threadstate,
+)
 from calcifer.tree import PolicyNode
 from calcifer.monads import (
-    policy_rule_funcM as policy_rule_func,
-    get_call_repr, PolicyRule
+    policy_rule_funcM, get_call_repr, per_monad, PolicyRule
 )
 
 logger = logging.getLogger(__name__)
 
 
+def policy_rule_func(m, rule_func_name=None):
+    """
+    Operators only build closures when called, so the policy rule
+    functions defined here are all marked pure.
+    """
+    return policy_rule_funcM(m, rule_func_name, pure=True)
+
+
 #
 # Partial Operators
 #
 
+@per_monad
 def make_unit(m):
     @policy_rule_func(m)
     def unit(value):
@@ -32,12 +44,14 @@ def make_unit(m):
         def for_partial(partial):
             return m.unit((value, partial))
         return for_partial
+    unit.is_unit = True
     return unit
 
 
 unit = make_unit(List)
 
 
+@per_monad
 def make_unit_value(m):
     @policy_rule_func(m)
     def unit_value(node):
@@ -61,6 +75,7 @@ def make_unit_value(m):
 unit_value = make_unit_value(List)
 
 
+@per_monad
 def make_set_value(m):
     @policy_rule_func(m)
     def set_value(value):
@@ -81,6 +96,7 @@ def make_set_value(m):
 set_value = make_set_value(List)
 
 
+@per_monad
 def make_select(m):
     @policy_rule_func(m)
     def select(scope, set_path=False):
@@ -107,6 +123,7 @@ def make_select(m):
 select = make_select(List)
 
 
+@per_monad
 def make_scope(m):
     @policy_rule_func(m)
     def scope():
@@ -124,6 +141,7 @@ def make_scope(m):
 scope = make_scope(List)
 
 
+@per_monad
 def make_get_node(m):
     @policy_rule_func(m)
     def get_node():
@@ -141,6 +159,7 @@ def make_get_node(m):
 get_node = make_get_node(List)
 
 
+@per_monad
 def make_children(m):
     @policy_rule_func(m)
     def children():
@@ -164,6 +183,7 @@ def make_children(m):
 children = make_children(List)
 
 
+@per_monad
 def make_get_value(m):
     get_node = make_get_node(m)
     unit_value = make_unit_value(m)
@@ -183,6 +203,7 @@ def make_get_value(m):
 get_value = make_get_value(List)
 
 
+@per_monad
 def make_append_value(m):
     get_value = make_get_value(m)
     set_value = make_set_value(m)
@@ -214,6 +235,7 @@ def make_append_value(m):
 append_value = make_append_value(List)
 
 
+@per_monad
 def make_pop_value(m):
     get_value = make_get_value(m)
     set_value = make_set_value(m)
@@ -237,6 +259,48 @@ def make_pop_value(m):
 pop_value = make_pop_value(List)
 
 
+@per_monad
+def make_append_error(m):
+    @policy_rule_func(m)
+    def append_error(error):
+        """
+        Appends `error` to the "/errors" log, in constant time whatever the
+        number of errors already there
+
+        :param error: the error to append
+        """
+        def for_partial(partial):
+            return m.unit((error, partial.append_errors([error])))
+        return for_partial
+    return append_error
+
+
+append_error = make_append_error(List)
+
+
+@per_monad
+def make_last_error_scope(m):
+    @policy_rule_func(m)
+    def last_error_scope():
+        """
+        Returns the scope of the most recently appended error, raising
+        IndexError if there is none
+
+        :returns: PolicyRule scope
+        """
+        def for_partial(partial):
+            index = partial.last_error_index
+            if index is None:
+                raise IndexError("No errors have been appended")
+            return m.unit(("/errors/{}".format(index), partial))
+        return for_partial
+    return last_error_scope
+
+
+last_error_scope = make_last_error_scope(List)
+
+
+@per_monad
 def make_define_as(m):
     @policy_rule_func(m)
     def define_as(node):
@@ -266,6 +330,7 @@ def make_define_as(m):
 define_as = make_define_as(List)
 
 
+@per_monad
 def make_check(m):
     @policy_rule_func(m)
     def check(func):
@@ -287,6 +352,7 @@ check = make_check(List)
 # Control Structures
 #
 
+@per_monad
 def make_collect(m):
     unit = make_unit(m)
 
@@ -299,24 +365,38 @@ def make_collect(m):
         def for_incoming_value(incoming_value):
             def for_initial_partial(initial_partial):
                 initial_scope = initial_partial.scope
+                thread_state = threadstate.current()
+                monitor = thread_state.monitor
+                tracer = thread_state.tracer
+                mode = thread_state.mode
 
                 m_results = m.unit((incoming_value, initial_partial))
 
                 def for_rule_func(rule_func):
                     def for_m_result(m_result):
                         _, partial = m_result
-                        _, scoped_partial = partial.select(
-                            initial_scope, set_path=True
-                        )
+                        if mode is not None and mode.skips(partial):
+                            return m.unit(m_result)
+                        thread_state.counters.bind_steps += 1
+                        scoped_partial = partial.rescope(initial_scope)
 
                         rule = unit(incoming_value) >> rule_func
+                        if monitor is not None:
+                            return monitor.run(rule, scoped_partial)
                         m_results = rule.run(scoped_partial)
                         return m_results
                     return for_m_result
 
                 for rule_func in rule_funcs:
+                    if mode is not None and mode.all_failed(m_results):
+                        break
                     for_m_result = for_rule_func(rule_func)
-                    m_results = m_results >> for_m_result
+                    if tracer is not None:
+                        m_results = tracer.fork(m_results, for_m_result)
+                    else:
+                        m_results = m_results >> for_m_result
+                    if monitor is not None:
+                        monitor.observe(m_results)
                 return m_results
             return for_initial_partial
 
@@ -324,43 +404,115 @@ def make_collect(m):
             rule_funcs = [unit]
 
         collect_func_name = get_call_repr('collect', *rule_funcs)
-        return policy_rule_func(m, collect_func_name)(for_incoming_value)
+        collect_rule_func = policy_rule_func(m, collect_func_name)(
+            for_incoming_value
+        )
+        collect_rule_func.operands = ('collect', rule_funcs)
+        return collect_rule_func
     return collect
 
 
 collect = make_collect(List)
 
 
+@per_monad
 def make_policies(m):
     unit = make_unit(m)
 
     @policy_rule_func(m)
-    def policies(*rule_funcs):
+    def policies(*rule_funcs, **kwargs):
         """
         Given a list of policy rules, returns a single policy rule that
         applies each in turn, keeping scope constant for each. (By resetting
         the path each time)
+
+        `policies` also takes a named argument `pool` (e.g. a
+        `multiprocessing.pool.ThreadPool`) to evaluate the rules
+        independently of one another, on the pool's workers, if
+        `calcifer.analysis` finds that none reads or writes what another
+        writes, but for appending errors. See `calcifer.parallel`: otherwise,
+        or if any rule writes outside what the analysis found, the rules
+        are evaluated in turn instead.
         """
+        pool = kwargs.get('pool')
+        rules = [
+            unit(None) >> rule_func for rule_func in rule_funcs
+        ] if pool is not None else []
+        write_scopes_by_scope = {}
+
+        def for_pool(initial_partial):
+            """
+            Returns the results of evaluating the rules on `pool`, or None
+            """
+            initial_scope = initial_partial.scope
+            if initial_scope not in write_scopes_by_scope:
+                write_scopes_by_scope[initial_scope] = parallel.sibling_scopes(
+                    rules, initial_scope
+                )
+            write_scopes = write_scopes_by_scope[initial_scope]
+            if write_scopes is None:
+                return None
+
+            checked = parallel.run_siblings(
+                pool, initial_partial, list(zip(rules, write_scopes))
+            )
+            if checked is None:
+                return None
+
+            m_results = m.mzero()
+            for combination in parallel.combinations(checked):
+                partial = initial_partial
+                errors = []
+                for write_scope, job_result in zip(write_scopes, combination):
+                    if write_scope is not None:
+                        _, partial = partial.rescope(write_scope).set_node(
+                            job_result.node
+                        )
+                    errors.extend(job_result.errors)
+                last = combination[-1]
+                partial = partial.append_errors(errors).rescope(last.scope)
+                m_results = m_results.mplus(m.unit((last.value, partial)))
+            return m_results
+
         def for_initial_partial(initial_partial):
             initial_scope = initial_partial.scope
+            thread_state = threadstate.current()
+            monitor = thread_state.monitor
+            tracer = thread_state.tracer
+            mode = thread_state.mode
+
+            if pool is not None and len(rule_funcs) > 1:
+                m_results = for_pool(initial_partial)
+                if m_results is not None:
+                    return m_results
 
             m_results = m.unit((None, initial_partial))
 
             def for_rule_func(rule_func):
                 def for_m_result(m_result):
                     _, partial = m_result
-                    _, scoped_partial = partial.select(
-                        initial_scope, set_path=True
-                    )
+                    if mode is not None and mode.skips(partial):
+                        return m.unit(m_result)
+                    thread_state.counters.bind_steps += 1
+                    scoped_partial = partial.rescope(initial_scope)
 
                     rule = unit(None) >> rule_func
+                    if monitor is not None:
+                        return monitor.run(rule, scoped_partial)
                     m_results = rule.run(scoped_partial)
                     return m_results
                 return for_m_result
 
             for rule_func in rule_funcs:
+                if mode is not None and mode.all_failed(m_results):
+                    break
                 for_m_result = for_rule_func(rule_func)
-                m_results = m_results >> for_m_result
+                if tracer is not None:
+                    m_results = tracer.fork(m_results, for_m_result)
+                else:
+                    m_results = m_results >> for_m_result
+                if monitor is not None:
+                    monitor.observe(m_results)
             return m_results
         return for_initial_partial
     return policies
@@ -369,6 +521,108 @@ def make_policies(m):
 policies = make_policies(List)
 
 
+@per_monad
+def make_checkpoints(m):
+    policies = make_policies(m)
+    unit = make_unit(m)
+
+    @policy_rule_func(m)
+    def checkpoints(*rule_funcs, **kwargs):
+        """
+        Like `policies(*rule_funcs)`, but while an incremental evaluation
+        session is active, records what each rule reads and writes, and
+        skips rules that read nothing that changed since the previous
+        evaluation. See `calcifer.incremental`.
+
+        :kwarg unless_errors: like `unless_errors(*rule_funcs)`, do not run
+            the rules that come after an error
+        """
+        skip_errors = kwargs.get('unless_errors', False)
+        # defined below
+        unless_errors = make_unless_errors(m)
+        if skip_errors:
+            unchecked = unless_errors(*rule_funcs)
+        else:
+            unchecked = policies(*rule_funcs)
+
+        def for_initial_partial(initial_partial):
+            session = incremental.active_session()
+            if m is not List or session is None or session.started:
+                return unchecked.run(initial_partial)
+            session.started = True
+
+            initial_scope = initial_partial.scope
+            previous_entries = session.previous_entries(len(rule_funcs))
+            record = session.record
+
+            value, partial = None, initial_partial
+            for idx, rule_func in enumerate(rule_funcs):
+                partial = partial.rescope(initial_scope)
+                skipped = skip_errors and partial.has_errors
+
+                previous = None
+                if previous_entries is not None:
+                    previous = previous_entries[idx]
+                    if (
+                            previous.skipped == skipped and
+                            not session.is_dirty(previous)
+                    ):
+                        partial = previous.splice(partial)
+                        value = previous.value
+                        record.entries.append(previous)
+                        session.reused += 1
+                        continue
+
+                if skipped:
+                    value = None
+                    record.entries.append(incremental.Entry.skip())
+                    session.rerun += 1
+                    if previous is not None:
+                        session.dirty.update(previous.writes)
+                    continue
+
+                errors_before = incremental.log_value(partial, 'errors')
+                context_before = incremental.log_value(partial, 'context')
+                log = AccessLog()
+                with track_access(log):
+                    results = (unit(None) >> rule_func).run(partial)
+
+                results = results.getValue()
+                if len(results) != 1:
+                    # forked: evaluate the rest without a record
+                    record.complete = False
+                    rest = rule_funcs[idx + 1:]
+                    if not rest:
+                        return List(*results)
+                    if skip_errors:
+                        rest_rule = unless_errors(*rest)
+                    else:
+                        rest_rule = policies(*rest)
+                    return List(*results) >> (
+                        lambda result: rest_rule.run(
+                            result[1].rescope(initial_scope)
+                        )
+                    )
+
+                value, partial = results[0]
+                entry = incremental.Entry.from_log(
+                    log, partial, errors_before, context_before, value
+                )
+                record.entries.append(entry)
+                session.rerun += 1
+                session.dirty.update(entry.writes)
+                if previous is not None:
+                    session.dirty.update(previous.writes)
+
+            return m.unit((value, partial))
+        return for_initial_partial
+    return checkpoints
+
+
+checkpoints = make_checkpoints(List)
+
+
+@per_monad
 def make_regarding(m):
     policies = make_policies(m)
     select = make_select(m)
@@ -403,9 +657,7 @@ def make_regarding(m):
 
                 def for_result(result):
                     _, partial = result
-                    _, rescoped_partial = partial.select(
-                        original_scope, set_path=True
-                    )
+                    rescoped_partial = partial.rescope(original_scope)
                     return value, rescoped_partial
 
                 return results.fmap(for_result)
@@ -424,8 +676,10 @@ def make_regarding(m):
 regarding = make_regarding(List)
 
 
+@per_monad
 def make_each(m):
     unit = make_unit(m)
+    regarding = make_regarding(m)
 
     def each(*rule_funcs, **kwargs):
         """
@@ -436,29 +690,169 @@ def make_each(m):
         `each` optionally takes a named argument `ref=dict()` to provide
         a built-in lookup for some reference dictionary. If ref is
         provided, `rule_func(ref[key])` is called instead.
+
+        For list and dict nodes, the children are visited in a single
+        descent: each child is replaced in turn and the node itself is
+        rebuilt once at the end, unless some rule leaves the child's scope.
+
+        `each` also takes a named argument `pool` (e.g. a
+        `multiprocessing.pool.ThreadPool`) to evaluate the children
+        independently of one another, on the pool's workers. See
+        `calcifer.parallel`: if any child's rule writes outside the child,
+        the children are evaluated in turn instead.
         """
         ref_obj = kwargs.get('ref')
+        pool = kwargs.get('pool')
+
+        def rule_for(rule_func, key):
+            if ref_obj is not None:
+                return unit(ref_obj.get(key)) >> rule_func
+            return rule_func
+
+        def node_value(node):
+            value = node.value
+            if not value:
+                value = node
+            return value
 
         def for_keys(keys):
+            def for_initial_partial(initial_partial):
+                initial_scope = initial_partial.scope
+                thread_state = threadstate.current()
+                monitor = thread_state.monitor
+                tracer = thread_state.tracer
+                mode = thread_state.mode
+
+                def to_state(partial):
+                    siblings = Siblings.from_partial(partial)
+                    if siblings is None:
+                        return partial
+                    return siblings
+
+                def each_step(key, rule_func):
+                    def for_m_result(m_result):
+                        _, state = m_result
+                        if mode is not None and mode.skips(state):
+                            return m.unit(m_result)
+                        thread_state.counters.bind_steps += 1
+                        rule = rule_for(rule_func, key)
+
+                        if not isinstance(state, Siblings):
+                            node, _ = state.select(key, set_path=False)
+                            results = regarding(key, rule).run(state)
+                            return results.fmap(
+                                lambda result: (node, to_state(result[1]))
+                            )
+
+                        step, crumb, child_partial = state.enter(key)
+                        node = child_partial.zipper.node
+                        if not isinstance(rule, PolicyRule):
+                            rule = rule(node_value(node))
+
+                        replaced = [False]
+
+                        def for_result(result):
+                            _, partial = result
+                            breadcrumbs = partial.zipper.breadcrumbs
+                            if breadcrumbs and breadcrumbs[0] is crumb:
+                                new_state = state.replace(
+                                    step, partial.zipper.node,
+                                    in_place=not replaced[0]
+                                )
+                                replaced[0] = True
+                            else:
+                                parent_partial = partial.rescope(initial_scope)
+                                new_state = to_state(parent_partial)
+                            return node, new_state
+
+                        return rule.run(child_partial).fmap(for_result)
+                    return for_m_result
 
-            @policy_rule_func(m)
-            def each_step(key, rule_func):
-                if ref_obj is not None:
-                    value = ref_obj.get(key)
-                    return (
-                        regarding(key, unit(value) >> rule_func)
-                    )
-                return regarding(key, rule_func)
+                def each_sequential(m_result, rule_func):
+                    m_results = m.unit(m_result)
+                    for key in keys:
+                        m_results = m_results >> each_step(key, rule_func)
+                    return m_results
 
-            steps = [
-                each_step(key, rule_func)
-                for rule_func in rule_funcs
-                for key in keys
-            ]
-            return regarding("", *steps)
+                def each_parallel(rule_func):
+                    def for_m_result(m_result):
+                        _, state = m_result
+                        if mode is not None and mode.skips(state):
+                            return m.unit(m_result)
+                        if not isinstance(state, Siblings) or not keys:
+                            return each_sequential(m_result, rule_func)
+
+                        entered = [(key, state.enter(key)) for key in keys]
+                        jobs = []
+                        for key, (_, _, child_partial) in entered:
+                            rule = rule_for(rule_func, key)
+                            if not isinstance(rule, PolicyRule):
+                                rule = rule(
+                                    node_value(child_partial.zipper.node)
+                                )
+                            jobs.append((child_partial, rule))
+
+                        checked = parallel.run_disjoint(pool, jobs)
+                        if checked is None:
+                            return each_sequential(m_result, rule_func)
+
+                        node = entered[-1][1][2].zipper.node
+                        m_results = m.mzero()
+                        for combination in parallel.combinations(checked):
+                            new_state = state
+                            errors = []
+                            for (_, (step, _, _)), job_result in zip(
+                                    entered, combination
+                            ):
+                                new_state = new_state.replace(
+                                    step, job_result.node,
+                                    in_place=new_state is not state
+                                )
+                                errors.extend(job_result.errors)
+                            if errors:
+                                new_state = to_state(
+                                    new_state.partial().append_errors(errors)
+                                )
+                            m_results = m_results.mplus(
+                                m.unit((node, new_state))
+                            )
+                        return m_results
+                    return for_m_result
+
+                m_results = m.unit((None, to_state(initial_partial)))
+                for rule_func in rule_funcs:
+                    if pool is not None:
+                        m_results = m_results >> each_parallel(rule_func)
+                        continue
+                    for key in keys:
+                        if mode is not None and mode.all_failed(m_results):
+                            break
+                        if tracer is not None:
+                            m_results = tracer.fork(
+                                m_results, each_step(key, rule_func)
+                            )
+                        else:
+                            m_results = m_results >> each_step(key, rule_func)
+                        if monitor is not None:
+                            monitor.observe(m_results)
+
+                def for_result(result):
+                    node, state = result
+                    if isinstance(state, Siblings):
+                        partial = state.partial()
+                    else:
+                        partial = state.rescope(initial_scope)
+                    if node is None:
+                        node = partial.zipper.node
+                    return node_value(node), partial
+
+                return m_results.fmap(for_result)
+            return for_initial_partial
 
         each_rule_func_name = get_call_repr("each", *rule_funcs, **kwargs)
-        return policy_rule_func(m, each_rule_func_name)(for_keys)
+        each_rule_func = policy_rule_func(m, each_rule_func_name)(for_keys)
+        each_rule_func.operands = ('each', rule_funcs)
+        return each_rule_func
     return each
 
 
@@ -469,6 +863,7 @@ each = make_each(List)
 # Non-Determinism Rules
 #
 
+@per_monad
 def make_fail(m):
     @policy_rule_func(m)
     def fail():
@@ -481,6 +876,7 @@ def make_fail(m):
 fail = make_fail(List)
 
 
+@per_monad
 def make_match(m):
     @policy_rule_func(m)
     def match(compare_to):
@@ -506,6 +902,7 @@ def make_match(m):
 match = make_match(List)
 
 
+@per_monad
 def make_permit_values(m):
     match = make_match(m)
 
@@ -532,6 +929,7 @@ def make_permit_values(m):
 permit_values = make_permit_values(List)
 
 
+@per_monad
 def make_attempt(m):
     mzero = m.mzero
     unit = make_unit(m)
@@ -554,13 +952,18 @@ def make_attempt(m):
                 return result
             return for_partial
         attempt_rule_func_name = get_call_repr("attempt", *rules)
-        return policy_rule_func(m, attempt_rule_func_name)(for_value)
+        attempt_rule_func = policy_rule_func(m, attempt_rule_func_name)(
+            for_value
+        )
+        attempt_rule_func.operands = ('attempt', rules)
+        return attempt_rule_func
     return attempt
 
 
 attempt = make_attempt(List)
 
 
+@per_monad
 def make_catch_attempt(m):
     mzero = m.mzero
     unit = make_unit(m)
@@ -578,14 +981,19 @@ def make_catch_attempt(m):
                 result = op.run(initial_partial)
 
                 if result == mzero():
-                    alternative = (unit(value) >> catch_rule).run(
-                        initial_partial
-                    )
+                    with failfast.handling_errors():
+                        alternative = (unit(value) >> catch_rule).run(
+                            initial_partial
+                        )
                     return alternative
                 return result
             return for_partial
         attempt_rule_func_name = get_call_repr("attempt", catch_rule, *rules)
-        return policy_rule_func(m, attempt_rule_func_name)(for_value)
+        attempt_rule_func = policy_rule_func(m, attempt_rule_func_name)(
+            for_value
+        )
+        attempt_rule_func.operands = ('catch_attempt', (catch_rule,) + rules)
+        return attempt_rule_func
     return catch_attempt
 
 
@@ -596,37 +1004,41 @@ catch_attempt = make_catch_attempt(List)
 # Context Operators
 #
 
+@per_monad
 def make_push_context(m):
-    append_value = make_append_value(m)
-
     @policy_rule_func(m)
     def push_context(context):
         """
         Add an additional context to the stack for the partial
         """
-        return regarding("/context", append_value(context))
+        def for_partial(partial):
+            return m.unit((context, partial.push_context(context)))
+        return for_partial
     return push_context
 
 
 push_context = make_push_context(List)
 
 
+@per_monad
 def make_pop_context(m):
-    unit = make_unit(m)
-
     @policy_rule_func(m)
     def pop_context(passthru):
         """
         Pop the partial's context stack, returning whatever
         value it was called with.
         """
-        return regarding("/context", pop_value()) >> unit(passthru)
+        def for_partial(partial):
+            return m.unit((passthru, partial.pop_context()))
+        return for_partial
+    pop_context.unwinds = True
     return pop_context
 
 
 pop_context = make_pop_context(List)
 
 
+@per_monad
 def make_wrap_context(m):
     push_context = make_push_context(m)
     pop_context = make_pop_context(m)
@@ -638,12 +1050,17 @@ def make_wrap_context(m):
         """
         return push_context(context) >> op >> pop_context
 
+    wrap_context.profile_name = (
+        lambda context, op: "context {}".format(context.name)
+    )
+    wrap_context.trace_category = "context"
     return wrap_context
 
 
 wrap_context = make_wrap_context(List)
 
 
+@per_monad
 def make_require_value(m):
     @policy_rule_func(m)
     def require_value(node):
@@ -672,6 +1089,7 @@ def make_require_value(m):
 require_value = make_require_value(List)
 
 
+@per_monad
 def make_forbid_value(m):
     @policy_rule_func(m)
     def forbid_value(node):
@@ -697,6 +1115,7 @@ def make_forbid_value(m):
 forbid_value = make_forbid_value(List)
 
 
+@per_monad
 def make_unless_errors(m):
     policies = make_policies(m)
 
@@ -717,6 +1136,7 @@ def make_unless_errors(m):
 unless_errors = make_unless_errors(List)
 
 
+@per_monad
 def make_trace(m):
     unit = make_unit(m)
     policies = make_policies(m)
@@ -726,6 +1146,9 @@ def make_trace(m):
         """
         Collates the current scope, the current node's value,
         and the current policy context and returns it as a dict
+
+        The context is the list of frames on the partial's stack (see
+        `Partial.context`), outermost first.
         """
         @policy_rule_func(m)
         def trace_step(rule_func):
@@ -733,8 +1156,7 @@ def make_trace(m):
                 # collect information
                 scope = partial.scope
                 value = partial.scope_value
-                context_node, _ = partial.select("/context")
-                context = context_node.value
+                context = partial.context.value
 
                 # build obj that gets passed to rule_func
                 trace_obj = {
@@ -753,9 +1175,7 @@ def make_trace(m):
                 # rescope partial for next step
                 def for_result(result):
                     value, partial = result
-                    _, rescoped_partial = partial.select(
-                        scope, set_path=True
-                    )
+                    rescoped_partial = partial.rescope(scope)
                     return value, rescoped_partial
 
                 return results.fmap(for_result)
@@ -773,18 +1193,48 @@ def make_trace(m):
 trace = make_trace(List)
 
 
-def make_args_receiver(m):
-    unit = make_unit(m)
+@per_monad
+def make_receive_args(m):
+    @policy_rule_func(m)
+    def receive_args(values, indexed_rules):
+        """
+        Given a tuple of argument values and a sequence of
+        `(positions, policy_rule)` pairs, runs each policy rule once, in
+        order, and returns, for each resulting branch, a new tuple of values
+        with every index in `positions` replaced by that rule's result.
 
-    def args_receiver(values):
-        @policy_rule_func(m)
-        def receive(idx, policy_rule):
-            def save(value):
-                values[idx] = value
-                return unit(None)
-            return policy_rule >> save
-        return receive
-    return args_receiver
+        Each branch gets its own tuple; nothing is shared between branches.
+
+        :param values: tuple of argument values
+        :param indexed_rules: sequence of (tuple of int, PolicyRule)
+        :returns: PolicyRule (tuple of values)
+        """
+        values = tuple(values)
+
+        def for_rule(positions, rule):
+            def for_m_result(m_result):
+                received, partial = m_result
+                counts = counters.current()
+                counts.provider_runs += 1
+                counts.provider_saved += len(positions) - 1
+
+                def for_result(result):
+                    value, new_partial = result
+                    new_received = list(received)
+                    for idx in positions:
+                        new_received[idx] = value
+                    return tuple(new_received), new_partial
+
+                return rule.run(partial).fmap(for_result)
+            return for_m_result
+
+        def for_partial(partial):
+            m_results = m.unit((values, partial))
+            for positions, rule in indexed_rules:
+                m_results = m_results >> for_rule(positions, rule)
+            return m_results
+        return for_partial
+    return receive_args
 
 
-args_receiver = make_args_receiver(List)
+receive_args = make_receive_args(List)
@@ -0,0 +1,340 @@
+"""
+`calcifer.parallel` module
+
+Evaluation of independent policy rules on a pool of workers.
+
+`run_disjoint(pool, jobs)` runs each `(partial, rule)` job, where every
+partial is the same tree scoped to a different, non-overlapping path (e.g.
+the children of one list node). Each job's results are then checked: outside
+its own scope, the tree must be left as it was, except for errors appended to
+"/errors" and a "/context" stack left as found.
+
+`run_siblings(pool, partial, jobs)` runs sibling rules (e.g. those given to
+`policies()`) on the same partial, each job a `(rule, scope)` pair, where
+`scope` is where the rule may write, or None if it only appends errors.
+`sibling_scopes(rules, scope)` finds those scopes with `calcifer.analysis`,
+or returns None unless the rules are independent: none may read or write
+what another writes, other than appending errors and using the "/context"
+stack. Results are checked the same way.
+
+If every job passes, results can be combined with `combinations()`: one
+result per job, in the order sequential evaluation would produce them, with
+the errors of every job appended in job order. If any job writes outside its
+scope, `run_disjoint` and `run_siblings` return None and the caller should
+evaluate the jobs sequentially instead.
+
+A pool is anything with a `map(func, iterable)` method that returns a list,
+e.g. `multiprocessing.pool.ThreadPool`. Policy rules are closures that cannot
+be pickled, so process pools are not supported.
+
+Workers count operations (see `calcifer.counters`) on their own, and the
+counts are added to the calling thread's once the results are used. While
+the calling thread is profiled, traced, fan-out monitored or memory
+accounted, jobs are evaluated sequentially instead, so that those
+instruments see all of the work. So they are while failing fast (see
+`calcifer.failfast`): a later child is not run once an earlier one failed.
+"""
+import itertools
+import logging
+
+from calcifer import (
+    counters, failfast, fanout, memo, memory, profiling, tracing
+)
+from calcifer.partial import current_access_log, track_access
+from calcifer.tree import DictPolicyNode
+
+logger = logging.getLogger(__name__)
+
+
+ROOT_LOGS = ('errors', 'context')
+
+
+class JobResult(object):
+    """
+    One result of a job: the rule's value, the node left at the job's scope,
+    the errors the rule appended to "/errors", and the scope the rule left
+    its partial at
+    """
+    __slots__ = ('value', 'node', 'errors', 'scope')
+
+    def __init__(self, value, node, errors, scope):
+        self.value = value
+        self.node = node
+        self.errors = errors
+        self.scope = scope
+
+    def __repr__(self):
+        return (
+            "JobResult(value={!r}, node={!r}, errors={!r}, scope={!r})"
+        ).format(self.value, self.node, self.errors, self.scope)
+
+
+def overlaps(path, other):
+    shortest = min(len(path), len(other))
+    return list(path[:shortest]) == list(other[:shortest])
+
+
+def appended_errors(partial, result):
+    """
+    Compares two partials scoped to the same path. Returns the list of errors
+    appended in `result`, if nothing else changed outside that path, or None.
+    """
+    crumbs = partial.zipper.breadcrumbs
+    new_crumbs = result.zipper.breadcrumbs
+    if len(crumbs) != len(new_crumbs):
+        return None
+
+    for depth, (crumb, new_crumb) in enumerate(zip(crumbs, new_crumbs)):
+        if crumb is new_crumb:
+            # nothing above an untouched breadcrumb can have changed
+            return []
+        if crumb.step_taken != new_crumb.step_taken:
+            return None
+
+        steps = crumb.steps_not_taken
+        new_steps = new_crumb.steps_not_taken
+        if depth == len(crumbs) - 1:
+            return appended_to_logs(steps, new_steps)
+        if any(
+                steps.get(key) is not new_steps.get(key)
+                for key in set(steps) | set(new_steps)
+        ):
+            return None
+    return []
+
+
+def root_appended_errors(partial, result):
+    """
+    Compares two partials of the same tree. Returns the list of errors
+    appended in `result`, if nothing else changed, or None.
+    """
+    root = partial.zipper.root.node
+    new_root = result.zipper.root.node
+    if not (
+            isinstance(root, DictPolicyNode) and
+            isinstance(new_root, DictPolicyNode)
+    ):
+        return None
+    return appended_to_logs(root.nodes, new_root.nodes)
+
+
+def appended_to_logs(nodes, new_nodes):
+    """
+    Compares the children of the root, by step, in two trees. Returns the
+    list of errors appended in `new_nodes`, if they hold the same nodes but
+    for "/errors" and a "/context" stack with the same value, or None.
+    """
+    errors = []
+    for key in set(nodes) | set(new_nodes):
+        node = nodes.get(key)
+        new_node = new_nodes.get(key)
+        if node is new_node:
+            continue
+        if key not in ROOT_LOGS or new_node is None:
+            return None
+
+        old_value = (node.value if node is not None else None) or []
+        new_value = new_node.value or []
+        if key == 'context':
+            if new_value != old_value:
+                return None
+        elif new_value[:len(old_value)] != old_value:
+            return None
+        else:
+            errors = new_value[len(old_value):]
+    return errors
+
+
+def instrumented():
+    """
+    Whether the calling thread has an instrument active that only sees
+    work done on this thread
+    """
+    return (
+        profiling.active_profiler() is not None or
+        tracing.active_tracer() is not None or
+        fanout.active_monitor() is not None or
+        memory.active_tracker() is not None
+    )
+
+
+def run_job(job):
+    """
+    Returns the job's results, or None if they are not a list, with the
+    operations counted running it
+    """
+    partial, rule, scopes, access_log = job
+    with memo.activate(scopes), track_access(access_log), \
+            counters.detached() as counts:
+        results = rule.run(partial)
+    try:
+        return list(results.getValue()), counts
+    except (AttributeError, TypeError):
+        # not a List monad; evaluated sequentially
+        return None, counts
+
+
+def run_disjoint(pool, jobs):
+    """
+    Runs `(partial, rule)` jobs on `pool` and returns, for each job, a list
+    of JobResults, or None if the jobs cannot be evaluated independently.
+    """
+    if instrumented() or failfast.active_mode() is not None:
+        return None
+
+    paths = [partial.path for partial, _ in jobs]
+    for i, path in enumerate(paths):
+        if path and path[0] in ROOT_LOGS:
+            return None
+        if any(overlaps(path, other) for other in paths[i + 1:]):
+            return None
+
+    return run_checked(
+        pool, [(partial, rule, partial) for partial, rule in jobs]
+    )
+
+
+def run_siblings(pool, partial, jobs):
+    """
+    Runs `(rule, scope)` jobs on `pool`, each rule on `partial`, and returns,
+    for each job, a list of JobResults (with the node left at `scope`, or
+    None), or None if the jobs cannot be evaluated independently.
+    """
+    if instrumented() or failfast.active_mode() is not None:
+        return None
+
+    return run_checked(pool, [
+        (partial, rule, partial.rescope(scope) if scope is not None else None)
+        for rule, scope in jobs
+    ])
+
+
+def run_checked(pool, jobs):
+    """
+    Runs `(partial, rule, scoped)` jobs on `pool`, where `scoped` is the
+    partial scoped to where the rule may write, or None if it may only
+    append errors, and checks their results.
+    """
+    scopes = memo.current_scopes()
+    access_log = current_access_log()
+    ran = pool.map(
+        run_job,
+        [(partial, rule, scopes, access_log) for partial, rule, _ in jobs]
+    )
+
+    checked = []
+    for (partial, _, scoped), (results, _) in zip(jobs, ran):
+        if results is None:
+            return None
+        job_results = []
+        for value, result in results:
+            result_scope = result.scope
+            if scoped is None:
+                node = None
+                errors = root_appended_errors(partial, result)
+            else:
+                node, result = result.select(scoped.scope, set_path=True)
+                errors = appended_errors(scoped, result)
+            if errors is None:
+                logger.debug(
+                    "Rule left scope %s, evaluating sequentially",
+                    scoped.scope if scoped is not None else None
+                )
+                return None
+            job_results.append(JobResult(value, node, errors, result_scope))
+        checked.append(job_results)
+
+    counts = counters.current()
+    for _, job_counts in ran:
+        counts.add(job_counts)
+    return checked
+
+
+def log_step(scope):
+    """
+    "errors" or "context" for scopes in those logs, or None
+    """
+    steps = scope.split("/")
+    if len(steps) > 1 and steps[1] in ROOT_LOGS:
+        return steps[1]
+    return None
+
+
+def common_scope(scopes):
+    """
+    The deepest scope above every one of `scopes`, none of them with "*"
+    in a step that is kept
+    """
+    paths = [[step for step in scope.split("/") if step] for scope in scopes]
+    common = []
+    for steps in zip(*paths):
+        if len(set(steps)) > 1 or "*" in steps:
+            break
+        common.append(steps[0])
+    return "/" + "/".join(common)
+
+
+def sibling_scopes(rules, scope):
+    """
+    Analyzes sibling rules, each run from `scope`. Returns, for each rule,
+    the scope it writes beneath, or None if it only appends errors; or None
+    if the rules may not be independent of one another.
+    """
+    # `calcifer.analysis` imports the operators, which import this module
+    from calcifer.analysis import Access, analyze, overlaps as may_overlap
+
+    accesses = []
+    for rule in rules:
+        access = analyze(rule, scope).access
+        if access.unknown:
+            return None
+        accesses.append(access)
+
+    # errors are appended in job order; reading them depends on that order
+    reads_errors = [
+        any(log_step(read) == 'errors' for read in access.reads)
+        for access in accesses
+    ]
+    writes_errors = [
+        any(log_step(write) == 'errors' for write in access.writes)
+        for access in accesses
+    ]
+    for i, reads in enumerate(reads_errors):
+        if reads and any(
+                writes for j, writes in enumerate(writes_errors) if j != i
+        ):
+            return None
+
+    accesses = [
+        Access(
+            [read for read in access.reads if log_step(read) is None],
+            [write for write in access.writes if log_step(write) is None],
+        )
+        for access in accesses
+    ]
+    write_scopes = [
+        common_scope(access.writes) if access.writes else None
+        for access in accesses
+    ]
+    if "/" in write_scopes:
+        # the whole tree, logs included
+        return None
+    for i, access in enumerate(accesses):
+        for j in range(i + 1, len(accesses)):
+            if access.conflicts(accesses[j]):
+                return None
+            if (
+                    write_scopes[i] is not None and
+                    write_scopes[j] is not None and
+                    may_overlap(write_scopes[i], write_scopes[j])
+            ):
+                return None
+    return write_scopes
+
+
+def combinations(checked):
+    """
+    Yields one JobResult per job, for every combination, in the order the
+    jobs' results would be combined if evaluated one after another
+    """
+    return itertools.product(*checked)
@@ -11,11 +11,95 @@ The data structure has two parts:
 Operations are provided on Partial that allow the manipulation of either
 the policy tree or the pointer, or both.
 """
+import copy
 import os
+import threading
+from calcifer import counters, tracing
 from calcifer.tree import (
-    PolicyNode, UnknownPolicyNode, LeafPolicyNode
+    PolicyNode, UnknownPolicyNode, LeafPolicyNode, DictPolicyNode,
+    ListPolicyNode, LogPolicyNode,
 )
-from calcifer.zipper import Zipper
+from calcifer.zipper import Zipper, SiblingsBreadcrumb
+
+
+# "/errors" and "/context" are logs, kept out of access logs
+LOG_STEPS = ('errors', 'context')
+
+_tracking = threading.local()
+
+
+class AccessLog(object):
+    """
+    The absolute paths (as tuples of steps) of nodes read and written by
+    partials while the log is tracked (see `track_access`)
+    """
+    def __init__(self):
+        self.reads = set()
+        self.writes = set()
+
+
+class track_access(object):  # pylint: disable=invalid-name
+    """
+    Records the nodes read and written on this thread, for the duration of
+    the block, to an AccessLog
+    """
+    def __init__(self, log):
+        self.log = log
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = getattr(_tracking, 'log', None)
+        _tracking.log = self.log
+        return self.log
+
+    def __exit__(self, *exc_info):
+        _tracking.log = self.previous
+
+
+def current_access_log():
+    return getattr(_tracking, 'log', None)
+
+
+def log_access(zipper, write=False):
+    log = getattr(_tracking, 'log', None)
+    if log is None:
+        return
+    path = zipper.path
+    if path and path[0] in LOG_STEPS:
+        return
+    if write:
+        log.writes.add(tuple(path))
+    else:
+        log.reads.add(tuple(path))
+
+
+def log_length(node):
+    """
+    The number of entries in a log node (e.g. "/errors"), which may not be
+    defined yet
+    """
+    if isinstance(node, LogPolicyNode):
+        return node.length
+    if isinstance(node, ListPolicyNode):
+        return len(node.nodes)
+    return 0
+
+
+def root_child(zipper, step):
+    """
+    Returns the node at `step` below the root, or None. Unless the zipper
+    is below that node, only its outermost breadcrumb is looked at.
+    """
+    crumbs = zipper.breadcrumbs
+    if not crumbs:
+        node = zipper.node
+    elif crumbs[-1].step_taken != step:
+        return crumbs[-1].sibling(step)
+    else:
+        node = zipper.root.node
+    if isinstance(node, DictPolicyNode):
+        return node.nodes.get(step)
+    return None
 
 
 class Partial(object):
@@ -32,7 +116,14 @@ class Partial(object):
 
     @property
     def root(self):
-        return self.zipper.root.node.value
+        tracer = tracing.active_tracer()
+        if tracer is not None:
+            with tracer.span("root", "zipper", scope=self.scope):
+                root = self.zipper.root
+        else:
+            root = self.zipper.root
+        log_access(root)
+        return root.node.value
 
     @property
     def path(self):
@@ -50,7 +141,7 @@ class Partial(object):
     def get_template(self):
         return self.zipper.root.node.get_template()
 
-    def select(self, scope, set_path=True):
+    def select(self, scope, set_path=True, read=True):
         """
         Select a node at a given scope, possibly setting the path on a newly returned
         partial.
@@ -58,7 +149,19 @@ class Partial(object):
         Cases:
             - If scope begins with "/", it's an absolute path
             - Otherwise, scope is a relative path, and the existing path should be subscoped
+
+        Unless `read` is False, the node is logged as read (see `track_access`).
         """
+        counters.current().select += 1
+        tracer = tracing.active_tracer()
+        if tracer is None:
+            return self._select(scope, set_path, read)
+        with tracer.span(
+                "select {}".format(scope), "zipper", scope=self.scope
+        ):
+            return self._select(scope, set_path, read)
+
+    def _select(self, scope, set_path, read):
         old_scope = self.scope
 
         if scope == "":
@@ -91,6 +194,8 @@ class Partial(object):
             undo_path.insert(0, undo_step)
 
         node = zipper.node
+        if read:
+            log_access(zipper)
 
         if not set_path:
             for step in undo_path:
@@ -101,7 +206,15 @@ class Partial(object):
 
         return node, Partial(zipper)
 
+    def rescope(self, scope):
+        """
+        Returns a partial scoped to `scope`, without reading the node there
+        """
+        _, partial = self.select(scope, set_path=True, read=False)
+        return partial
+
     def define_as(self, definition):
+        counters.current().define_as += 1
         existing_value = self.scope_value
         if existing_value:
             valid, new_definition = definition.match(existing_value)
@@ -109,6 +222,7 @@ class Partial(object):
                 return (None, self)
             definition = new_definition
 
+        log_access(self.zipper, write=True)
         new_zipper = self.zipper.set_node(LeafPolicyNode(definition))
         partial = Partial(new_zipper)
         return definition, partial
@@ -117,6 +231,7 @@ class Partial(object):
         partial = self
         if selector is not None:
             _, partial = partial.select(selector)
+        log_access(partial.zipper, write=True)
         new_zipper = partial.zipper.set_node(PolicyNode.from_obj(value))
 
         return (
@@ -124,13 +239,102 @@ class Partial(object):
         )
 
     def set_node(self, node):
+        log_access(self.zipper, write=True)
         new_zipper = self.zipper.set_node(node)
 
         return (
             node, Partial(new_zipper)
         )
 
+    def append_errors(self, errors):
+        """
+        Returns a partial with `errors` appended to the "/errors" log, scoped
+        where this one is. Each append is O(1) whatever the length of the
+        log (see `LogPolicyNode`), and the depth of the scope (see
+        `_update_log`).
+        """
+        if not errors:
+            return self
+
+        def append_to(log):
+            for error in errors:
+                log = log.append(error)
+            return log
+        return self._update_log("errors", append_to)
+
+    @property
+    def context(self):
+        """
+        The "/context" stack, as a LogPolicyNode: a snapshot that shares its
+        frames with the partial rather than copying them
+        """
+        node, _ = self.select("/context", set_path=False, read=False)
+        return LogPolicyNode.from_node(node)
+
+    def push_context(self, context):
+        """
+        Returns a partial with `context` pushed on the "/context" stack, in
+        O(1) whatever the depth of the stack
+        """
+        return self._update_log("context", lambda log: log.append(context))
+
+    def pop_context(self):
+        """
+        Returns a partial with the "/context" stack popped, in O(1)
+        """
+        return self._update_log("context", lambda log: log.pop())
+
+    def _update_log(self, step, update):
+        """
+        Returns a partial with `update(log)` as the log at `step` below the
+        root, scoped where this one is.
+
+        Unless the partial is scoped at the root or inside the log, the log
+        is a step not taken of the outermost breadcrumb, which is replaced:
+        no node between the scope and the root is rebuilt, so this takes
+        the same time at any depth, but for copying the list of breadcrumbs.
+        """
+        zipper = self.zipper
+        crumbs = zipper.breadcrumbs
+        if (
+                crumbs and crumbs[-1].step_taken != step and
+                isinstance(crumbs[-1].from_node, DictPolicyNode)
+        ):
+            outermost = crumbs[-1]
+            node = outermost.sibling(step)
+            if node is None:
+                node = UnknownPolicyNode()
+            outermost = outermost.with_sibling(
+                step, update(LogPolicyNode.from_node(node))
+            )
+            return Partial(Zipper(crumbs[:-1] + [outermost], zipper.node))
+
+        scope = self.scope
+        node, partial = self.select("/" + step, read=False)
+        _, partial = partial.set_node(update(LogPolicyNode.from_node(node)))
+        return partial.rescope(scope)
+
+    @property
+    def has_errors(self):
+        """
+        Whether "/errors" holds any error, found in O(1) wherever the partial
+        is scoped (outside "/errors")
+        """
+        return log_length(root_child(self.zipper, 'errors')) > 0
+
+    @property
+    def last_error_index(self):
+        """
+        The index of the last error in "/errors", or None if there is none
+        """
+        node, _ = self.select("/errors", set_path=False, read=False)
+        length = log_length(node)
+        if not length:
+            return None
+        return length - 1
+
     def match(self, value):
+        counters.current().match += 1
         node, new_self = self.select("")
         matches, new_node = node.match(value)
         _, new_partial = new_self.set_node(new_node)
@@ -141,3 +345,82 @@ class Partial(object):
 
     def __repr__(self):
         return "Partial(root={}, path={})".format(self.root, self.path)
+
+
+class Siblings(object):
+    """
+    The children of the node at some partial's scope, held as a plain list
+    or dict of nodes so that each child can be visited and replaced in turn
+    without rebuilding the parent node in between.
+
+    `enter(key)` returns a partial scoped to the child, and `partial()`
+    rebuilds the parent, once, with whatever children it holds by then.
+    """
+    def __init__(self, zipper, children):
+        self.zipper = zipper
+        self.children = children
+
+    @staticmethod
+    def from_partial(partial):
+        """
+        Returns Siblings for the node at the partial's scope, or None if
+        that node is not a list or dict node
+        """
+        node = partial.zipper.node
+        if isinstance(node, ListPolicyNode):
+            return Siblings(partial.zipper, list(node.nodes))
+        if isinstance(node, DictPolicyNode):
+            return Siblings(partial.zipper, dict(node.nodes))
+        return None
+
+    @property
+    def has_errors(self):
+        """
+        Whether "/errors" holds any error (see `Partial.has_errors`)
+        """
+        if self.zipper.breadcrumbs or not isinstance(self.children, dict):
+            return Partial(self.zipper).has_errors
+        # the siblings are the root's children
+        return log_length(self.children.get('errors')) > 0
+
+    def enter(self, key):
+        """
+        Returns (step, breadcrumb, partial) for the child at `key`
+        """
+        children = self.children
+        if isinstance(children, list):
+            step = int(key)
+            if step >= len(children):
+                children.extend(
+                    [UnknownPolicyNode()] * (step - len(children) + 1)
+                )
+        else:
+            step = key
+            if step not in children:
+                children[step] = UnknownPolicyNode()
+
+        crumb = SiblingsBreadcrumb(step, self.zipper.node, children)
+        child_zipper = Zipper(
+            [crumb] + self.zipper.breadcrumbs, children[step]
+        )
+        return step, crumb, Partial(child_zipper)
+
+    def replace(self, step, node, in_place=False):
+        """
+        Returns Siblings with the child at `step` replaced. Unless
+        `in_place`, the children are copied first.
+        """
+        children = self.children
+        if not in_place:
+            children = copy.copy(children)
+        children[step] = node
+        return Siblings(self.zipper, children)
+
+    def partial(self):
+        counters.current().reconstruct += 1
+        children = self.children
+        if isinstance(children, list):
+            node = ListPolicyNode(*children)
+        else:
+            node = DictPolicyNode(**children)
+        return Partial(self.zipper.set_node(node))
@@ -1,13 +1,35 @@
 import copy
 import logging
+import sys
+import time
+from collections import namedtuple
 
+import six
+
+from calcifer import (
+    counters, failfast, fanout, incremental, memo, memory,
+)
 from calcifer.contexts import Context
 from calcifer.partial import Partial
-from calcifer.operators import unless_errors
+from calcifer.operators import checkpoints, unless_errors
 
 logger = logging.getLogger(__name__)
 
 
+def unless_errors_wrapper(policy_rules):
+    # the wrapper of endpoint policies
+    return unless_errors(*policy_rules)
+
+
+class PolicyExecution(namedtuple('PolicyExecution', ['ref', 'args', 'parent'])):
+    """
+    What a single run of a policy is about: the request object (`ref`),
+    the policy's `using()` arguments and the object the policy was looked
+    up on. Runs never store any of these on the policy itself.
+    """
+    __slots__ = ()
+
+
 class BasePolicy(object):
     ctx_class = Context
 
@@ -16,9 +38,12 @@ class BasePolicy(object):
             method = args[0]
             self(method)
 
-        self.includes = kwargs.get('includes', [])
+        self.includes = tuple(kwargs.get('includes', ()))
         self.bind_ref = kwargs.get('bind_ref', False)
-        self.args = []
+        self.args = ()
+        self.parent = None
+        self.memo_scope = memo.MemoScope(memo.POLICY)
+        self._include_graphs = {}
 
     def __call__(self, method):
         if not hasattr(self, 'method'):
@@ -26,53 +51,170 @@ class BasePolicy(object):
         return self
 
     def __get__(self, obj, cls=None):
-        self.parent = obj
-        return self
+        if obj is None or obj is self.parent:
+            return self
+        return self.replace(parent=obj)
 
-    def using(self, *args):
-        new_self = copy.deepcopy(self)
-        new_self.args = args
+    def replace(self, **changes):
+        """
+        Returns a shallow copy of this policy with some attributes changed.
+        The method, includes and memo scope are shared, never copied.
+        """
+        new_self = copy.copy(self)
+        new_self.__dict__.update(changes)
         return new_self
 
-    def get_included_policy(self, policy_name):
-        return getattr(self.parent, policy_name)
+    def using(self, *args):
+        return self.replace(args=args)
 
-    def pair_included_policy(self, policy):
-        if hasattr(self, 'ref'):
-            policy.ref = self.ref
-        policy.args = self.args
+    def get_included_policy(self, policy_name, parent=None):
+        if parent is None:
+            parent = self.parent
+        return getattr(parent, policy_name)
+
+    def pair_included_policy(self, policy, execution):
+        """
+        Returns the execution for an included policy: same request and
+        arguments, e.g.
+        """
+        return execution._replace(parent=policy.parent)
 
     defaults = {
     }
 
+    # branch counts to log a warning at, and to abort evaluation with a
+    # BranchExplosionError at (see `calcifer.fanout`)
+    warn_branches = None
+    max_branches = None
+
+    # skip what is left of a branch once it has an error, and stop once
+    # every branch has (see `calcifer.failfast`)
+    fail_fast = False
+
     def initial_partial(self, obj=None):
         if obj is None:
             obj = {}
 
-        for k, v in self.__class__.defaults.items():
-            if k not in obj:
-                obj[k] = v
+        defaults = self.__class__.defaults
+        if any(k not in obj for k in defaults):
+            obj = dict(obj)
+            for k, v in defaults.items():
+                obj.setdefault(k, v)
 
         return Partial.from_obj(obj)
 
-    def run(self, obj):
-        new_self = copy.deepcopy(self)
+    def execution(self, obj=None):
+        return PolicyExecution(ref=obj, args=self.args, parent=self.parent)
+
+    def finalize(self, obj=None, checkpointed=False):
+        """
+        Returns the finalized policy rule for a request object. The request
+        only matters to policies that bind it (`bind_ref=True`).
 
-        new_self.ref = obj
-        ctx = new_self.context
-        policy_rule = ctx.finalize()
+        If `checkpointed`, the top-level rules are combined with
+        `checkpoints()`, so that they can be re-evaluated incrementally.
+        Raises ValueError if the context has a wrapper of its own, other
+        than the `unless_errors` of endpoint policies.
+        """
+        ctx = self.build_context(self.execution(obj))
+        if checkpointed:
+            if ctx.wrapper is ctx.__class__.get_default_wrapper():
+                ctx.wrapper = lambda policy_rules: checkpoints(*policy_rules)
+            elif ctx.wrapper is unless_errors_wrapper:
+                ctx.wrapper = lambda policy_rules: checkpoints(
+                    *policy_rules, unless_errors=True
+                )
+            else:
+                raise ValueError(
+                    "Cannot checkpoint {}: its context has a wrapper of "
+                    "its own".format(ctx.ctx_name)
+                )
+        return ctx.finalize()
 
-        partial = new_self.initial_partial(obj)
-        results = [
-            new_self.resolve(final) for _, final in policy_rule.run(partial)
-        ]
+    def evaluate(self, policy_rule, obj):
+        return self.evaluate_partial(policy_rule, self.initial_partial(obj))
+
+    def evaluate_partial(self, policy_rule, partial):
+        with self.memo_scope, memo.MemoScope(memo.EVALUATION), \
+                fanout.monitoring(self.warn_branches, self.max_branches), \
+                failfast.failing_fast(self.fail_fast), \
+                counters.evaluation():
+            results = [
+                self.resolve(final)
+                for _, final in policy_rule.run(partial)
+            ]
 
         return results
 
+    def run(self, obj):
+        with memory.accounting(self.__class__.__name__):
+            return self.evaluate(self.finalize(obj), obj)
+
+    def run_recorded(self, obj):
+        """
+        Runs the policy, keeping a record of what each top-level rule read
+        and wrote. Returns a RecordedRun, to pass to `rerun()`.
+        """
+        return self.evaluate_recorded(
+            self.finalize(obj, checkpointed=True),
+            self.initial_partial(obj),
+            incremental.Session(),
+        )
+
+    def rerun(self, previous, changes):
+        """
+        Re-evaluates a RecordedRun after setting some values, given as a
+        dict of pointers (e.g. "/plan") to values. Only top-level rules that
+        read something that changed are run again.
+        """
+        partial = previous.initial_partial
+        dirty = []
+        for pointer, value in sorted(changes.items()):
+            _, partial = partial.set_value(value, selector=pointer)
+            dirty.append(incremental.to_path(pointer))
+        _, partial = partial.select("/", set_path=True)
+
+        policy_rule = previous.policy_rule
+        record = previous.record
+        if self.bind_ref:
+            # the rule itself depends on the request
+            policy_rule = self.finalize(partial.root, checkpointed=True)
+            record = None
+
+        return self.evaluate_recorded(
+            policy_rule, partial, incremental.Session(record, dirty)
+        )
+
+    def evaluate_recorded(self, policy_rule, partial, session):
+        with session:
+            results = self.evaluate_partial(policy_rule, partial)
+        return RecordedRun(
+            policy_rule, partial, session.record, results, session.stats
+        )
+
+    def run_many(self, objs, workers=None, chunk_size=1, processes=False):
+        """
+        Runs the policy for each request object in `objs`, finalizing it
+        only once, and returns a BatchRun: an iterator over the results of
+        each run, in the order of `objs`.
+
+        :param workers: number of worker threads (or processes) to run on;
+            by default, requests are run in turn on the calling thread
+        :param chunk_size: number of requests handed to a worker at a time
+        :param processes: use a process pool, forked once the policy is
+            finalized. Results must then be picklable. Raises ValueError
+            where processes cannot be forked (see `fork_context`).
+        """
+        start = time.time()
+        batch = BatchRun(
+            PolicyPlan(self), objs,
+            workers=workers, chunk_size=chunk_size, processes=processes,
+        )
+        batch.stats.setup_seconds = time.time() - start
+        return batch
+
     def include(self, other):
-        new_self = copy.deepcopy(self)
-        new_self.includes.append(other)
-        return new_self
+        return self.replace(includes=self.includes + (other,))
 
     @staticmethod
     def resolve(final):
@@ -80,32 +222,283 @@ class BasePolicy(object):
 
     @property
     def context(self):
+        return self.build_context(self.execution())
+
+    @property
+    def include_key(self):
+        return (self.method, self.includes)
+
+    def include_graph(self, parent):
+        """
+        Returns the IncludeGraph for this policy, as looked up on `parent`.
+        Graphs are resolved once per class of parent and shared by every
+        copy of this policy.
+        """
+        key = (parent.__class__, self.includes)
+        graph = self._include_graphs.get(key)
+        if graph is None:
+            graph = IncludeGraph(self, parent)
+            self._include_graphs[key] = graph
+        return graph
+
+    def build_context(self, execution, graph=None, finalized=None):
+        """
+        Builds the context for a run. Included policies are finalized once
+        per build, even if included more than once.
+        """
         ctx_class = self.__class__.ctx_class
         ctx = ctx_class(
             name=getattr(self.method, "__name__", None)
         )
         method_args = [ctx]
         if self.bind_ref:
-            method_args.append(self.ref)
-        method_args += self.args
+            method_args.append(execution.ref)
+        method_args += execution.args
         self.method(*method_args)
-        if getattr(self, 'parent', None):
+        if execution.parent is not None:
             # TODO this is a codesmell
             logger.debug("context name: %s", ctx.ctx_name)
             if ctx.ctx_name == 'endpoint_policy':
-                ctx.wrapper = lambda policy_rules: unless_errors(*policy_rules)
+                ctx.wrapper = unless_errors_wrapper
 
-            includes = copy.copy(self.includes)
-            for policy_or_name in includes:
-                if isinstance(policy_or_name, str) and hasattr(self, 'parent'):
-                    policy = self.get_included_policy(policy_or_name)
-                else:
-                    policy = policy_or_name
-                self.pair_included_policy(policy)  # copy ref and args, e.g.
-                ctx.append(policy.context.finalize())
+            if graph is None:
+                graph = self.include_graph(execution.parent)
+            if finalized is None:
+                finalized = {}
+
+            for is_named, policy in graph.edges[self.include_key]:
+                if is_named and policy.parent is not execution.parent:
+                    policy = policy.replace(parent=execution.parent)
+                key = policy.include_key
+                if key not in finalized:
+                    # copy ref and args, e.g.
+                    policy_execution = self.pair_included_policy(
+                        policy, execution
+                    )
+                    finalized[key] = policy.build_context(
+                        policy_execution, graph, finalized
+                    ).finalize()
+                ctx.append(finalized[key])
         return ctx
 
 
+class IncludeCycleError(ValueError):
+    def __init__(self, names):
+        self.names = names
+        super(IncludeCycleError, self).__init__(
+            "Policy includes form a cycle: {}".format(" -> ".join(names))
+        )
+
+
+class IncludeGraph(object):
+    """
+    The includes of a policy, resolved once.
+
+    `edges` maps the `include_key` of each reachable policy to a list of
+    `(is_named, policy)` pairs, one per include, and `order` lists the
+    reachable policies with every policy after all of its includes.
+
+    Raises IncludeCycleError if a policy (indirectly) includes itself.
+    """
+    def __init__(self, root, parent):
+        self.edges = {}
+        self.order = []
+        self.visit(root, parent, [])
+
+    def visit(self, policy, parent, path):
+        key = policy.include_key
+        if key in self.edges:
+            return
+        names = [getattr(p.method, "__name__", None) for p in path]
+        if any(p.include_key == key for p in path):
+            raise IncludeCycleError(
+                names + [getattr(policy.method, "__name__", None)]
+            )
+
+        path.append(policy)
+        edges = []
+        if parent is not None:
+            for policy_or_name in policy.includes:
+                if isinstance(policy_or_name, str):
+                    included = policy.get_included_policy(
+                        policy_or_name, parent
+                    )
+                    edges.append((True, included))
+                    # named includes are always bound to the same parent
+                    self.visit(included, parent, path)
+                else:
+                    included = policy_or_name
+                    edges.append((False, included))
+                    self.visit(included, included.parent, path)
+        path.pop()
+
+        self.edges[key] = edges
+        self.order.append(policy)
+
+
+class RecordedRun(object):
+    """
+    Results of `BasePolicy.run_recorded()` or `rerun()`, along with the
+    rule, input and record needed to re-evaluate them. `stats` counts the
+    top-level rules reused and run again.
+    """
+    def __init__(self, policy_rule, initial_partial, record, results, stats):
+        self.policy_rule = policy_rule
+        self.initial_partial = initial_partial
+        self.record = record
+        self.results = results
+        self.stats = stats
+
+    def __repr__(self):
+        return "<RecordedRun results={} stats={}>".format(
+            len(self.results), self.stats
+        )
+
+
+class PolicyPlan(object):
+    """
+    A policy together with its finalized rule, shared by every request.
+    Policies that bind the request have no shared rule: it is finalized
+    again for each request.
+    """
+    def __init__(self, policy):
+        self.policy = policy
+        self.policy_rule = None
+        if not policy.bind_ref:
+            self.policy_rule = policy.finalize()
+
+    def run(self, obj):
+        policy_rule = self.policy_rule
+        if policy_rule is None:
+            policy_rule = self.policy.finalize(obj)
+        return self.policy.evaluate(policy_rule, obj)
+
+
+class BatchStats(object):
+    """
+    Throughput of a BatchRun: requests run, seconds spent finalizing the
+    policy and seconds spent running requests
+    """
+    def __init__(self):
+        self.count = 0
+        self.setup_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def requests_per_second(self):
+        if not self.run_seconds:
+            return None
+        return self.count / self.run_seconds
+
+    @property
+    def stats(self):
+        return {
+            "count": self.count,
+            "setup_seconds": self.setup_seconds,
+            "run_seconds": self.run_seconds,
+            "requests_per_second": self.requests_per_second,
+        }
+
+    def __repr__(self):
+        return (
+            "<BatchStats count={count} setup={setup_seconds:.3f}s "
+            "run={run_seconds:.3f}s>"
+        ).format(**self.stats)
+
+
+_worker_plan = None
+
+
+def _init_worker(plan):
+    global _worker_plan  # pylint: disable=global-statement
+    _worker_plan = plan
+
+
+def _run_in_worker(obj):
+    return _worker_plan.run(obj)
+
+
+def fork_context():
+    """
+    Returns the multiprocessing context that forks its workers, which is
+    the only way for them to get a plan, as plans cannot be pickled.
+    Raises ValueError where processes cannot be forked (e.g. Windows).
+    """
+    import multiprocessing
+
+    get_context = getattr(multiprocessing, 'get_context', None)
+    try:
+        if get_context is None:
+            # Python 2 forks wherever it can
+            if sys.platform == 'win32':
+                raise ValueError(sys.platform)
+            return multiprocessing
+        return get_context("fork")
+    except ValueError as e:
+        six.raise_from(ValueError(
+            "Process pools need the 'fork' start method, which is not "
+            "available on {}; run on threads instead (processes=False)".format(
+                sys.platform
+            )
+        ), e)
+
+
+class BatchRun(object):
+    """
+    Iterator over the results of running a PolicyPlan for many requests,
+    in order. `stats` is updated as results are produced.
+    """
+    def __init__(self, plan, objs, workers=None, chunk_size=1,
+                 processes=False):
+        self.plan = plan
+        self.objs = objs
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self.stats = BatchStats()
+        self._results = None
+        if processes and workers:
+            fork_context()  # fail now, rather than once iterated
+
+    def make_pool(self):
+        if self.processes:
+            # forked workers inherit the plan, whatever the platform's
+            # default start method
+            return fork_context().Pool(
+                self.workers, initializer=_init_worker,
+                initargs=(self.plan,),
+            ), _run_in_worker
+
+        # imported here, as few runs need pools
+        from multiprocessing.pool import ThreadPool
+        return ThreadPool(self.workers), self.plan.run
+
+    def run(self):
+        if not self.workers:
+            for obj in self.objs:
+                yield self.plan.run(obj)
+            return
+
+        pool, func = self.make_pool()
+        try:
+            for results in pool.imap(func, self.objs, self.chunk_size):
+                yield results
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def __iter__(self):
+        if self._results is None:
+            self._results = self.run()
+        start = time.time()
+        for results in self._results:
+            self.stats.count += 1
+            self.stats.run_seconds = time.time() - start
+            yield results
+        self.stats.run_seconds = time.time() - start
+
+
 class DefaultPolicy(BasePolicy):
     def resolve(self, final):
         return {k: v for k, v in final.root.items() if k != 'context'}
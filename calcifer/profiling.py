@@ -0,0 +1,211 @@
+"""
+`calcifer.profiling` module
+
+Per-rule profiling of policy evaluation.
+
+Under cProfile, every policy rule shows up as an anonymous `for_partial`
+closure. While a `Profiler` is active on a thread, policy rules built on
+that thread are instead timed under the name of the rule func that built
+them (e.g. "regarding", "require_value"), and rules built by
+`wrap_context` under the name of their context frame (e.g.
+"context select("/foo")").
+
+Rules are profiled as they are built, so the policy should be finalized
+while the profiler is active. `BasePolicy.run` finalizes on each call:
+
+    with Profiler() as profiler:
+        policy.run(obj)
+    profiler.print_stats()
+
+For each name, the profiler records calls, cumulative time (time spent
+in the rule and everything it ran, counted once for recursive calls), self
+time (excluding other profiled rules) and branches: partials in and
+results out. A rule that forks has more branches out than in; one that
+fails has fewer.
+
+`pstats.Stats(profiler)` loads the same data, and `dump_stats(path)`
+writes a file that `pstats` (and tools built on it) can read.
+"""
+from __future__ import print_function
+
+import marshal
+import sys
+import threading
+import timeit
+
+_local = threading.local()
+
+
+def active_profiler():
+    return getattr(_local, 'profiler', None)
+
+
+def profile_name(name):
+    """
+    Names like "collect(<function ...>)" include reprs of their arguments;
+    only keep the operator's name
+    """
+    if name[:1] not in "(<":
+        return name.split("(", 1)[0]
+    return name
+
+
+class RuleStats(object):
+    __slots__ = (
+        'name', 'calls', 'primitive_calls', 'cumulative', 'self_time',
+        'branches_in', 'branches_out', 'callers', 'active',
+    )
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        # calls that were not inside another call of the same rule
+        self.primitive_calls = 0
+        self.cumulative = 0.0
+        self.self_time = 0.0
+        self.branches_in = 0
+        self.branches_out = 0
+        # caller name -> [calls, primitive calls, self time, cumulative]
+        self.callers = {}
+        self.active = 0
+
+    def __repr__(self):
+        return (
+            "<RuleStats {} calls={} cumulative={:.6f} self={:.6f}>"
+        ).format(self.name, self.calls, self.cumulative, self.self_time)
+
+
+class _Frame(object):
+    __slots__ = ('stats', 'start', 'child_time')
+
+    def __init__(self, stats, start):
+        self.stats = stats
+        self.start = start
+        self.child_time = 0.0
+
+
+class Profiler(object):
+    """
+    Profiles the policy rules built and run on this thread while active
+    """
+    def __init__(self, timer=timeit.default_timer):
+        self.timer = timer
+        self.rules = {}
+        self.stack = []
+        self.previous = None
+        self.stats = {}
+
+    def __enter__(self):
+        self.previous = active_profiler()
+        _local.profiler = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.profiler = self.previous
+
+    def get_stats(self, name):
+        stats = self.rules.get(name)
+        if stats is None:
+            stats = self.rules[name] = RuleStats(name)
+        return stats
+
+    def wrap(self, name, for_partial):
+        """
+        Returns `for_partial`, timed under `name`
+        """
+        stats = self.get_stats(name)
+        timer = self.timer
+        stack = self.stack
+
+        def profiled_for_partial(partial):
+            frame = _Frame(stats, timer())
+            stack.append(frame)
+            stats.active += 1
+            try:
+                results = for_partial(partial)
+            finally:
+                elapsed = timer() - frame.start
+                stack.pop()
+                stats.active -= 1
+                self.record(frame, elapsed)
+            stats.branches_in += 1
+            try:
+                stats.branches_out += len(results.getValue())
+            except (AttributeError, TypeError):
+                stats.branches_out += 1
+            return results
+        return profiled_for_partial
+
+    def record(self, frame, elapsed):
+        stats = frame.stats
+        self_time = elapsed - frame.child_time
+        primitive = stats.active == 0
+        stats.calls += 1
+        stats.self_time += self_time
+        if primitive:
+            stats.primitive_calls += 1
+            stats.cumulative += elapsed
+
+        caller = self.stack[-1] if self.stack else None
+        if caller is not None:
+            caller.child_time += elapsed
+            entry = stats.callers.get(caller.stats.name)
+            if entry is None:
+                entry = stats.callers[caller.stats.name] = [0, 0, 0.0, 0.0]
+            entry[0] += 1
+            entry[2] += self_time
+            if primitive:
+                entry[1] += 1
+                entry[3] += elapsed
+
+    def sorted_stats(self, sort='self'):
+        key = {
+            'self': lambda stats: stats.self_time,
+            'cumulative': lambda stats: stats.cumulative,
+            'calls': lambda stats: stats.calls,
+            'branches': lambda stats: stats.branches_out,
+        }[sort]
+        return sorted(self.rules.values(), key=key, reverse=True)
+
+    def print_stats(self, sort='self', limit=None, stream=None):
+        """
+        Prints a table of rules, sorted by 'self' time, 'cumulative' time,
+        'calls' or 'branches' (out)
+        """
+        if stream is None:
+            stream = sys.stdout
+        print("{:>8} {:>11} {:>11} {:>10} {:>10}  {}".format(
+            "calls", "cumulative", "self", "in", "out", "rule"
+        ), file=stream)
+        for stats in self.sorted_stats(sort)[:limit]:
+            print("{:>8} {:>11.6f} {:>11.6f} {:>10} {:>10}  {}".format(
+                stats.calls, stats.cumulative, stats.self_time,
+                stats.branches_in, stats.branches_out, stats.name,
+            ), file=stream)
+
+    @staticmethod
+    def pstats_key(name):
+        return ("calcifer", 0, name)
+
+    def create_stats(self):
+        """
+        Fills `self.stats` in the format `pstats.Stats` loads from
+        profilers
+        """
+        pstats_key = self.pstats_key
+        self.stats = {
+            pstats_key(name): (
+                stats.primitive_calls, stats.calls,
+                stats.self_time, stats.cumulative,
+                {
+                    pstats_key(caller): tuple(entry)
+                    for caller, entry in stats.callers.items()
+                },
+            )
+            for name, stats in self.rules.items()
+        }
+
+    def dump_stats(self, path):
+        self.create_stats()
+        with open(path, "wb") as f:
+            marshal.dump(self.stats, f)
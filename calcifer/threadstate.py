@@ -0,0 +1,57 @@
+"""
+`calcifer.threadstate` module
+
+What is active on each thread, kept on one ThreadState so that bind steps
+look it up once:
+
+- `counters`: the Counters operations are counted in (see
+  `calcifer.counters`),
+- `monitor`: the active FanoutMonitor, or None (see `calcifer.fanout`),
+- `tracer`: the active Tracer, or None (see `calcifer.tracing`),
+- `mode`: the active FailFast mode, or None (see `calcifer.failfast`),
+- `instrumented`: whether any of `monitor`, `tracer` and `mode` is not
+  None, so that bind steps skip looking at each of them otherwise.
+"""
+import threading
+
+_local = threading.local()
+
+INSTRUMENTS = ('monitor', 'tracer', 'mode')
+
+
+class ThreadState(object):
+    __slots__ = ('counters',) + INSTRUMENTS + ('instrumented',)
+
+    def __init__(self, counters):
+        self.counters = counters
+        self.monitor = None
+        self.tracer = None
+        self.mode = None
+        self.instrumented = False
+
+    def activate(self, name, instrument):
+        """
+        Makes `instrument` (or None) the active one of `INSTRUMENTS` by
+        `name`, and returns the one it replaces
+        """
+        previous = getattr(self, name)
+        setattr(self, name, instrument)
+        self.instrumented = (
+            self.monitor is not None or
+            self.tracer is not None or
+            self.mode is not None
+        )
+        return previous
+
+
+def current():
+    """
+    Returns the ThreadState of this thread
+    """
+    try:
+        return _local.state
+    except AttributeError:
+        # once per thread; `calcifer.counters` imports this module
+        from calcifer import counters
+        state = _local.state = ThreadState(counters.thread_counters())
+        return state
@@ -0,0 +1,200 @@
+"""
+`calcifer.tracing` module
+
+Timeline traces of policy evaluation, in the Chrome trace-event format.
+
+While a `Tracer` is active on a thread, it records begin/end events for:
+
+- named contexts (category "context", e.g. 'context select("/foo")'),
+- other operator calls (category "operator", named like their rule func),
+- zipper navigation by `Partial.select` and `Partial.root` (category
+  "zipper"),
+- forks (category "fork"): the innermost bind step that turned one
+  result into several, e.g. a `permit_values` call.
+
+Every event carries the id of the branch it ran on, and operator and
+context events the scope they started at. The evaluation starts on branch
+0; each result of a fork starts a new branch, numbered from a counter, and
+the fork's end event lists them.
+
+As with `calcifer.profiling`, operators are traced as they are built, so
+the policy should be finalized while the tracer is active. `BasePolicy.run`
+finalizes on each call:
+
+    with Tracer() as tracer:
+        policy.run(obj)
+    tracer.dump("trace.json")
+
+The file opens in `chrome://tracing` or https://ui.perfetto.dev.
+"""
+import contextlib
+import os
+import threading
+import timeit
+import weakref
+
+from calcifer import threadstate
+from calcifer.fanout import count_results
+
+
+def active_tracer():
+    return threadstate.current().tracer
+
+
+class Tracer(object):
+    """
+    Records trace events for policy rules built and run on this thread while
+    active
+    """
+    def __init__(self, clock=timeit.default_timer):
+        self.clock = clock
+        self.start = clock()
+        self.events = []
+        self.pid = os.getpid()
+        self.tid = threading.current_thread().ident
+        # branch of the state being run on, and the last branch id given
+        self.branch = 0
+        self.branches = 0
+        # state (partial) -> id of the branch it belongs to
+        self.state_branches = weakref.WeakKeyDictionary()
+        # branch id -> id of the branch it forked from
+        self.parents = {}
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = threadstate.current().activate('tracer', self)
+        return self
+
+    def __exit__(self, *exc_info):
+        threadstate.current().activate('tracer', self.previous)
+
+    def event(self, phase, name, category, args):
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": phase,
+            "ts": (self.clock() - self.start) * 1e6,
+            "pid": self.pid,
+            "tid": self.tid,
+            "args": args,
+        })
+
+    def begin(self, name, category, **args):
+        args.setdefault("branch", self.branch)
+        self.event("B", name, category, args)
+
+    def end(self, name, category, **args):
+        self.event("E", name, category, args)
+
+    @contextlib.contextmanager
+    def span(self, name, category, **args):
+        self.begin(name, category, **args)
+        try:
+            yield
+        finally:
+            self.end(name, category)
+
+    def branch_of(self, state):
+        try:
+            return self.state_branches.get(state, self.branch)
+        except TypeError:
+            # not weakly referenceable
+            return self.branch
+
+    def set_branch(self, state, branch):
+        try:
+            self.state_branches.setdefault(state, branch)
+        except TypeError:
+            pass
+
+    def wrap(self, name, category, for_partial):
+        """
+        Returns `for_partial`, traced as `name`
+        """
+        def traced_for_partial(partial):
+            self.begin(
+                name, category,
+                scope=partial.scope, branch=self.branch_of(partial)
+            )
+            results = None
+            try:
+                results = for_partial(partial)
+            finally:
+                self.end(
+                    name, category,
+                    results=0 if results is None else count_results(results)
+                )
+            return results
+        return traced_for_partial
+
+    def fork(self, m_results, func):
+        """
+        Binds `func` to `m_results`, running each on the branch its state
+        belongs to. When a step turns one result into several, and no step
+        inside it did, it is traced as a fork and each result starts a new
+        branch.
+        """
+        def on_branch(m_result):
+            _, state = m_result
+            parent = self.branch
+            branch = self.branch = self.branch_of(state)
+            start = len(self.events)
+            first = self.branches
+            try:
+                m_new_results = func(m_result)
+            finally:
+                self.branch = parent
+
+            states = [new_state for _, new_state in m_new_results]
+            if len(states) > 1 and self.branches == first:
+                self.record_fork(start, branch, states)
+            elif len(states) > 1:
+                # states rebuilt around inner forks (e.g. by `each`) belong
+                # to the branches those forks left, in order
+                leaves = self.leaves(first)
+                if len(leaves) == len(states):
+                    for new_state, leaf in zip(states, leaves):
+                        self.set_branch(new_state, leaf)
+            for new_state in states:
+                self.set_branch(new_state, branch)
+            return m_new_results
+
+        return m_results >> on_branch
+
+    def leaves(self, first):
+        """
+        Branches after `first` that did not fork again
+        """
+        branches = range(first + 1, self.branches + 1)
+        parents = set(self.parents[branch] for branch in branches)
+        return [branch for branch in branches if branch not in parents]
+
+    def record_fork(self, start, parent, states):
+        branches = []
+        for state in states:
+            self.branches += 1
+            self.parents[self.branches] = parent
+            self.set_branch(state, self.branches)
+            branches.append(self.branches)
+
+        name = "fork x{}".format(len(states))
+        self.events.insert(start, {
+            "name": name,
+            "cat": "fork",
+            "ph": "B",
+            "ts": self.events[start]["ts"] if start < len(self.events)
+            else (self.clock() - self.start) * 1e6,
+            "pid": self.pid,
+            "tid": self.tid,
+            "args": {"branch": parent},
+        })
+        self.end(name, "fork", branch=parent, branches=branches)
+
+    def trace(self):
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def dump(self, path):
+        import json
+
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
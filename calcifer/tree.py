@@ -12,6 +12,7 @@ to specific values or generate a template for procuring the value.
 from abc import ABCMeta, abstractmethod
 import logging
 
+from calcifer import counters
 from calcifer.definitions import Value
 
 logger = logging.getLogger(__name__)
@@ -78,6 +79,7 @@ class PolicyNode:
         """
         if isinstance(obj, PolicyNode):
             return obj
+        counters.current().from_obj += 1
         if isinstance(obj, dict):
             return DictPolicyNode(**obj)
         if isinstance(obj, list):
@@ -340,3 +342,162 @@ class ListPolicyNode(PolicyNode):
             isinstance(other, ListPolicyNode) and
             other.nodes == self.nodes
         )
+
+
+class LogPolicyNode(ListPolicyNode):
+    """
+    A persistent list node, as used for the "/errors" log and the
+    "/context" stack.
+
+    Entries are held as a linked list from the last entry back, so that a
+    log shares every entry but its last with the log it was appended to.
+    Appending an entry, replacing the last one or popping it is O(1);
+    `nodes` is only built if asked for. Indexing the last entry, or any
+    entry once `nodes` is built, is O(1); indexing the entry k places from
+    the end walks back k links.
+    """
+    def __init__(self, *nodes):  # pylint: disable=super-init-not-called
+        log = LogPolicyNode._link(None, None, 0)
+        for node in nodes:
+            log = log.append(node)
+        self._previous = log._previous
+        self._last = log._last
+        self._length = log._length
+        self._nodes = None
+
+    @staticmethod
+    def _link(previous, last, length):
+        log = LogPolicyNode.__new__(LogPolicyNode)
+        log._previous = previous
+        log._last = last
+        log._length = length
+        log._nodes = None
+        return log
+
+    @staticmethod
+    def from_node(node):
+        """
+        Returns `node` as a log: the entries of a list node, or an empty
+        log for an undefined one
+        """
+        if isinstance(node, LogPolicyNode):
+            return node
+        if isinstance(node, ListPolicyNode):
+            return LogPolicyNode(*node.nodes)
+        if node.value is None:
+            return LogPolicyNode()
+        raise TypeError("Cannot append to {!r}".format(node))
+
+    @property
+    def length(self):
+        return self._length
+
+    @property
+    def last(self):
+        """
+        The last entry, or None if the log is empty
+        """
+        return self._last
+
+    def append(self, node):
+        """
+        Returns a new log with `node` (a node, or an object to convert to
+        one) after this log's entries
+        """
+        return LogPolicyNode._link(
+            self, PolicyNode.from_obj(node), self._length + 1
+        )
+
+    def pop(self):
+        """
+        Returns the log without its last entry
+        """
+        if not self._length:
+            raise IndexError("pop from empty log")
+        return self._previous
+
+    def _split(self, index):
+        """
+        Returns the log of the entries before `index`, and the list of
+        entries from `index` on
+        """
+        entries = []
+        log = self
+        while log._length > index:
+            entries.append(log._last)
+            log = log._previous
+        entries.reverse()
+        return log, entries
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            _, self._nodes = self._split(0)
+        return self._nodes
+
+    @property
+    def keys(self):
+        return list(range(self._length))
+
+    def reconstruct(self, possible_steps):
+        """
+        Returns the log with the entries at `possible_steps` replaced or
+        added. Entries before the first of the steps are shared.
+        """
+        if not possible_steps:
+            return self
+        start = min(min(possible_steps), self._length)
+        log, entries = self._split(start)
+        end = max(max(possible_steps) + 1, self._length)
+        for step in range(start, end):
+            if step in possible_steps:
+                node = possible_steps[step]
+            elif step < self._length:
+                node = entries[step - start]
+            else:
+                node = UnknownPolicyNode()
+            log = log.append(node)
+        return log
+
+    def choose(self, step):
+        # the log keeps the steps not taken itself (see `reconstruct`)
+        return self[step], self, {}
+
+    def select(self, path=None):
+        if not path:
+            return (self, self)
+
+        first = int(path[0])
+        node, new_first = self[first].select(path[1:])
+        return node, self.reconstruct({first: new_first})
+
+    def __setitem__(self, key, node):
+        raise TypeError("Logs cannot be changed in place")
+
+    def __getitem__(self, key):
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            return UnknownPolicyNode()
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            return UnknownPolicyNode()
+        if key == self._length - 1:
+            return self._last
+        if self._nodes is not None:
+            return self._nodes[key]
+
+        log = self
+        while log._length > key + 1:
+            log = log._previous
+        return log._last
+
+    def __iter__(self):
+        # out of range indexes give UnknownPolicyNodes, which would never
+        # end iterating by index
+        return iter(self.nodes)
+
+    def __repr__(self):
+        args = ['{}'.format(v) for v in self.nodes]
+        return "LogPolicyNode({})".format(", ".join(args))
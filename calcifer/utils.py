@@ -1,3 +1,4 @@
+from calcifer import memo
 from calcifer.partial import Partial
 
 
@@ -11,5 +12,6 @@ def run_policy(policy_rule, obj=None):
         obj['errors'] = []
 
     partial = Partial.from_obj(obj)
-    _, policy_final = policy_rule.run(partial)[0]
+    with memo.MemoScope(memo.EVALUATION):
+        _, policy_final = policy_rule.run(partial)[0]
     return policy_final.root
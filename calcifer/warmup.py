@@ -0,0 +1,237 @@
+"""
+`calcifer.warmup` module
+
+Finalized policy rules close over arbitrary Python callables (the lambdas
+given to `apply()` or `each()`, the functions made by `policyM` for each
+monad), so they cannot be pickled, and no serialized form could rebuild
+them faithfully: every process that runs a policy finalizes it itself.
+
+What can be shared is the finalizing. A `PolicyReference` names a policy
+by its import path, "module:Owner.policy_name", and pickles as only that
+reference. The first time a process needs its rule, the module is
+imported and the policy is finalized, once for the process; processes
+forked after that inherit it.
+
+At deploy time, `python -m calcifer.warmup module [module ...] -o FILE`
+finalizes every policy found in the given modules, failing on include
+cycles or errors in the policies, and writes a warm-up manifest: the
+references of those policies. `warm_up(FILE)` finalizes the same
+policies, e.g. in a parent process before it forks its workers, so that
+the workers start with every policy already finalized. The manifest holds
+nothing precompiled: a process that is not forked from a warmed-up one
+finalizes every policy again.
+"""
+import argparse
+import importlib
+import json
+import logging
+import sys
+import threading
+import time
+
+from calcifer._version import __version__
+from calcifer.policy import BasePolicy, BatchRun, PolicyPlan
+
+logger = logging.getLogger(__name__)
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+class PolicyReference(object):
+    """
+    A policy found by import path, finalized once per process
+    """
+    def __init__(self, module_name, owner_name, policy_name):
+        self.module_name = module_name
+        self.owner_name = owner_name
+        self.policy_name = policy_name
+
+    @staticmethod
+    def from_reference(reference):
+        module_name, _, path = reference.partition(":")
+        owner_name, _, policy_name = path.rpartition(".")
+        return PolicyReference(module_name, owner_name or None, policy_name)
+
+    @property
+    def reference(self):
+        if self.owner_name is None:
+            return "{}:{}".format(self.module_name, self.policy_name)
+        return "{}:{}.{}".format(
+            self.module_name, self.owner_name, self.policy_name
+        )
+
+    def load_policy(self):
+        """
+        Imports the policy. Policies defined on a class are bound to that
+        class, so that their includes are found on it.
+        """
+        owner = importlib.import_module(self.module_name)
+        if self.owner_name is not None:
+            for name in self.owner_name.split("."):
+                owner = getattr(owner, name)
+        policy = getattr(owner, self.policy_name)
+        if self.owner_name is not None and policy.parent is None:
+            policy = policy.replace(parent=owner)
+        return policy
+
+    @property
+    def is_loaded(self):
+        return self.reference in _plans
+
+    @property
+    def plan(self):
+        reference = self.reference
+        plan = _plans.get(reference)
+        if plan is None:
+            with _plans_lock:
+                plan = _plans.get(reference)
+                if plan is None:
+                    plan = PolicyPlan(self.load_policy())
+                    _plans[reference] = plan
+        return plan
+
+    def run(self, obj):
+        return self.plan.run(obj)
+
+    def run_many(self, objs, workers=None, chunk_size=1, processes=False):
+        return BatchRun(
+            self.plan, objs,
+            workers=workers, chunk_size=chunk_size, processes=processes,
+        )
+
+    def __reduce__(self):
+        return (
+            PolicyReference,
+            (self.module_name, self.owner_name, self.policy_name)
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PolicyReference) and
+            self.reference == other.reference
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.reference)
+
+    def __repr__(self):
+        return "<PolicyReference {}>".format(self.reference)
+
+
+def find_policies(module_name):
+    """
+    Returns PolicyReferences for the policies defined in a module: policies
+    at module level and on classes defined in the module
+    """
+    module = importlib.import_module(module_name)
+    references = []
+    for name, value in sorted(vars(module).items()):
+        if isinstance(value, BasePolicy):
+            references.append(PolicyReference(module_name, None, name))
+        elif (
+                isinstance(value, type) and
+                value.__module__ == module_name
+        ):
+            for attr, attr_value in sorted(vars(value).items()):
+                if isinstance(attr_value, BasePolicy):
+                    references.append(
+                        PolicyReference(module_name, name, attr)
+                    )
+    return references
+
+
+def finalize_module(module_name):
+    """
+    Finalizes every policy in a module. Returns a list of
+    `(policy_reference, seconds)` pairs.
+    """
+    results = []
+    for policy_reference in find_policies(module_name):
+        start = time.time()
+        policy_reference.plan  # pylint: disable=pointless-statement
+        results.append((policy_reference, time.time() - start))
+    return results
+
+
+def write_manifest(path, policy_references):
+    """
+    Writes a warm-up manifest listing PolicyReferences
+    """
+    manifest = {
+        "calcifer_version": __version__,
+        "policies": [
+            policy_reference.reference
+            for policy_reference in policy_references
+        ],
+    }
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def read_manifest(path):
+    """
+    Returns the PolicyReferences listed in a warm-up manifest
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("calcifer_version") != __version__:
+        logger.warning(
+            "Manifest %s was written by calcifer %s, read with %s",
+            path, manifest.get("calcifer_version"), __version__
+        )
+    return [
+        PolicyReference.from_reference(reference)
+        for reference in manifest["policies"]
+    ]
+
+
+def warm_up(path):
+    """
+    Finalizes the policies listed in a warm-up manifest for this process
+    (and the processes it forks after), and returns their PolicyReferences
+    """
+    policy_references = read_manifest(path)
+    for policy_reference in policy_references:
+        policy_reference.plan  # pylint: disable=pointless-statement
+    return policy_references
+
+
+def main(argv=None, stream=None):
+    if stream is None:
+        stream = sys.stdout
+    parser = argparse.ArgumentParser(
+        prog="python -m calcifer.warmup",
+        description="Finalize the policies in some modules and write a "
+                    "warm-up manifest of them.",
+    )
+    parser.add_argument("modules", nargs="+", metavar="module")
+    parser.add_argument("-o", "--output", help="manifest file to write")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module_name in args.modules:
+        results.extend(finalize_module(module_name))
+
+    for policy_reference, seconds in results:
+        stream.write("{:8.3f}s  {}\n".format(
+            seconds, policy_reference.reference
+        ))
+    stream.write("{} policies finalized in {:.3f}s\n".format(
+        len(results), sum(seconds for _, seconds in results)
+    ))
+
+    if args.output:
+        write_manifest(
+            args.output, [policy_reference for policy_reference, _ in results]
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 """
 HERE THERE BE DRAGONS
 """
+from calcifer import counters
 from calcifer.tree import UnknownPolicyNode
 
 
@@ -36,6 +37,7 @@ class Zipper(object):
         return new_zipper
 
     def down(self, step):
+        counters.current().down += 1
         chosen_node, new_node, steps_not_taken = self.node.choose(step)
         new_breadcrumbs = [Breadcrumb(step, new_node, steps_not_taken)] + self.breadcrumbs
         return Zipper(new_breadcrumbs, chosen_node)
@@ -44,6 +46,9 @@ class Zipper(object):
         return Zipper(self.breadcrumbs, node)
 
     def up(self):
+        counts = counters.current()
+        counts.up += 1
+        counts.reconstruct += 1
         first = self.breadcrumbs[0]
         rest = self.breadcrumbs[1:]
 
@@ -63,3 +68,47 @@ class Breadcrumb(object):
         if steps_not_taken is None:
             steps_not_taken = {}
         self.steps_not_taken = steps_not_taken
+
+    def sibling(self, step):
+        """
+        Returns the node at one of the steps not taken, or None
+        """
+        return self.steps_not_taken.get(step)
+
+    def with_sibling(self, step, node):
+        """
+        Returns the breadcrumb with `node` at one of the steps not taken
+        """
+        steps_not_taken = dict(self.steps_not_taken)
+        steps_not_taken[step] = node
+        return Breadcrumb(self.step_taken, self.from_node, steps_not_taken)
+
+
+class SiblingsBreadcrumb(Breadcrumb):
+    """
+    A breadcrumb that refers to the full collection of children it was
+    taken from, only computing the steps not taken if it is ever followed
+    back up. Taking one of these is O(1) regardless of sibling count.
+    """
+    def __init__(self, step_taken, from_node, siblings):  # pylint: disable=super-init-not-called
+        self.step_taken = step_taken
+        self.from_node = from_node
+        self.siblings = siblings
+
+    @property
+    def steps_not_taken(self):
+        siblings = self.siblings
+        step_taken = self.step_taken
+        if isinstance(siblings, dict):
+            return {
+                k: v for k, v in siblings.items() if k != step_taken
+            }
+        return {
+            i: v for i, v in enumerate(siblings) if i != step_taken
+        }
+
+    def sibling(self, step):
+        siblings = self.siblings
+        if step == self.step_taken or not isinstance(siblings, dict):
+            return None
+        return siblings.get(step)
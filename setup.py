@@ -15,7 +15,7 @@ setup(
     name='calcifer',
     description='A Python based policy framework.',
     version=__version__,
-    packages=find_packages(exclude=['tests', 'tests.*']),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     include_package_data=True,
     long_description=codecs.open('README.rst', encoding='utf-8').read(),
     install_requires=read_requirements_file('requirements.txt'),
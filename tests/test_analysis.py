@@ -0,0 +1,108 @@
+import unittest
+from unittest import TestCase
+
+from calcifer.analysis import Access, UNKNOWN, analyze, join, overlaps
+from calcifer.contexts import Context
+
+from calcifer import (
+    regarding, select, set_value, append_value, require_value, policies,
+    each, unit, append_error,
+)
+
+
+class AnalysisTestCase(TestCase):
+    def test_join(self):
+        self.assertEqual(join("/foo", "bar"), "/foo/bar")
+        self.assertEqual(join("/foo", "/bar"), "/bar")
+        self.assertEqual(join("/foo/bar", ".."), "/foo")
+        self.assertEqual(join("/", "foo"), "/foo")
+        self.assertEqual(join("/foo", ""), "/foo")
+        self.assertEqual(join(None, "bar"), None)
+        self.assertEqual(join(None, "/bar"), "/bar")
+        self.assertEqual(join("/foo", 5), None)
+
+    def test_overlaps(self):
+        self.assertTrue(overlaps("/foo", "/foo/bar"))
+        self.assertTrue(overlaps("/", "/foo"))
+        self.assertTrue(overlaps("/items/*/name", "/items/0"))
+        self.assertFalse(overlaps("/foo", "/bar"))
+        self.assertFalse(overlaps("/items/*/name", "/items/0/kind"))
+        self.assertTrue(overlaps(UNKNOWN, "/foo"))
+
+    def test_operators(self):
+        rule = policies(
+            regarding("/foo", require_value),
+            regarding("/bar", set_value(5)),
+            select("/baz", set_path=True) >> append_value(1),
+            regarding("/qux", append_error("qux")),
+        )
+        self.assertEqual(
+            analyze(rule).access,
+            Access(
+                reads=["/foo", "/bar", "/baz", "/qux"],
+                writes=["/bar", "/baz", "/errors"],
+            )
+        )
+
+    def test_each(self):
+        rule = regarding(
+            "/items",
+            each(regarding("name", require_value))
+        )
+        self.assertEqual(
+            analyze(rule).access,
+            Access(reads=["/items", "/items/*/name"])
+        )
+
+    def test_unknown_rule_func(self):
+        rule = regarding("/foo", unit(5) >> (lambda value: set_value(value)))
+        access = analyze(rule).access
+        self.assertTrue(access.unknown)
+        self.assertIn("/foo", access.reads)
+
+    def test_context(self):
+        ctx = Context()
+        ctx.select("/fields/name").set_value("foo")
+        ctx.select("/fields/kind").whitelist_values(["a", "b"])
+        items_ctx = ctx.select("/items").each()
+        items_ctx.select("count").append_value(1)
+
+        access = analyze(ctx.finalize()).access
+        self.assertLessEqual(
+            set(["/fields/kind", "/items", "/items/*/count"]), access.reads
+        )
+        self.assertLessEqual(
+            set(["/fields/name", "/fields/kind", "/items/*/count"]),
+            access.writes
+        )
+        self.assertIn("/errors/*/code", access.writes)
+
+    def test_dynamic_selector(self):
+        ctx = Context()
+        field_ctx = ctx.select("/field")
+        field_ctx.select(field_ctx.value).set_value(5)
+
+        analysis = analyze(ctx.finalize())
+        self.assertIn("/field", analysis.access.reads)
+        self.assertIn(UNKNOWN, analysis.access.reads)
+        self.assertIn(UNKNOWN, analysis.access.writes)
+
+        unknown_scopes = set(
+            scope for _, scope, access in analysis.accesses
+            if UNKNOWN in access.writes
+        )
+        self.assertIn(None, unknown_scopes)
+
+    def test_conflicts(self):
+        name = Access(reads=["/items/*/name"])
+        set_name = Access(writes=["/items/0/name"])
+        set_kind = Access(writes=["/items/0/kind"])
+        self.assertTrue(name.conflicts(set_name))
+        self.assertTrue(set_name.conflicts(name))
+        self.assertFalse(name.conflicts(set_kind))
+        self.assertFalse(name.conflicts(name))
+        self.assertTrue(Access(writes=[UNKNOWN]).conflicts(name))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from unittest import TestCase
+
+from calcifer import asts
+from calcifer.operators import set_value, unit
+
+
+class BindingTestCase(TestCase):
+    def test_leaves(self):
+        rule = set_value(1) >> (set_value(2) >> set_value(3)) >> set_value(4)
+        self.assertEqual(
+            [repr(leaf) for leaf in rule.ast.leaves()],
+            ["set_value(1)", "set_value(2)", "set_value(3)", "set_value(4)"]
+        )
+        self.assertEqual(
+            repr(rule.ast),
+            "set_value(1) >> set_value(2) >> set_value(3) >> set_value(4)"
+        )
+
+    def test_shared_structure(self):
+        chain = set_value(1) >> set_value(2)
+        longer = chain >> set_value(3)
+        self.assertIs(longer.ast.operands[0], chain.ast)
+
+    def test_deep_chain(self):
+        rule = set_value(None)
+        for i in range(3000):
+            rule = rule >> set_value(i)
+        rendered = repr(rule.ast)
+        self.assertTrue(rendered.endswith(">> set_value(2999)"))
+        self.assertIs(repr(rule.ast), rendered)
+
+
+class PolicyRuleFuncCallTestCase(TestCase):
+    def test_repr(self):
+        call = set_value(1).ast
+        self.assertEqual(repr(call), "set_value(1)")
+        self.assertIs(repr(call), repr(call))
+
+        with_result = call.with_result(unit(2).ast)
+        self.assertEqual(repr(with_result), "set_value(1)")
+        self.assertEqual(with_result.args, [1])
+
+    def test_names_interned(self):
+        name = "".join(["some", "_rule"])
+        self.assertIs(
+            asts.PolicyRuleFunc(name).name,
+            asts.PolicyRuleFunc("some_rule").name
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,16 +3,19 @@ import logging
 
 import unittest
 from unittest import TestCase
+from multiprocessing.pool import ThreadPool
 
 from calcifer.utils import run_policy
 
+from calcifer import counters
 from calcifer.contexts.base import Incomplete
+from calcifer.partial import Partial
 from calcifer.contexts import (
     Context
 )
 
 from calcifer import (
-    regarding, set_value, unit,
+    regarding, set_value, unit, permit_values,
 
     asts, PolicyRule
 )
@@ -161,6 +164,42 @@ class ContextTestCase(TestCase):
         self.assertEqual(error["scope"], "/dict/b")
         self.assertEqual(error["message"], "Value is required.")
 
+    def test_each_pool(self):
+        def make_policy(**kwargs):
+            ctx = Context(name="root")
+            eachctx = ctx.select("/items").each(**kwargs)
+            eachctx.select("client").whitelist_values(["ios", "android"])
+            eachctx.select("version").require()
+            return ctx.finalize()
+
+        obj = {"items": [
+            {"client": "ios", "version": 1},
+            {"client": "windows", "version": 2},
+            {"client": "android"},
+            {"client": "beos"},
+        ]}
+
+        pool = ThreadPool(4)
+        try:
+            result = run_policy(make_policy(pool=pool), obj)
+        finally:
+            pool.close()
+            pool.join()
+        expected = run_policy(make_policy(), obj)
+
+        self.assertEqual(result["items"], expected["items"])
+        self.assertEqual(
+            [error["scope"] for error in result["errors"]],
+            [
+                "/items/1/client", "/items/3/client",
+                "/items/2/version", "/items/3/version",
+            ]
+        )
+        self.assertEqual(
+            [error["scope"] for error in result["errors"]],
+            [error["scope"] for error in expected["errors"]]
+        )
+
     def test_finalize(self):
         ctx = Context(name="root")
         a = ctx.select("/a")
@@ -229,6 +268,117 @@ class ContextTestCase(TestCase):
         result = run_policy(completed, {"b": 2})
         self.assertEqual(result['c'], 7)
 
+    def test_finalize_many_ctx_values(self):
+        ctx = Context(name="root")
+        names = ["a", "b", "c", "d", "e", "f"]
+
+        scoped = ctx
+        ctx_values = []
+        for name in names:
+            scoped = scoped.select("/{}".format(name))
+            ctx_values.append(scoped.value)
+
+        def total(*values):
+            return regarding("/total", set_value(sum(values)))
+
+        scoped.append(total, *reversed(ctx_values))
+
+        incomplete = scoped.finalize()
+        self.assertIsInstance(incomplete, Incomplete)
+        self.assertEqual(
+            list(incomplete.plan.slots), list(reversed(ctx_values))[1:]
+        )
+
+        partly = incomplete.complete({ctx_values[0]: 1})
+        self.assertIsInstance(partly, Incomplete)
+        self.assertNotIn(ctx_values[0], partly.missing)
+        self.assertIn(ctx_values[0], incomplete.missing)
+
+        result = run_policy(ctx.finalize(), {
+            name: idx + 1 for idx, name in enumerate(names)
+        })
+        self.assertEqual(result['total'], 21)
+
+    def test_shared_provider(self):
+        calls = []
+
+        def record(value):
+            calls.append(value)
+            return unit(value)
+
+        ctx = Context(name="root")
+        provider = ctx.subctx(
+            lambda policy_rules: regarding('/foo') >> record
+        )
+
+        def with_values(first, second):
+            return regarding('/bar', set_value(first + second))
+
+        ctx.append(with_values, provider, provider)
+
+        with counters.counting() as counts:
+            result = run_policy(ctx.finalize(), {"foo": 3})
+        self.assertEqual(result['bar'], 6)
+        self.assertEqual(calls, [3])
+        self.assertEqual((counts.provider_runs, counts.provider_saved), (1, 1))
+
+    def test_forking_provider(self):
+        ctx = Context(name="root")
+        provider = ctx.subctx(
+            lambda policy_rules: (
+                regarding('/foo', permit_values([1, 2, 3])) >>
+                regarding('/foo')
+            )
+        )
+
+        def with_values(first, second):
+            return regarding('/bar', set_value(first + second))
+
+        ctx.append(with_values, provider, provider)
+        rule = ctx.finalize()
+
+        with counters.counting() as counts:
+            results = rule.run(Partial.from_obj({}))
+        self.assertEqual(
+            sorted(partial.root['bar'] for _, partial in results), [2, 4, 6]
+        )
+        # the provider runs once, on one branch, and forks into three
+        self.assertEqual((counts.provider_runs, counts.provider_saved), (1, 1))
+
+    def test_finalize_optimize(self):
+        def build():
+            ctx = Context(name="root")
+            ctx.select("/a").set_value(1)
+            ctx.select("/a").require()
+
+            sub = ctx.subctx()
+            sub.append(unit(None))
+            sub.select("b").select("c").set_value(2)
+            sub.append(regarding("/e", set_value(3)))
+
+            ctx.select("/d").whitelist_values(["x", "y"])
+            return ctx
+
+        expected = run_policy(build().finalize(), {})
+
+        ctx = build()
+        result = run_policy(ctx.finalize(optimize=True), {})
+        self.assertEqual(result, expected)
+
+        report = ctx.optimization_report
+        self.assertEqual(report.merged, 1)
+        self.assertEqual(report.flattened, 1)
+        # "b"/"c", plus "code"/"message" and "code"/"values" in the
+        # require and whitelist_values error handlers
+        self.assertEqual(report.hoisted, 6)
+        self.assertEqual(report.units_removed, 1)
+        self.assertLess(report.rules_after, report.rules_before)
+
+        result = run_policy(ctx.finalize(optimize=True), {"d": "z"})
+        error = result["errors"][0]
+        self.assertEqual(error["scope"], "/d")
+        self.assertEqual(error["code"], "INVALID_VALUE_SELECTION")
+
     def test_incomplete_hookup(self):
         ctx = Context(name="root")
         a = ctx.select("/a")
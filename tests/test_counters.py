@@ -0,0 +1,125 @@
+import gc
+import threading
+import time
+import unittest
+from multiprocessing.pool import ThreadPool
+from unittest import TestCase
+
+from calcifer import counters
+from calcifer.contexts import Context
+from calcifer.operators import children, each, permit_values
+from calcifer.partial import Partial
+from calcifer.tree import UnknownPolicyNode
+from calcifer.policy import BasePolicy
+from calcifer.utils import run_policy
+
+
+class Policy(BasePolicy):
+    def finalize(self, obj=None, checkpointed=False):
+        ctx = Context()
+        ctx.select("/name").require()
+        ctx.select("/kind").whitelist_values(["a", "b", "c"])
+        return ctx.finalize()
+
+
+class CountersTestCase(TestCase):
+    def test_partial_operations(self):
+        with counters.counting() as counts:
+            partial = Partial.from_obj({"a": {"b": [1, 2]}})
+            _, partial = partial.select("/a/b/1")
+            partial.root
+            partial.match(2)
+
+        self.assertEqual(counts.from_obj, 5)
+        # one select by `match`
+        self.assertEqual(counts.select, 2)
+        self.assertEqual(counts.match, 1)
+        self.assertEqual(counts.down, 3)
+        self.assertEqual(counts.up, 3)
+        self.assertEqual(counts.reconstruct, 3)
+        self.assertEqual(counts.evaluations, 0)
+
+    def test_nested(self):
+        with counters.counting() as outer:
+            Partial.from_obj(1)
+            with counters.counting() as inner:
+                Partial.from_obj(2)
+        self.assertEqual(inner.from_obj, 1)
+        self.assertEqual(outer.from_obj, 2)
+
+    def test_evaluation(self):
+        totals = counters.totals()
+        Policy().run({"name": "foo"})
+
+        last = counters.last_evaluation()
+        self.assertEqual(last.evaluations, 1)
+        self.assertGreater(last.bind_steps, 0)
+        self.assertGreater(last.select, 0)
+
+        new_totals = counters.totals()
+        self.assertEqual(new_totals.evaluations, totals.evaluations + 1)
+        self.assertGreaterEqual(
+            new_totals.select - totals.select, last.select
+        )
+
+    def test_threads(self):
+        ctx = Context()
+        ctx.select("/name").require()
+        rule = ctx.finalize()
+        totals = counters.totals()
+
+        counts = []
+
+        def run():
+            with counters.counting() as thread_counts:
+                run_policy(rule, {"name": "foo"})
+            counts.append(thread_counts)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(c.bind_steps for c in counts)), 1)
+        self.assertEqual(
+            counters.totals().bind_steps - totals.bind_steps,
+            4 * counts[0].bind_steps
+        )
+
+    def test_ended_threads(self):
+        totals = counters.totals()
+        roots = len(counters._roots)
+
+        thread = threading.Thread(target=Partial.from_obj, args=(1,))
+        thread.start()
+        thread.join()
+        # a thread's locals may be cleared a little after it is joined
+        for _ in range(100):
+            gc.collect()
+            if len(counters._roots) <= roots:
+                break
+            time.sleep(0.01)
+
+        self.assertLessEqual(len(counters._roots), roots)
+        self.assertEqual(counters.totals().from_obj, totals.from_obj + 1)
+
+    def test_pool(self):
+        pool = ThreadPool(2)
+        self.addCleanup(pool.join)
+        self.addCleanup(pool.close)
+
+        rule = children() >> each(
+            lambda _: permit_values(["x", "y"]), pool=pool
+        )
+        with counters.counting() as counts:
+            rule.run(Partial.from_obj(
+                [UnknownPolicyNode(), UnknownPolicyNode()]
+            ))
+
+        # each child matched "x" and "y" on a worker
+        self.assertEqual(counts.match, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
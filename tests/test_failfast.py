@@ -0,0 +1,155 @@
+import unittest
+from multiprocessing.pool import ThreadPool
+from unittest import TestCase
+
+from calcifer.contexts import Context
+from calcifer.failfast import FailFast, active_mode, failing_fast
+from calcifer.partial import Partial, Siblings
+from calcifer.policy import BasePolicy
+from calcifer.utils import run_policy
+
+
+def items_policy():
+    ctx = Context()
+    ctx.select("/name").require()
+    ctx.select("/kind").whitelist_values(["a", "b", "c"])
+    item_ctx = ctx.select("/items").each()
+    item_ctx.select("name").require()
+    item_ctx.select("kind").whitelist_values(["x", "y"])
+    return ctx.finalize()
+
+
+def invalid():
+    return {"items": [{"kind": "z"}, {"kind": "z"}]}
+
+
+def valid():
+    return {
+        "name": "foo", "kind": "a",
+        "items": [{"name": "bar", "kind": "x"}],
+    }
+
+
+def run_branches(rule, obj):
+    obj = dict(obj, context=[], errors=[])
+    return [final.root for _, final in rule.run(Partial.from_obj(obj))]
+
+
+class FailFastTestCase(TestCase):
+    def test_first_error_only(self):
+        rule = items_policy()
+        results = run_branches(rule, invalid())
+        self.assertEqual(len(results), 3)
+        self.assertGreater(len(results[0]["errors"]), 1)
+
+        with FailFast() as mode:
+            results = run_branches(rule, invalid())
+        self.assertIsNone(active_mode())
+
+        self.assertEqual(len(results), 1)
+        error, = results[0]["errors"]
+        self.assertEqual(error["code"], "MISSING_REQUIRED_VALUE")
+        self.assertEqual(error["scope"], "/name")
+        self.assertEqual(
+            [frame.name for frame in error["context"]],
+            ['select("/name")', "require"]
+        )
+        self.assertGreater(mode.stopped, 0)
+
+    def test_valid(self):
+        rule = items_policy()
+        with FailFast() as mode:
+            results = run_branches(rule, valid())
+        self.assertEqual(results, run_branches(rule, valid()))
+        self.assertEqual(mode.skipped, 0)
+
+    def test_some_branches_fail(self):
+        ctx = Context()
+        ctx.select("/kind").whitelist_values(["a", "b"])
+        ctx.select("/kind").whitelist_values(["b"])
+        ctx.select("/name").set_value("foo")
+
+        with FailFast() as mode:
+            results = run_branches(ctx.finalize(), {})
+
+        self.assertEqual(
+            sorted((result["kind"], len(result["errors"]))
+                   for result in results),
+            [("a", 1), ("b", 0)]
+        )
+        named = [result for result in results if "name" in result]
+        self.assertEqual([result["kind"] for result in named], ["b"])
+        self.assertGreater(mode.skipped, 0)
+        self.assertEqual(mode.stopped, 0)
+
+    def test_policy(self):
+        class Policy(BasePolicy):
+            fail_fast = True
+
+            def finalize(self, obj=None, checkpointed=False):
+                return items_policy()
+
+            def resolve(self, final):
+                return final.root
+
+        results = Policy().run(invalid())
+        self.assertEqual(len(results[0]["errors"]), 1)
+
+    def test_context_unwound(self):
+        with FailFast():
+            result = run_policy(items_policy(), invalid())
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertEqual(result["context"], [])
+
+    def test_pool(self):
+        pool = ThreadPool(2)
+        self.addCleanup(pool.join)
+        self.addCleanup(pool.close)
+
+        def rule(pool=None):
+            ctx = Context()
+            item_ctx = ctx.select("/items").each(pool=pool)
+            item_ctx.select("name").require()
+            return ctx.finalize()
+
+        with FailFast():
+            sequential = run_policy(rule(), invalid())
+            pooled = run_policy(rule(pool), invalid())
+        self.assertEqual(
+            [error["scope"] for error in pooled["errors"]],
+            [error["scope"] for error in sequential["errors"]]
+        )
+        self.assertEqual(len(pooled["errors"]), 1)
+        self.assertEqual(pooled["items"], sequential["items"])
+
+    def test_failing_fast(self):
+        with failing_fast(False) as mode:
+            self.assertIsNone(mode)
+            self.assertIsNone(active_mode())
+        with failing_fast() as mode:
+            self.assertIs(active_mode(), mode)
+
+
+class HasErrorsTestCase(TestCase):
+    def test_partial(self):
+        partial = Partial.from_obj({"errors": [], "foo": {"bar": [1, 2]}})
+        _, scoped = partial.select("/foo/bar/1")
+        self.assertFalse(scoped.has_errors)
+
+        scoped = scoped.append_errors([{"code": "ERROR"}])
+        self.assertEqual(scoped.scope, "/foo/bar/1")
+        self.assertTrue(scoped.has_errors)
+        self.assertTrue(scoped.rescope("/").has_errors)
+        self.assertTrue(scoped.rescope("/errors/0").has_errors)
+
+    def test_siblings(self):
+        partial = Partial.from_obj({"errors": [1], "foo": 1})
+        self.assertTrue(Siblings.from_partial(partial).has_errors)
+
+        partial = Partial.from_obj({"foo": [1, 2]})
+        siblings = Siblings.from_partial(partial.rescope("/foo"))
+        self.assertFalse(siblings.has_errors)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import logging
+import unittest
+from unittest import TestCase
+
+from calcifer.contexts import Context
+from calcifer.fanout import (
+    BranchExplosionError, FanoutMonitor, active_monitor, monitoring
+)
+from calcifer.policy import BasePolicy
+from calcifer.utils import run_policy
+
+
+def whitelists(count=4, choices=3):
+    ctx = Context()
+    for i in range(count):
+        ctx.select("/field{}".format(i)).whitelist_values(
+            list(range(choices))
+        )
+    return ctx.finalize()
+
+
+class FanoutMonitorTestCase(TestCase):
+    def test_peak_and_forks(self):
+        with FanoutMonitor() as monitor:
+            run_policy(whitelists(), {})
+        self.assertIsNone(active_monitor())
+
+        self.assertEqual(monitor.peak, 3 ** 4)
+        self.assertGreater(monitor.binds, 0)
+
+        fork = monitor.sorted_forks()[0]
+        self.assertIn("permit_values", repr(fork.rule))
+        self.assertEqual(fork.max_factor, 3)
+        self.assertEqual(fork.count, 1 + 3 + 9 + 27)
+        self.assertEqual(fork.scope, "/field3")
+
+    def test_abort(self):
+        with self.assertRaises(BranchExplosionError) as cm:
+            with FanoutMonitor(abort_at=10):
+                run_policy(whitelists(), {})
+        self.assertIsNone(active_monitor())
+
+        error = cm.exception
+        self.assertEqual(error.branches, 27)
+        self.assertEqual(error.limit, 10)
+        self.assertIn("permit_values", repr(error.rule))
+        self.assertEqual(error.scope, "/field2")
+        self.assertEqual(
+            error.context, ['select("/field2")', 'whitelist_values']
+        )
+
+    def test_warn_once(self):
+        logger = logging.getLogger("calcifer.fanout")
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        with FanoutMonitor(warn_at=5) as monitor:
+            run_policy(whitelists(), {})
+        self.assertEqual(monitor.peak, 81)
+        self.assertEqual(len(records), 1)
+        self.assertIn("permit_values", records[0].getMessage())
+
+    def test_monitoring(self):
+        with monitoring() as monitor:
+            self.assertIsNone(monitor)
+            self.assertIsNone(active_monitor())
+        with monitoring(abort_at=5) as monitor:
+            self.assertIs(active_monitor(), monitor)
+
+
+class PolicyThresholdsTestCase(TestCase):
+    def test_max_branches(self):
+        class Policy(BasePolicy):
+            max_branches = 10
+
+            def finalize(self, obj=None, checkpointed=False):
+                return whitelists()
+
+        with self.assertRaises(BranchExplosionError):
+            Policy().run({})
+
+    def test_within_limits(self):
+        class Policy(BasePolicy):
+            max_branches = 100
+
+            def finalize(self, obj=None, checkpointed=False):
+                return whitelists()
+
+        self.assertEqual(len(Policy().run({})), 81)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+from unittest import TestCase
+
+from calcifer import memo
+from calcifer.memo import MemoKey, MemoScope, MemoStore, make_hash
+from calcifer.contexts import Context
+from calcifer.utils import run_policy
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class MemoStoreTestCase(TestCase):
+    def test_make_hash(self):
+        self.assertEqual(
+            make_hash({"a": [1, 2], "b": {"c": set([3])}}),
+            make_hash({"b": {"c": set([3])}, "a": [1, 2]}),
+        )
+        self.assertNotEqual(make_hash([1, 2]), make_hash([2, 1]))
+
+    def test_make_hash_does_not_copy(self):
+        class Unhashable(object):
+            __hash__ = None
+
+            def __deepcopy__(self, memo_dict):
+                raise AssertionError("should not be copied")
+
+        with self.assertRaises(TypeError):
+            make_hash({"a": Unhashable()})
+
+    def test_lru_eviction(self):
+        store = MemoStore(max_size=2)
+        store.put(MemoKey(1), "one")
+        store.put(MemoKey(2), "two")
+
+        # touch 1 so 2 is least recently used
+        self.assertEqual(store.get(MemoKey(1)), "one")
+        store.put(MemoKey(3), "three")
+
+        self.assertIn(MemoKey(1), store)
+        self.assertNotIn(MemoKey(2), store)
+        self.assertEqual(store.get(MemoKey(2)), memo.MISSING)
+
+        stats = store.stats
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_ttl(self):
+        clock = FakeClock()
+        store = MemoStore(ttl=10, clock=clock)
+        store.put(MemoKey("a"), 1)
+
+        clock.now = 5
+        self.assertEqual(store.get(MemoKey("a")), 1)
+
+        clock.now = 10
+        self.assertEqual(store.get(MemoKey("a")), memo.MISSING)
+        self.assertEqual(store.stats["expirations"], 1)
+        self.assertEqual(len(store), 0)
+
+
+class MemoizedApplyTestCase(TestCase):
+    def make_policy(self, func, **kwargs):
+        ctx = Context()
+        each_ctx = ctx.select("/items").each()
+        applied_ctx = each_ctx.memoized_apply(func, each_ctx.value, **kwargs)
+        applied_ctx.set_value(applied_ctx.value)
+        return ctx.finalize()
+
+    def test_evaluation_scope(self):
+        calls = []
+
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        policy = self.make_policy(double, scope=memo.EVALUATION)
+
+        result = run_policy(policy, {"items": [1, 2, 1, 1]})
+        self.assertEqual(result["items"], [2, 4, 2, 2])
+        self.assertEqual(calls, [1, 2])
+
+        # a new evaluation starts with an empty store
+        run_policy(policy, {"items": [1]})
+        self.assertEqual(calls, [1, 2, 1])
+
+    def test_policy_scope(self):
+        calls = []
+
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        policy = self.make_policy(double, scope=memo.POLICY)
+        policy_scope = MemoScope(memo.POLICY)
+
+        with policy_scope:
+            run_policy(policy, {"items": [1, 2]})
+            run_policy(policy, {"items": [2, 3]})
+
+        self.assertEqual(calls, [1, 2, 3])
+        store, = policy_scope.stores
+        self.assertEqual(store.stats["hits"], 1)
+
+        # without an active policy scope, nothing is memoized
+        run_policy(policy, {"items": [3, 3]})
+        self.assertEqual(calls, [1, 2, 3, 3, 3])
+
+    def test_explicit_store(self):
+        calls = []
+
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        store = MemoStore(max_size=1)
+        policy = self.make_policy(double, store=store)
+
+        result = run_policy(policy, {"items": [1, 2, 1]})
+        self.assertEqual(result["items"], [2, 4, 2])
+        self.assertEqual(calls, [1, 2, 1])
+        self.assertEqual(store.stats["evictions"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest import TestCase
+
+from six import StringIO
+
+from calcifer.contexts import Context
+from calcifer.memory import (
+    MemoryTracker, accounting, active_tracker, function_name, tracemalloc
+)
+from calcifer.policy import BasePolicy
+
+
+def outer_fixture():
+    def inner_fixture():
+        return None
+    return inner_fixture
+
+
+class Policy(BasePolicy):
+    def finalize(self, obj=None, checkpointed=False):
+        ctx = Context()
+        ctx.select("/name").require()
+        ctx.select("/kind").whitelist_values(["a", "b", "c"])
+        return ctx.finalize()
+
+
+class MemoryTrackerTestCase(TestCase):
+    def run_tracked(self):
+        with MemoryTracker() as tracker:
+            results = Policy().run({"name": "foo"})
+        self.assertIsNone(active_tracker())
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(tracker.reports), 1)
+        return tracker.reports[0]
+
+    def test_counts(self):
+        report = self.run_tracked()
+        self.assertEqual(report.policy, "Policy")
+        self.assertGreater(report.rules_created, 0)
+        # the final partials, returned as results, are still alive
+        self.assertGreaterEqual(report.live["Partial"], 3)
+        self.assertGreater(report.live["Zipper"], 0)
+        self.assertGreater(report.live["PolicyNode"], 0)
+        self.assertIn("Breadcrumb", report.live)
+
+    @unittest.skipIf(tracemalloc is None, "requires tracemalloc")
+    def test_allocations(self):
+        report = self.run_tracked()
+        self.assertGreater(report.peak, 0)
+        groups = {
+            (group.module, group.function) for group in report.allocations
+        }
+        self.assertIn(("calcifer.tree", "PolicyNode.from_obj"), groups)
+        sizes = [group.size for group in report.allocations]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertFalse(tracemalloc.is_tracing())
+
+    @unittest.skipIf(tracemalloc is None, "requires tracemalloc")
+    def test_already_tracing(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        report = self.run_tracked()
+        self.assertTrue(tracemalloc.is_tracing())
+        if hasattr(tracemalloc, 'reset_peak'):
+            self.assertGreater(report.peak, 0)
+        else:
+            # the process' peak cannot be reset
+            self.assertIsNone(report.peak)
+        self.assertTrue(report.allocations)
+
+    def test_print_reports(self):
+        with MemoryTracker() as tracker:
+            Policy().run({"name": "foo"})
+            Policy().run({"name": "bar"})
+        stream = StringIO()
+        tracker.print_reports(limit=2, stream=stream)
+        lines = stream.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("Policy: peak"))
+        self.assertEqual(
+            len([line for line in lines if line.startswith("Policy")]), 2
+        )
+
+    def test_not_tracked(self):
+        with accounting("Policy") as report:
+            self.assertIsNone(report)
+
+    def test_function_name(self):
+        inner = outer_fixture()
+        filename = __file__.replace(".pyc", ".py")
+        self.assertEqual(
+            function_name(filename, inner.__code__.co_firstlineno + 1),
+            "outer_fixture.inner_fixture"
+        )
+        self.assertEqual(
+            function_name(filename, outer_fixture.__code__.co_firstlineno + 3),
+            "outer_fixture"
+        )
+
+if __name__ == '__main__':
+    unittest.main()
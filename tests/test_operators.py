@@ -1,5 +1,6 @@
 import unittest
 from unittest import TestCase
+from multiprocessing.pool import ThreadPool
 
 from pymonad import Just, List, Maybe
 
@@ -7,14 +8,21 @@ from calcifer.monads import (
     Identity, policy_rule_func
 )
 from calcifer.tree import (
-    LeafPolicyNode, DictPolicyNode, UnknownPolicyNode, Value
+    LeafPolicyNode, DictPolicyNode, ListPolicyNode, LogPolicyNode,
+    UnknownPolicyNode, Value
 )
 from calcifer import (
     Partial, Zipper,
     set_value, select, check, policies, regarding, fail, match, attempt,
-    permit_values, define_as, children, each, scope,
+    permit_values, define_as, children, each, scope, unit, append_error,
+    last_error_scope, push_context, pop_context, trace, unless_errors,
 )
-from calcifer import operators
+from calcifer.operators import receive_args
+from calcifer import counters, operators
+from calcifer.fanout import FanoutMonitor
+from calcifer.memory import MemoryTracker
+from calcifer.profiling import Profiler
+from calcifer.tracing import Tracer
 
 
 # set up the operators for the Identity and Maybe monads for
@@ -458,5 +466,292 @@ class PolicyBuilderTestCase(TestCase):
         self.assertEqual(root, ref_obj)
 
 
+    def test_each_forks(self):
+        rule = children() >> each(lambda _: permit_values(["x", "y"]))
+        ps = rule.run(Partial.from_obj(
+            [UnknownPolicyNode(), UnknownPolicyNode()]
+        ))
+
+        roots = sorted(r[1].root for r in ps.getValue())
+        self.assertEqual(
+            roots, [["x", "x"], ["x", "y"], ["y", "x"], ["y", "y"]]
+        )
+
+    def test_each_leaving_scope(self):
+        def copy_out(value):
+            return (
+                regarding("/copies/c{}".format(value), set_value(value)) >>
+                set_value(value * 2)
+            )
+
+        rule = regarding("/items", children() >> each(copy_out))
+        ps = rule.run(Partial.from_obj({"items": [1, 2, 3]}))
+
+        roots = [r[1].root for r in ps.getValue()]
+        self.assertEqual(roots, [{
+            "items": [2, 4, 6],
+            "copies": {"c1": 1, "c2": 2, "c3": 3},
+        }])
+
+    def test_each_pool(self):
+        pool = ThreadPool(2)
+        self.addCleanup(pool.join)
+        self.addCleanup(pool.close)
+
+        rule = children() >> each(
+            lambda _: permit_values(["x", "y"]), pool=pool
+        )
+        ps = rule.run(Partial.from_obj(
+            [UnknownPolicyNode(), UnknownPolicyNode()]
+        ))
+
+        # same order as evaluating the children in turn
+        roots = [r[1].root for r in ps.getValue()]
+        self.assertEqual(
+            roots, [["x", "x"], ["x", "y"], ["y", "x"], ["y", "y"]]
+        )
+
+    def test_each_pool_instrumented(self):
+        class UnusedPool(object):
+            def map(self, func, iterable):
+                raise AssertionError("pool used")
+
+        rule = regarding("/items", children() >> each(
+            lambda _: permit_values(["x", "y"]), pool=UnusedPool()
+        ))
+        instruments = [
+            Profiler(), Tracer(), FanoutMonitor(), MemoryTracker()
+        ]
+        for instrument in instruments:
+            # instruments only see this thread: evaluated sequentially
+            with instrument:
+                ps = rule.run(Partial.from_obj({
+                    "items": [UnknownPolicyNode(), UnknownPolicyNode()]
+                }))
+            self.assertEqual(len(ps.getValue()), 4)
+
+    def test_each_pool_leaving_scope(self):
+        pool = ThreadPool(2)
+        self.addCleanup(pool.join)
+        self.addCleanup(pool.close)
+
+        def copy_out(value):
+            return (
+                regarding("/copies/c{}".format(value), set_value(value)) >>
+                set_value(value * 2)
+            )
+
+        rule = regarding("/items", children() >> each(copy_out, pool=pool))
+        ps = rule.run(Partial.from_obj({"items": [1, 2, 3]}))
+
+        # writes outside each child are made in turn, none are lost
+        roots = [r[1].root for r in ps.getValue()]
+        self.assertEqual(roots, [{
+            "items": [2, 4, 6],
+            "copies": {"c1": 1, "c2": 2, "c3": 3},
+        }])
+
+    def test_policies_pool(self):
+        thread_pool = ThreadPool(2)
+        self.addCleanup(thread_pool.join)
+        self.addCleanup(thread_pool.close)
+
+        class CountingPool(object):
+            maps = 0
+
+            def map(self, func, iterable):
+                CountingPool.maps += 1
+                return thread_pool.map(func, iterable)
+
+        rule_funcs = [
+            regarding("/a", permit_values(["x", "y"])),
+            regarding("/b/c", permit_values(["x", "y"])) >>
+            regarding("/b/f", set_value("z")),
+            regarding("/d", append_error("d")),
+            regarding("/e", append_error("e")),
+        ]
+        obj = {"a": UnknownPolicyNode(), "b": {"c": UnknownPolicyNode()}}
+        ps = policies(*rule_funcs).run(Partial.from_obj(obj))
+        pool_ps = policies(*rule_funcs, pool=CountingPool()).run(
+            Partial.from_obj(obj)
+        )
+
+        self.assertEqual(CountingPool.maps, 1)
+        # same results, in the same order, as evaluating the rules in turn
+        self.assertEqual(
+            [(r[0], r[1].root, r[1].scope) for r in pool_ps.getValue()],
+            [(r[0], r[1].root, r[1].scope) for r in ps.getValue()]
+        )
+        self.assertEqual(len(pool_ps.getValue()), 4)
+        self.assertEqual(
+            pool_ps.getValue()[0][1].root["errors"], ["d", "e"]
+        )
+
+    def test_policies_pool_dependent(self):
+        class UnusedPool(object):
+            def map(self, func, iterable):
+                raise AssertionError("pool used")
+
+        dependent = [
+            # the second reads what the first writes
+            [
+                regarding("/a", set_value("x")),
+                regarding("/a", permit_values(["x"])),
+            ],
+            # the second reads the errors the first appends
+            [
+                regarding("/a", append_error("a")),
+                unless_errors(regarding("/b", set_value("x"))),
+            ],
+            # plain functions are not analyzed
+            [
+                regarding("/a", set_value("x")),
+                lambda _: regarding("/b", set_value("x")),
+            ],
+        ]
+        for rule_funcs in dependent:
+            ps = policies(*rule_funcs).run(Partial.from_obj({}))
+            pool_ps = policies(*rule_funcs, pool=UnusedPool()).run(
+                Partial.from_obj({})
+            )
+            self.assertEqual(
+                [r[1].root for r in pool_ps.getValue()],
+                [r[1].root for r in ps.getValue()]
+            )
+
+    def test_receive_args(self):
+        rule = receive_args(
+            (None, "fixed", None, None),
+            [
+                ((0,), (
+                    regarding("/foo", permit_values(["x", "y"])) >>
+                    regarding("/foo")
+                )),
+                ((2, 3), regarding("/bar")),
+            ]
+        )
+        ps = rule.run(Partial.from_obj({"bar": 5}))
+
+        results = ps.getValue()
+        values = [r[0] for r in results]
+
+        self.assertEqual(values, [("x", "fixed", 5, 5), ("y", "fixed", 5, 5)])
+
+    def test_unit_binds(self):
+        rule = select("/foo")
+        self.assertIs(rule >> unit, rule)
+
+        folded = unit(5) >> set_value
+        self.assertEqual(repr(folded.ast), "set_value(5)")
+
+        ps = folded.run(Partial())
+        self.assertEqual([r[1].root for r in ps.getValue()], [5])
+
+    def test_append_error(self):
+        rule = regarding(
+            "/foo", append_error({"code": 1}) >> append_error({"code": 2})
+        ) >> last_error_scope()
+        ps = rule.run(Partial.from_obj({"errors": [{"code": 0}]}))
+
+        (value, partial), = ps.getValue()
+        self.assertEqual(value, "/errors/2")
+        self.assertEqual(partial.scope, "/")
+        self.assertEqual(
+            partial.root["errors"], [{"code": 0}, {"code": 1}, {"code": 2}]
+        )
+
+        _, errors_partial = partial.select("/errors")
+        self.assertIsInstance(errors_partial.zipper.node, LogPolicyNode)
+        self.assertEqual(partial.last_error_index, 2)
+
+    def test_last_error_scope_without_errors(self):
+        with self.assertRaises(IndexError):
+            last_error_scope().run(Partial.from_obj({"errors": []}))
+
+    def test_context_stack(self):
+        rule = (
+            push_context("outer") >> push_context("inner") >>
+            trace() >> pop_context
+        )
+        ps = rule.run(Partial.from_obj({"context": [], "foo": 1}))
+
+        (trace_obj, partial), = ps.getValue()
+        context = trace_obj["context"]
+        self.assertEqual(context, ["outer", "inner"])
+        self.assertEqual(len(context), 2)
+        self.assertEqual(context[-1], "inner")
+        self.assertEqual([frame for frame in context], ["outer", "inner"])
+        self.assertEqual(partial.root["context"], ["outer"])
+
+    def test_context_shared(self):
+        partial = Partial.from_obj({"context": ["outer"]})
+        pushed = partial.push_context("inner")
+        self.assertIsInstance(pushed.context, LogPolicyNode)
+        # the popped stack is the tail the frame was pushed onto
+        self.assertIs(pushed.pop_context().context, pushed.context.pop())
+
+    def test_pop_empty_context(self):
+        with self.assertRaises(IndexError):
+            pop_context(None).run(Partial.from_obj({"context": []}))
+
+
+class LogPolicyNodeTestCase(TestCase):
+    def test_append(self):
+        log = LogPolicyNode(1, 2)
+        longer = log.append(3)
+        self.assertEqual(log.value, [1, 2])
+        self.assertEqual(longer.value, [1, 2, 3])
+        self.assertEqual(longer.length, 3)
+        self.assertEqual(longer.last, LeafPolicyNode(Value(3)))
+        self.assertEqual(longer[-2], LeafPolicyNode(Value(2)))
+        self.assertEqual(longer, ListPolicyNode(1, 2, 3))
+        self.assertEqual(
+            [node.value for node in longer], [1, 2, 3]
+        )
+
+    def test_append_deep(self):
+        partial = Partial.from_obj({"errors": [{"code": 1}], "a": {"b": 1}})
+        _, partial = partial.select("/a/b")
+        with counters.counting() as counts:
+            partial = partial.append_errors([{"code": 2}])
+            partial = partial.push_context("frame")
+        # the logs are replaced without moving up to the root
+        self.assertEqual((counts.up, counts.down), (0, 0))
+        self.assertEqual(partial.scope, "/a/b")
+        self.assertEqual(partial.root, {
+            "errors": [{"code": 1}, {"code": 2}],
+            "context": ["frame"],
+            "a": {"b": 1},
+        })
+
+    def test_zipper(self):
+        log = LogPolicyNode({"code": 1}, {"code": 2})
+        zipper = Zipper([], DictPolicyNode(errors=log))
+
+        zipper = zipper.down("errors").down(1).down("scope")
+        zipper = zipper.set_node(LeafPolicyNode(Value("/foo")))
+        zipper, _ = zipper.up()
+        zipper, _ = zipper.up()
+        self.assertIsInstance(zipper.node, LogPolicyNode)
+        self.assertEqual(
+            zipper.node.value, [{"code": 1}, {"code": 2, "scope": "/foo"}]
+        )
+
+        zipper = zipper.down(3).set_node(LeafPolicyNode(Value(4)))
+        zipper, _ = zipper.up()
+        self.assertEqual(
+            zipper.node.value,
+            [{"code": 1}, {"code": 2, "scope": "/foo"}, None, 4]
+        )
+        self.assertEqual(log.value, [{"code": 1}, {"code": 2}])
+
+    def test_from_node(self):
+        self.assertEqual(LogPolicyNode.from_node(UnknownPolicyNode()).value, [])
+        self.assertEqual(
+            LogPolicyNode.from_node(ListPolicyNode(1)).value, [1]
+        )
+        with self.assertRaises(TypeError):
+            LogPolicyNode.from_node(DictPolicyNode())
+
 if __name__ == '__main__':
     unittest.main()
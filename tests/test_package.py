@@ -0,0 +1,68 @@
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+
+from pymonad import List
+
+import calcifer
+from calcifer import operators
+from calcifer.monads import (
+    policyM, policy_rule_func, policy_rule_func_class
+)
+from calcifer.policy import DefaultPolicy
+
+
+class PackageTestCase(TestCase):
+    def test_exports(self):
+        for name in calcifer.__all__:
+            self.assertTrue(hasattr(calcifer, name), name)
+        self.assertIs(calcifer.Policy, DefaultPolicy)
+        self.assertIs(calcifer.collect, operators.collect)
+        self.assertIn("Context", dir(calcifer))
+
+    def test_submodules(self):
+        # in a fresh interpreter, so that no submodule is imported yet
+        script = (
+            "import calcifer; "
+            "calcifer.operators.each, calcifer.policy.BasePolicy, "
+            "calcifer.contexts.Context, calcifer.counters.totals"
+        )
+        subprocess.check_call([sys.executable, "-c", script])
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            calcifer.no_such_name  # pylint: disable=no-member,pointless-statement
+
+
+class PerMonadTestCase(TestCase):
+    def test_families_built_once(self):
+        self.assertIs(operators.make_unit(List), operators.unit)
+        self.assertIs(operators.make_each(List), operators.each)
+
+    def test_rule_class_built_once(self):
+        self.assertIs(policyM(List), policyM(List))
+        self.assertIs(type(operators.unit(1)), type(operators.fail()))
+
+    def test_documented_rule_func(self):
+        @policy_rule_func
+        def documented(value):
+            """
+            Returns a documented rule
+            """
+            return operators.unit(value)
+
+        self.assertIn("documented rule", type(documented).__doc__)
+        self.assertEqual(
+            type(documented).__name__, "<PolicyRuleFunc documented>"
+        )
+
+        @policy_rule_func
+        def undocumented(value):
+            return operators.unit(value)
+
+        self.assertIs(type(undocumented), policy_rule_func_class(List))
+
+
+if __name__ == '__main__':
+    unittest.main()
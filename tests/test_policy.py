@@ -1,10 +1,14 @@
 # pylint: disable=no-self-argument
+import threading
 import unittest
 from unittest import TestCase
 
 from calcifer.partial import Partial
+from calcifer.operators import regarding, set_value, unless_errors
 
-from calcifer.policy import BasePolicy
+from calcifer.policy import (
+    BasePolicy, DefaultPolicy, IncludeCycleError, fork_context
+)
 
 
 class PolicyProviderTestCase(TestCase):
@@ -71,6 +75,328 @@ class PolicyProviderTestCase(TestCase):
         })
         self.assertEqual(results[0], [1, 2, 3])
 
+    def test_diamond_includes(self):
+        calls = []
+
+        class HasPolicy(object):
+            class Policy(BasePolicy):
+                @staticmethod
+                def resolve(final):
+                    return final.root['list']
+
+            @Policy(includes=['b', 'c'])
+            def a(ctx):
+                calls.append("a")
+
+            @Policy(includes=['d'])
+            def b(ctx):
+                calls.append("b")
+                ctx.select("/list").append_value("b")
+
+            @Policy(includes=['d'])
+            def c(ctx):
+                calls.append("c")
+                ctx.select("/list").append_value("c")
+
+            @Policy
+            def d(ctx):
+                calls.append("d")
+                ctx.select("/list").append_value("d")
+
+        a_policy = HasPolicy().a
+        results = a_policy.run({"list": []})
+        self.assertEqual(results[0], ["b", "d", "c", "d"])
+        self.assertEqual(calls, ["a", "b", "d", "c"])
+
+        graph = a_policy.include_graph(a_policy.parent)
+        self.assertEqual(
+            [policy.method.__name__ for policy in graph.order],
+            ["d", "b", "c", "a"]
+        )
+        self.assertIs(graph, HasPolicy().a.include_graph(HasPolicy()))
+
+    def test_include_cycle(self):
+        class HasPolicy(object):
+            class Policy(BasePolicy):
+                pass
+
+            @Policy(includes=['b'])
+            def a(ctx):
+                pass
+
+            @Policy(includes=['a'])
+            def b(ctx):
+                pass
+
+        with self.assertRaises(IncludeCycleError) as raised:
+            HasPolicy().a.run({})
+        self.assertEqual(raised.exception.names, ["a", "b", "a"])
+
+    def test_run_leaves_policy_and_obj(self):
+        class HasPolicy(object):
+            class Policy(BasePolicy):
+                defaults = {"list": []}
+
+                @staticmethod
+                def resolve(final):
+                    return final.root['list']
+
+            @Policy(includes=['b'])
+            def a(ctx):
+                ctx.select("/list").append_value(1)
+
+            @Policy
+            def b(ctx):
+                ctx.select("/list").append_value(2)
+
+        policy_haver = HasPolicy()
+        a_policy = policy_haver.a
+        state = dict(a_policy.__dict__)
+
+        obj = {}
+        self.assertEqual(a_policy.run(obj), [[1, 2]])
+        self.assertEqual(obj, {})
+        self.assertEqual(a_policy.__dict__, state)
+        self.assertIsNone(HasPolicy.__dict__['a'].parent)
+
+    def test_concurrent_runs(self):
+        class HasPolicy(object):
+            class Policy(BasePolicy):
+                @staticmethod
+                def resolve(final):
+                    return final.root['out']
+
+            @Policy(bind_ref=True, includes=['b'])
+            def a(ctx, ref, suffix):
+                ctx.select("/out").set_value(
+                    "{}-{}".format(ref["name"], suffix)
+                )
+
+            @Policy
+            def b(ctx, suffix):
+                ctx.select("/suffix").set_value(suffix)
+
+        policy_haver = HasPolicy()
+        failures = []
+
+        def worker(n):
+            try:
+                for i in range(20):
+                    suffix = "{}.{}".format(n, i)
+                    policy = policy_haver.a.using(suffix)
+                    obj = {"name": "worker{}".format(n)}
+                    results = policy.run(obj)
+                    expected = "worker{}-{}".format(n, suffix)
+                    if results != [expected] or obj != {"name": obj["name"]}:
+                        failures.append((results, expected))
+            except Exception as e:  # pylint: disable=broad-except
+                failures.append(e)
+
+        threads = [
+            threading.Thread(target=worker, args=(n,)) for n in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failures, [])
+
+
+class RunManyTestCase(TestCase):
+    class HasPolicy(object):
+        class Policy(DefaultPolicy):
+            defaults = {"errors": [], "context": []}
+
+        @Policy
+        def a_policy(ctx):
+            ctx.select("/sender").require()
+            count_ctx = ctx.select("/count")
+            applied_ctx = count_ctx.apply(
+                lambda count: count + 1, count_ctx.value
+            )
+            applied_ctx.set_value(applied_ctx.value)
+
+    def setUp(self):
+        self.objs = [
+            {"sender": "s{}".format(i), "count": i + 1} for i in range(20)
+        ]
+        self.objs.append({"count": 1})
+
+    def check_results(self, all_results):
+        self.assertEqual(len(all_results), len(self.objs))
+        for obj, results in zip(self.objs, all_results):
+            result, = results
+            self.assertEqual(result["count"], obj["count"] + 1)
+            if "sender" in obj:
+                self.assertEqual(result["errors"], [])
+            else:
+                self.assertEqual(
+                    [error["scope"] for error in result["errors"]],
+                    ["/sender"]
+                )
+
+    def test_run_many(self):
+        policy = self.HasPolicy().a_policy
+        batch = policy.run_many(self.objs)
+        self.check_results(list(batch))
+        self.assertEqual(batch.stats.count, len(self.objs))
+        self.assertEqual(
+            list(policy.run_many(self.objs[:3])),
+            [policy.run(obj) for obj in self.objs[:3]]
+        )
+
+    def test_run_many_workers(self):
+        policy = self.HasPolicy().a_policy
+        batch = policy.run_many(self.objs, workers=4, chunk_size=3)
+        self.check_results(list(batch))
+        self.assertEqual(batch.stats.count, len(self.objs))
+
+    def test_run_many_processes(self):
+        policy = self.HasPolicy().a_policy
+        batch = policy.run_many(self.objs, workers=2, processes=True)
+        all_results = list(batch)
+        self.check_results(all_results)
+        frame = all_results[-1][0]["errors"][0]["context"][-1]
+        self.assertEqual(frame.name, "require")
+
+    def test_run_many_processes_without_fork(self):
+        import multiprocessing
+        if not hasattr(multiprocessing, 'get_context'):
+            raise unittest.SkipTest("Python 2 has no start methods")
+
+        def get_context(method=None):
+            raise ValueError("cannot find context for {!r}".format(method))
+
+        policy = self.HasPolicy().a_policy
+        original = multiprocessing.get_context
+        multiprocessing.get_context = get_context
+        try:
+            with self.assertRaises(ValueError) as cm:
+                policy.run_many(self.objs, workers=2, processes=True)
+        finally:
+            multiprocessing.get_context = original
+        self.assertIn("'fork' start method", str(cm.exception))
+
+    def test_fork_context(self):
+        context = fork_context()
+        if hasattr(context, 'get_start_method'):
+            self.assertEqual(context.get_start_method(), "fork")
+
+
+class RerunTestCase(TestCase):
+    class HasPolicy(object):
+        class Policy(DefaultPolicy):
+            defaults = {"errors": [], "context": []}
+
+        @Policy
+        def signup(ctx):
+            ctx.select("/email").require()
+            ctx.select("/name").require()
+            ctx.select("/plan").whitelist_values(["free", "gold"])
+            ctx.append(
+                regarding("/plan") >> (
+                    lambda plan: regarding(
+                        "/price", set_value({"free": 0, "gold": 10}[plan])
+                    )
+                )
+            )
+
+    @staticmethod
+    def summarize(results):
+        # frames differ between runs that finalize the policy again
+        return [
+            dict(result, errors=[
+                (error["scope"], error["code"]) for error in result["errors"]
+            ])
+            for result in results
+        ]
+
+    def test_rerun(self):
+        policy = self.HasPolicy().signup
+        obj = {"email": "someone@example.com", "plan": "free"}
+
+        previous = policy.run_recorded(obj)
+        self.assertEqual(
+            self.summarize(previous.results), self.summarize(policy.run(obj))
+        )
+        self.assertEqual(previous.stats, {"reused": 0, "rerun": 4})
+
+        changed = policy.rerun(previous, {"/plan": "gold"})
+        self.assertEqual(changed.stats, {"reused": 2, "rerun": 2})
+        self.assertEqual(
+            self.summarize(changed.results),
+            self.summarize(policy.run(
+                {"email": "someone@example.com", "plan": "gold"}
+            ))
+        )
+        self.assertEqual(changed.results[0]["price"], 10)
+        self.assertEqual(
+            [error["scope"] for error in changed.results[0]["errors"]],
+            ["/name"]
+        )
+
+        fixed = policy.rerun(changed, {"/name": "Someone"})
+        self.assertEqual(fixed.stats, {"reused": 3, "rerun": 1})
+        self.assertEqual(fixed.results[0]["errors"], [])
+        self.assertEqual(fixed.results[0]["price"], 10)
+
+    def test_endpoint_policy(self):
+        class HasPolicy(object):
+            Policy = self.HasPolicy.Policy
+
+            @Policy
+            def endpoint_policy(ctx):
+                ctx.select("/email").require()
+                ctx.select("/plan").whitelist_values(["free", "gold"])
+                ctx.append(
+                    regarding("/plan") >> (
+                        lambda plan: regarding(
+                            "/price", set_value({"free": 0, "gold": 10}[plan])
+                        )
+                    )
+                )
+
+        policy = HasPolicy().endpoint_policy
+        obj = {"plan": "free"}
+
+        previous = policy.run_recorded(obj)
+        # the rules after the error are not run
+        self.assertEqual(
+            self.summarize(previous.results), self.summarize(policy.run(obj))
+        )
+        self.assertNotIn("price", previous.results[0])
+        self.assertEqual(previous.stats, {"reused": 0, "rerun": 3})
+
+        fixed = policy.rerun(previous, {"/email": "someone@example.com"})
+        self.assertEqual(fixed.stats, {"reused": 0, "rerun": 3})
+        self.assertEqual(fixed.results[0]["errors"], [])
+        self.assertEqual(fixed.results[0]["price"], 0)
+
+        changed = policy.rerun(fixed, {"/plan": "gold"})
+        self.assertEqual(changed.stats, {"reused": 1, "rerun": 2})
+        self.assertEqual(changed.results[0]["price"], 10)
+
+        broken = policy.rerun(changed, {"/email": None})
+        self.assertEqual(broken.stats, {"reused": 0, "rerun": 3})
+        self.assertEqual(
+            self.summarize(broken.results),
+            self.summarize(policy.run({"plan": "gold"}))
+        )
+
+    def test_own_wrapper(self):
+        class HasPolicy(object):
+            class Policy(BasePolicy):
+                pass
+
+            @Policy
+            def wrapped(ctx):
+                ctx.wrapper = lambda rules: unless_errors(*rules)
+                ctx.select("/email").require()
+
+        with self.assertRaises(ValueError):
+            HasPolicy().wrapped.run_recorded({})
+
 
 if __name__ == '__main__':
     unittest.main()
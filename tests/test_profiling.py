@@ -0,0 +1,78 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from six import StringIO
+
+from calcifer.contexts import Context
+from calcifer.profiling import Profiler, active_profiler
+from calcifer.utils import run_policy
+
+
+class ProfilerTestCase(TestCase):
+    def profile(self):
+        with Profiler() as profiler:
+            ctx = Context()
+            ctx.select("/name").require()
+            ctx.select("/kind").whitelist_values(["a", "b", "c"])
+            run_policy(ctx.finalize(), {"name": "foo"})
+        return profiler
+
+    def test_rules_and_contexts(self):
+        profiler = self.profile()
+        self.assertIsNone(active_profiler())
+
+        permit_values = profiler.rules["permit_values"]
+        self.assertEqual(permit_values.calls, 1)
+        self.assertEqual(permit_values.branches_in, 1)
+        self.assertEqual(permit_values.branches_out, 3)
+
+        require = profiler.rules["context require"]
+        self.assertEqual(require.calls, 1)
+        self.assertIn('context select("/name")', profiler.rules)
+
+        for stats in profiler.rules.values():
+            self.assertGreaterEqual(stats.self_time, 0)
+            self.assertLessEqual(stats.self_time, stats.cumulative + 1e-6)
+
+    def test_not_profiled(self):
+        ctx = Context()
+        ctx.select("/name").require()
+        rule = ctx.finalize()
+
+        with Profiler() as profiler:
+            run_policy(rule, {"name": "foo"})
+        # only rules built while evaluating (e.g. for contextual values)
+        self.assertNotIn('context select("/name")', profiler.rules)
+        self.assertIn("require_value", profiler.rules)
+
+    def test_print_stats(self):
+        profiler = self.profile()
+        stream = StringIO()
+        profiler.print_stats(sort='calls', limit=3, stream=stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn("calls", lines[0])
+
+    def test_pstats(self):
+        profiler = self.profile()
+        stats = pstats.Stats(profiler)
+        self.assertIn(
+            ("calcifer", 0, "permit_values"), stats.stats
+        )
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "rules.prof")
+        profiler.dump_stats(path)
+        loaded = pstats.Stats(path)
+        self.assertEqual(
+            loaded.stats[("calcifer", 0, "permit_values")][:2], (1, 1)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from calcifer import counters, threadstate
+from calcifer.failfast import FailFast
+from calcifer.fanout import FanoutMonitor
+from calcifer.tracing import Tracer
+
+
+class ThreadStateTestCase(TestCase):
+    def test_instrumented(self):
+        state = threadstate.current()
+        self.assertFalse(state.instrumented)
+        with FanoutMonitor() as monitor:
+            self.assertIs(state.monitor, monitor)
+            self.assertTrue(state.instrumented)
+            with Tracer(), FailFast():
+                self.assertTrue(state.instrumented)
+            self.assertIsNone(state.tracer)
+            self.assertIsNone(state.mode)
+        self.assertFalse(state.instrumented)
+
+    def test_counters(self):
+        state = threadstate.current()
+        self.assertIs(state.counters, counters.current())
+        with counters.counting() as counts:
+            self.assertIs(state.counters, counts)
+        self.assertIs(state.counters, counters.current())
+
+    def test_threads(self):
+        states = []
+
+        def run():
+            states.append(threadstate.current())
+
+        with FailFast():
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+
+        state, = states
+        self.assertIsNot(state, threadstate.current())
+        self.assertFalse(state.instrumented)
+
+
+if __name__ == '__main__':
+    unittest.main()
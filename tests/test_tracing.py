@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from calcifer.contexts import Context
+from calcifer.tracing import Tracer, active_tracer
+from calcifer.utils import run_policy
+
+
+class TracerTestCase(TestCase):
+    def trace(self):
+        with Tracer() as tracer:
+            ctx = Context()
+            ctx.select("/name").require()
+            ctx.select("/kind").whitelist_values(["a", "b", "c"])
+            ctx.select("/kind").require()
+            run_policy(ctx.finalize(), {"name": "foo"})
+        return tracer
+
+    def test_balanced(self):
+        tracer = self.trace()
+        self.assertIsNone(active_tracer())
+
+        stack = []
+        for event in tracer.events:
+            if event["ph"] == "B":
+                stack.append(event["name"])
+            else:
+                self.assertEqual(event["ph"], "E")
+                self.assertEqual(stack.pop(), event["name"])
+        self.assertEqual(stack, [])
+
+        timestamps = [event["ts"] for event in tracer.events]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_categories(self):
+        tracer = self.trace()
+        begins = [event for event in tracer.events if event["ph"] == "B"]
+        by_name = {}
+        for event in begins:
+            by_name.setdefault(event["name"], []).append(event)
+
+        context = by_name['context select("/name")'][0]
+        self.assertEqual(context["cat"], "context")
+        self.assertEqual(context["args"], {"scope": "/", "branch": 0})
+
+        permit_values = by_name["permit_values"][0]
+        self.assertEqual(permit_values["cat"], "operator")
+        self.assertEqual(permit_values["args"]["scope"], "/kind")
+
+        fork = by_name["fork x3"][0]
+        self.assertEqual(fork["cat"], "fork")
+        self.assertEqual(fork["args"], {"branch": 0})
+        fork_end = [
+            event for event in tracer.events
+            if event["ph"] == "E" and event["name"] == "fork x3"
+        ][0]
+        self.assertEqual(fork_end["args"]["branches"], [1, 2, 3])
+
+        # the rules after the fork run once on each branch
+        self.assertEqual(
+            [
+                (event["args"]["scope"], event["args"]["branch"])
+                for event in by_name["require_value"]
+            ],
+            [("/name", 0), ("/kind", 1), ("/kind", 2), ("/kind", 3)]
+        )
+
+        self.assertTrue(any(
+            event["cat"] == "zipper" and event["name"] == "select /kind"
+            for event in begins
+        ))
+
+    def test_forks_in_each(self):
+        with Tracer() as tracer:
+            ctx = Context()
+            ctx.select("/items").each().select("kind").whitelist_values(
+                ["a", "b"]
+            )
+            ctx.select("/name").require()
+            run_policy(ctx.finalize(), {"name": "foo", "items": [{}, {}]})
+
+        forks = [
+            (event["args"]["branch"], event["args"]["branches"])
+            for event in tracer.events
+            if event["ph"] == "E" and event["cat"] == "fork"
+        ]
+        self.assertEqual(forks, [(0, [1, 2]), (1, [3, 4]), (2, [5, 6])])
+
+        require_branches = [
+            event["args"]["branch"] for event in tracer.events
+            if event["ph"] == "B" and event["name"] == "require_value"
+        ]
+        self.assertEqual(require_branches, [3, 4, 5, 6])
+
+    def test_dump(self):
+        tracer = self.trace()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "trace.json")
+        tracer.dump(path)
+
+        with open(path) as f:
+            trace = json.load(f)
+        self.assertEqual(len(trace["traceEvents"]), len(tracer.events))
+        self.assertEqual(trace["displayTimeUnit"], "ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
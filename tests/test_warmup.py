@@ -0,0 +1,84 @@
+# pylint: disable=no-self-argument
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from six import StringIO
+
+from calcifer.policy import DefaultPolicy
+from calcifer.warmup import (
+    PolicyReference, finalize_module, find_policies, main, read_manifest,
+    warm_up, write_manifest,
+)
+
+
+class HasPolicy(object):
+    class Policy(DefaultPolicy):
+        defaults = {"errors": [], "context": [], "list": []}
+
+    @Policy(includes=['b'])
+    def a(ctx):
+        ctx.select("/list").append_value("a")
+
+    @Policy
+    def b(ctx):
+        ctx.select("/list").append_value("b")
+
+
+class PolicyReferenceTestCase(TestCase):
+    def test_find_policies(self):
+        self.assertEqual(
+            [reference.reference for reference in find_policies(__name__)],
+            ["{}:HasPolicy.a".format(__name__),
+             "{}:HasPolicy.b".format(__name__)]
+        )
+
+    def test_pickle(self):
+        reference = PolicyReference(__name__, "HasPolicy", "a")
+        self.assertEqual(reference.run({})[0]["list"], ["a", "b"])
+
+        loaded = pickle.loads(pickle.dumps(reference))
+        self.assertEqual(loaded, reference)
+        self.assertTrue(loaded.is_loaded)
+        self.assertIs(loaded.plan, reference.plan)
+        self.assertEqual(
+            PolicyReference.from_reference(reference.reference), reference
+        )
+
+
+class ManifestTestCase(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.path = os.path.join(tmp_dir, "policies.json")
+
+    def test_manifest(self):
+        references = [
+            reference for reference, _ in finalize_module(__name__)
+        ]
+        write_manifest(self.path, references)
+        self.assertEqual(read_manifest(self.path), references)
+
+        warmed_up = warm_up(self.path)
+        self.assertEqual(warmed_up, references)
+        self.assertTrue(all(reference.is_loaded for reference in warmed_up))
+        self.assertEqual(warmed_up[1].run({})[0]["list"], ["b"])
+
+    def test_main(self):
+        output = StringIO()
+        self.assertEqual(main([__name__, "-o", self.path], output), 0)
+        self.assertIn("2 policies finalized", output.getvalue())
+        with open(self.path) as f:
+            manifest = json.load(f)
+        self.assertEqual(
+            manifest["policies"],
+            [reference.reference for reference in find_policies(__name__)]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()